@@ -0,0 +1,376 @@
+"""
+Content-addressed blob store for large notebook outputs and pipeline YAML.
+
+Values larger than BLOB_INLINE_THRESHOLD are written once under their
+sha256 (zstd-compressed when the zstandard package is installed) and the row
+keeps only a reference string, "blob:sha256:<hex>". Identical outputs from
+any user share one blob. Clients fetch the content lazily from
+GET /blobs/{sha256}, which supports HTTP Range requests.
+
+Blob files live in BLOB_STORE_DIR/<aa>/<bb>/<sha256>.<codec>; the blobs
+table records sizes for range handling and last-stored times for GC. Garbage
+collection deletes blobs that no notebook or pipeline references any more,
+with a grace period so writes that have stored a blob but not yet committed
+their row are never collected.
+
+    python blob_store.py --gc
+    python blob_store.py --externalize     # move existing large values out of rows
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blob_store"))
+BLOB_INLINE_THRESHOLD = int(os.getenv("BLOB_INLINE_THRESHOLD", "16384"))
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "3"))
+BLOB_GC_GRACE_HOURS = float(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
+BLOB_REF_PREFIX = "blob:sha256:"
+CHUNK_SIZE = 64 * 1024
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Every place a blob reference can live; GC keeps whatever this returns.
+REFERENCED_BLOBS_SQL = """
+    SELECT substr(c.output, 13) AS sha256 FROM notebook_cells c
+    WHERE c.output LIKE 'blob:sha256:%'
+    UNION
+    SELECT substr(cell->>'output', 13) FROM notebooks n, jsonb_array_elements(n.content->'cells') AS cell
+    WHERE NOT n.cells_normalized AND jsonb_typeof(n.content->'cells') = 'array'
+      AND cell->>'output' LIKE 'blob:sha256:%'
+    UNION
+    SELECT substr(p.workflow_yaml, 13) FROM pipelines p
+    WHERE p.workflow_yaml LIKE 'blob:sha256:%'
+    UNION
+    SELECT substr(v.yaml #>> '{}', 13) FROM pipeline_versions v
+    WHERE v.kind = 'snapshot' AND jsonb_typeof(v.yaml) = 'string' AND v.yaml #>> '{}' LIKE 'blob:sha256:%'
+"""
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class RangeNotSatisfiable(Exception):
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX) and bool(_SHA256_RE.match(value[12:]))
+
+
+def blob_ref(sha256: str) -> str:
+    return BLOB_REF_PREFIX + sha256
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Returns an inclusive (start, end) for a single byte range, or None for the whole blob."""
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        # Multi-range and unknown units: answer with the full body, as RFC 9110 allows.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+class BlobStore:
+    def __init__(self, root: str = BLOB_STORE_DIR, zstd_level: int = BLOB_ZSTD_LEVEL):
+        self.root = root
+        self.codec = "zst" if zstandard is not None else "raw"
+        self.zstd_level = zstd_level
+
+    def _path(self, sha256: str, codec: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}.{codec}")
+
+    def locate(self, sha256: str) -> Tuple[str, str]:
+        if not _SHA256_RE.match(sha256):
+            raise BlobNotFound(sha256)
+        for codec in ("zst", "raw"):
+            path = self._path(sha256, codec)
+            if os.path.exists(path):
+                return path, codec
+        raise BlobNotFound(sha256)
+
+    def put(self, data: bytes) -> Tuple[str, int, bool]:
+        """Stores data; returns (sha256, stored_size, created)."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        try:
+            path, _ = self.locate(sha256)
+            # Refresh the mtime so the orphan sweep treats this as a fresh write.
+            os.utime(path)
+            return sha256, os.path.getsize(path), False
+        except BlobNotFound:
+            pass
+        payload = data
+        if self.codec == "zst":
+            payload = zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        path = self._path(sha256, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return sha256, len(payload), True
+
+    def read(self, sha256: str) -> bytes:
+        return b"".join(self.stream(sha256))
+
+    def stream(self, sha256: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yields bytes [start, end] (inclusive) of the uncompressed blob."""
+        path, codec = self.locate(sha256)
+        remaining = None if end is None else end - start + 1
+        with open(path, "rb") as handle:
+            if codec == "raw":
+                handle.seek(start)
+                reader = handle
+            else:
+                reader = zstandard.ZstdDecompressor().stream_reader(handle)
+                # zstd frames aren't seekable; decompress and discard up to start.
+                skip = start
+                while skip:
+                    skipped = len(reader.read(min(CHUNK_SIZE, skip)))
+                    if not skipped:
+                        return
+                    skip -= skipped
+            while remaining is None or remaining > 0:
+                chunk = reader.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, sha256: str):
+        for codec in ("zst", "raw"):
+            try:
+                os.unlink(self._path(sha256, codec))
+            except FileNotFoundError:
+                pass
+
+
+_default_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = BlobStore()
+    return _default_store
+
+
+def store_blob(conn, store: BlobStore, data: bytes, content_type: str = "text/plain; charset=utf-8") -> str:
+    # Claim the row before trusting an existing file: GC holds this row lock while it unlinks, so once
+    # the upsert returns the file is either still there or gone for good and rewritten by put().
+    sha256 = hashlib.sha256(data).hexdigest()
+    conn.execute(
+        text("""
+            INSERT INTO blobs (sha256, size, stored_size, content_type)
+            VALUES (:sha256, :size, :size, :content_type)
+            ON CONFLICT (sha256) DO UPDATE SET last_stored_at = now()
+        """),
+        {"sha256": sha256, "size": len(data), "content_type": content_type}
+    )
+    _, stored_size, _ = store.put(data)
+    conn.execute(
+        text("UPDATE blobs SET stored_size = :stored_size WHERE sha256 = :sha256 AND stored_size <> :stored_size"),
+        {"sha256": sha256, "stored_size": stored_size}
+    )
+    return sha256
+
+
+def externalize_text(conn, value: Optional[str], store: Optional[BlobStore] = None,
+                     threshold: int = BLOB_INLINE_THRESHOLD) -> Optional[str]:
+    """Returns value unchanged when small, otherwise a blob reference to it."""
+    if not isinstance(value, str) or is_blob_ref(value):
+        return value
+    data = value.encode("utf-8")
+    if len(data) <= threshold:
+        return value
+    return blob_ref(store_blob(conn, store or get_blob_store(), data))
+
+
+def externalize_notebook_content(conn, content: Optional[Dict[str, Any]], store: Optional[BlobStore] = None,
+                                 threshold: int = BLOB_INLINE_THRESHOLD) -> Optional[Dict[str, Any]]:
+    if not isinstance(content, dict) or not isinstance(content.get("cells"), list):
+        return content
+    cells = []
+    for cell in content["cells"]:
+        if isinstance(cell, dict) and isinstance(cell.get("output"), str):
+            cell = {**cell, "output": externalize_text(conn, cell["output"], store, threshold)}
+        cells.append(cell)
+    return {**content, "cells": cells}
+
+
+def resolve_text(value: Optional[str], store: Optional[BlobStore] = None) -> Optional[str]:
+    """Inverse of externalize_text: returns the stored text for a blob reference, else value."""
+    if is_blob_ref(value):
+        return (store or get_blob_store()).read(value[12:]).decode("utf-8")
+    return value
+
+
+def get_blob_info(conn, sha256: str) -> Optional[Dict[str, Any]]:
+    if not _SHA256_RE.match(sha256):
+        return None
+    row = conn.execute(
+        text("SELECT size, content_type FROM blobs WHERE sha256 = :sha256"),
+        {"sha256": sha256}
+    ).fetchone()
+    return {"sha256": sha256, "size": row[0], "content_type": row[1]} if row else None
+
+
+def collect_garbage(engine, store: Optional[BlobStore] = None, grace_hours: float = BLOB_GC_GRACE_HOURS,
+                    batch_size: int = 1000) -> Dict[str, int]:
+    store = store or get_blob_store()
+    deleted: List[str] = []
+    freed = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(f"""
+                    WITH referenced AS ({REFERENCED_BLOBS_SQL}),
+                    garbage AS (
+                        SELECT b.sha256 FROM blobs b
+                        WHERE b.last_stored_at < now() - make_interval(secs => :grace_seconds)
+                          AND NOT EXISTS (SELECT 1 FROM referenced r WHERE r.sha256 = b.sha256)
+                        LIMIT :batch_size
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    DELETE FROM blobs b USING garbage g
+                    WHERE b.sha256 = g.sha256
+                    RETURNING b.sha256, b.stored_size
+                """),
+                {"grace_seconds": grace_hours * 3600, "batch_size": batch_size}
+            ).fetchall()
+            # Unlink while the deleted rows are still locked so a concurrent store_blob waits for us
+            # and then rewrites the file, instead of reusing one we are about to remove.
+            for sha256, stored_size in rows:
+                store.delete(sha256)
+                freed += stored_size or 0
+        deleted.extend(row[0] for row in rows)
+        if len(rows) < batch_size:
+            break
+
+    # Files whose row never committed (crashed writer) are swept by age as well.
+    known: Set[str] = set()
+    with engine.connect() as conn:
+        known.update(row[0] for row in conn.execute(text("SELECT sha256 FROM blobs")))
+    orphans = 0
+    cutoff = time.time() - grace_hours * 3600
+    for directory, _, files in os.walk(store.root):
+        for name in files:
+            sha256 = name.partition(".")[0]
+            is_blob = bool(_SHA256_RE.match(sha256))
+            if (is_blob and sha256 in known) or not (is_blob or name.startswith(".tmp-")):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+                    orphans += 1
+            except FileNotFoundError:
+                pass
+    return {"deleted": len(deleted), "orphan_files": orphans, "bytes_freed": freed}
+
+
+def externalize_existing(engine, store: Optional[BlobStore] = None, threshold: int = BLOB_INLINE_THRESHOLD,
+                         batch_size: int = 200) -> Dict[str, int]:
+    store = store or get_blob_store()
+    counts = {"notebooks": 0, "cells": 0, "pipelines": 0}
+    last_id = "00000000-0000-0000-0000-000000000000"
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("""
+                    SELECT id, content FROM notebooks
+                    WHERE id > CAST(:last_id AS uuid) AND NOT cells_normalized AND octet_length(content::text) > :threshold
+                    ORDER BY id LIMIT :batch_size
+                """),
+                {"last_id": last_id, "threshold": threshold, "batch_size": batch_size}
+            ).fetchall()
+            for notebook_id, content in rows:
+                updated = externalize_notebook_content(conn, content, store, threshold)
+                if updated != content:
+                    conn.execute(
+                        text("UPDATE notebooks SET content = CAST(:content AS jsonb) WHERE id = :id"),
+                        {"id": notebook_id, "content": json.dumps(updated)}
+                    )
+                    counts["notebooks"] += 1
+        if len(rows) < batch_size:
+            break
+        last_id = str(rows[-1][0])
+
+    for table, key_columns, column in (("notebook_cells", ("notebook_id", "cell_id"), "output"),
+                                       ("pipelines", ("id",), "workflow_yaml")):
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(f"""
+                        SELECT {', '.join(key_columns)}, {column} FROM {table}
+                        WHERE octet_length({column}) > :threshold AND {column} NOT LIKE 'blob:sha256:%'
+                        LIMIT :batch_size
+                    """),
+                    {"threshold": threshold, "batch_size": batch_size}
+                ).fetchall()
+                for row in rows:
+                    keys = dict(zip(key_columns, row[:-1]))
+                    conn.execute(
+                        text(f"""
+                            UPDATE {table} SET {column} = :value
+                            WHERE {' AND '.join(f'{key} = :{key}' for key in key_columns)}
+                        """),
+                        {**keys, "value": externalize_text(conn, row[-1], store, threshold)}
+                    )
+            counts["cells" if table == "notebook_cells" else "pipelines"] += len(rows)
+            if len(rows) < batch_size:
+                break
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IceCube blob store maintenance")
+    parser.add_argument("--gc", action="store_true", help="delete unreferenced blobs")
+    parser.add_argument("--externalize", action="store_true", help="move large existing values into the blob store")
+    parser.add_argument("--grace-hours", type=float, default=BLOB_GC_GRACE_HOURS)
+    args = parser.parse_args()
+
+    from complete_rds_api import engine
+
+    if args.externalize:
+        print(f"Externalized: {externalize_existing(engine)}")
+    if args.gc:
+        print(f"Garbage collected: {collect_garbage(engine, grace_hours=args.grace_hours)}")
+    if not (args.gc or args.externalize):
+        parser.print_help()
@@ -0,0 +1,144 @@
+"""
+Dashboard bootstrap: the signed-in user plus a count and first page of each
+collection, in one round trip.
+
+The dashboard used to open with a fan-out to /auth/me and seven collection
+endpoints. Each request authenticated separately and checked out its own pool
+connection. GET /bootstrap authenticates once and runs one statement, which
+json_build_object assembles server side. Each collection gets its own count
+and page CTE, so neither one materializes the other's rows.
+
+Pages are summaries. Notebook content, pipeline graphs and YAML, and data
+source config are left out; the tabs load those when they open.
+
+Time-to-interactive against a running API, fan-out versus /bootstrap:
+    python bootstrap.py --email you@example.com --password ... [--rounds 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+
+BOOTSTRAP_PAGE_SIZE = int(os.getenv("BOOTSTRAP_PAGE_SIZE", "20"))
+
+# name -> (FROM clause aliased t, user filter, summary columns)
+BOOTSTRAP_COLLECTIONS: Dict[str, Tuple[str, str, List[str]]] = {
+    "workspaces": (
+        "workspaces t", "t.user_id = :user_id",
+        ["t.id", "t.name", "t.description", "t.category", "coalesce(t.tags, '{}') AS tags",
+         "t.icon", "t.color", "t.created_at", "t.updated_at"],
+    ),
+    "data_sources": (
+        "data_sources t", "t.user_id = :user_id",
+        ["t.id", "t.name", "t.type", "t.status", "t.description", "t.created_at", "t.updated_at"],
+    ),
+    "pipelines": (
+        "pipelines t", "t.user_id = :user_id",
+        ["t.id", "t.workspace_id", "t.name", "t.description", "t.cloud_provider", "t.status",
+         "t.schedule_cron", "t.schedule_timezone", "t.created_at", "t.updated_at"],
+    ),
+    "cloud_profiles": (
+        "cloud_profiles t", "t.user_id = :user_id",
+        ["t.id", "t.name", "t.provider", "t.region", "t.status", "t.created_at", "t.updated_at"],
+    ),
+    "compute_clusters": (
+        "compute_clusters t JOIN cloud_profiles cp ON t.cloud_profile_id = cp.id", "cp.user_id = :user_id",
+        ["t.id", "t.cloud_profile_id", "t.name", "t.compute_type", "t.node_type", "t.num_workers",
+         "t.auto_scaling", "t.min_workers", "t.max_workers", "t.status", "t.created_at", "t.updated_at"],
+    ),
+    "notebooks": (
+        "notebooks t JOIN workspaces w ON t.workspace_id = w.id", "w.user_id = :user_id",
+        ["t.id", "t.workspace_id", "t.name", "t.language", "t.cluster_id", "t.version",
+         "t.created_at", "t.updated_at"],
+    ),
+    "saved_queries": (
+        "saved_queries t", "t.user_id = :user_id",
+        ["t.id", "t.name", "t.description", "t.query_text", "coalesce(t.tags, '{}') AS tags",
+         "t.is_favorite", "t.created_at", "t.updated_at"],
+    ),
+}
+
+
+def build_bootstrap_sql() -> str:
+    ctes = ["""me AS (
+        SELECT u.id, u.email, u.full_name, a.account_id
+        FROM users u
+        LEFT JOIN profiles p ON u.id = p.id
+        LEFT JOIN accounts a ON p.account_id = a.id
+        WHERE u.id = :user_id
+    )"""]
+    fields = ["'user', (SELECT row_to_json(me) FROM me)"]
+    for name, (source, condition, columns) in BOOTSTRAP_COLLECTIONS.items():
+        ctes.append(f"{name}_count AS (SELECT count(*) AS n FROM {source} WHERE {condition})")
+        ctes.append(
+            f"{name}_page AS (SELECT {', '.join(columns)} FROM {source} WHERE {condition} "
+            f"ORDER BY t.created_at DESC LIMIT :page_size)"
+        )
+        fields.append(
+            f"'{name}', json_build_object("
+            f"'count', (SELECT n FROM {name}_count), "
+            f"'items', (SELECT coalesce(json_agg(pg ORDER BY pg.created_at DESC), '[]'::json) FROM {name}_page pg))"
+        )
+    return "WITH " + ",\n".join(ctes) + "\nSELECT json_build_object(" + ",\n".join(fields) + ")"
+
+
+BOOTSTRAP_SQL = build_bootstrap_sql()
+
+
+def load_bootstrap(db, user_id: str, page_size: int = BOOTSTRAP_PAGE_SIZE) -> Dict[str, Any]:
+    payload = db.execute(text(BOOTSTRAP_SQL), {"user_id": user_id, "page_size": page_size}).scalar()
+    payload["page_size"] = page_size
+    return payload
+
+
+FAN_OUT_PATHS = ["/auth/me", "/workspaces", "/data-sources", "/pipelines", "/cloud-profiles",
+                 "/compute-clusters", "/notebooks", "/saved-queries"]
+
+
+def _get(base_url: str, path: str, token: str) -> int:
+    request = urllib.request.Request(base_url + path, headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(request) as response:
+        return len(response.read())
+
+
+def run_benchmark(base_url: str, email: str, password: str, rounds: int, parallel: int):
+    signin = urllib.request.Request(
+        base_url + "/auth/signin", data=json.dumps({"email": email, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(signin) as response:
+        token = json.loads(response.read())["access_token"]
+
+    # Browsers keep about six connections per origin, so the fan-out runs six wide by default.
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        def fan_out():
+            return sum(pool.map(lambda path: _get(base_url, path, token), FAN_OUT_PATHS))
+
+        for label, load in (("fan-out", fan_out), ("bootstrap", lambda: _get(base_url, "/bootstrap", token))):
+            load()
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                size = load()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            print(f"{label:>9}: {len(FAN_OUT_PATHS) if label == 'fan-out' else 1} requests, {size / 1024:.1f} KiB, "
+                  f"median {statistics.median(timings):.1f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard bootstrap time-to-interactive benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--parallel", type=int, default=6)
+    args = parser.parse_args()
+    run_benchmark(args.url.rstrip("/"), args.email, args.password, args.rounds, args.parallel)
@@ -1,17 +1,100 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 import jwt
 from passlib.context import CryptContext
+import asyncio
+import itertools
+import json
 import uuid
 import os
 
+from blob_store import (
+    BlobNotFound,
+    RangeNotSatisfiable,
+    externalize_notebook_content,
+    externalize_text,
+    get_blob_info,
+    get_blob_store,
+    parse_range,
+    resolve_text,
+)
+from bootstrap import load_bootstrap
+from bulk_loader import BULK_LOAD_MODES, BULK_LOAD_TYPES
+from columnar import RESPONSE_FORMATS, UnsupportedFormat, download_filename, encode_batches, negotiate_format
+from compression import CompressionMiddleware
+from connectors import (
+    SQL_DRIVERS,
+    ConnectorBusy,
+    ConnectorError,
+    ConnectorManager,
+    ConnectorUnavailable,
+    build_url,
+    test_connection,
+)
+from embedded_engine import (
+    EMBEDDED_TYPES,
+    EmbeddedEngineError,
+    EngineBusy,
+    EngineUnavailable,
+    QueryTimeout,
+    get_engine,
+)
+from http_cache import collection_etag, etag_matches, not_modified
+from incremental import parse_incremental
+from job_queue import enqueue, get_job
+from object_store import (
+    OBJECT_STORE_TYPES,
+    ObjectNotFound,
+    ObjectStoreError,
+    ObjectStoreUnavailable,
+    TransferEngine,
+    backend_for_source,
+    validate_config,
+)
+from notebook_cells import (
+    NOTEBOOK_CONTENT_SQL,
+    CellOperationError,
+    NotebookNotFound,
+    NotebookVersionConflict,
+    apply_cell_operation,
+)
+from pipeline_runs import RunTelemetryWriter, get_run_stats
+from pipeline_versions import VersionNotFound, diff_versions, list_versions, load_version, record_version
+from repo_sync import RepositorySyncError, validate_repository_url
+from scheduler import validate_schedule
+from search import search_documents
+from source_reader import (
+    SOURCE_READ_MAX_ROWS,
+    InvalidReadSpec,
+    SourceReadUnavailable,
+    iter_source_batches,
+    parse_columns,
+    parse_filters,
+    parse_partitioning,
+    read_source,
+)
+from source_health import SourceHealthChecker, record_results
+from status_events import StatusEventHub, format_sse
+from tag_filters import InvalidTagFilter, parse_tags, tag_facets, tag_filter
+from upload_dedup import (
+    HASH_HEADER,
+    StreamHasher,
+    dedup_stats,
+    forget_upload,
+    load_manifest,
+    parse_hash_header,
+    record_upload,
+)
+
 load_dotenv()
 
 app = FastAPI(
@@ -27,6 +110,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 security = HTTPBearer()
 
@@ -49,6 +133,35 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+SSE_HEARTBEAT_SECONDS = 15
+
+ENABLE_HEALTH_CHECKS = os.getenv("ENABLE_HEALTH_CHECKS", "false").lower() == "true"
+
+run_telemetry = RunTelemetryWriter(engine)
+status_events = StatusEventHub(DATABASE_URL)
+connectors = ConnectorManager()
+object_transfers = TransferEngine()
+source_health = SourceHealthChecker(engine, connectors)
+
+@app.on_event("startup")
+async def start_background_services():
+    try:
+        get_engine().mark_api_data_dir()
+    except OSError as e:
+        print(f"❌ Could not mark EMBEDDED_DATA_DIR: {e}")
+    run_telemetry.start()
+    connectors.start()
+    await status_events.start()
+    if ENABLE_HEALTH_CHECKS:
+        source_health.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await status_events.stop()
+    source_health.stop()
+    connectors.stop()
+    run_telemetry.stop()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -106,6 +219,26 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "created_at": user[3]
     }
 
+def get_stream_user(request: Request, token: Optional[str] = None) -> str:
+    # EventSource cannot send headers, so streams also accept ?token=. The DB
+    # session is closed before streaming so open streams don't hold pool slots.
+    if token is None:
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            token = auth_header[len("Bearer "):]
+    payload = verify_token(token) if token else None
+    if payload is None or payload.get("type") != "access" or payload.get("user_id") is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    db = SessionLocal()
+    try:
+        user = db.execute(text("SELECT id FROM users WHERE id = :user_id"), {"user_id": payload["user_id"]}).fetchone()
+    finally:
+        db.close()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    return str(user[0])
+
 class UserSignUpRequest(BaseModel):
     email: EmailStr
     password: str
@@ -302,14 +435,73 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user),
         "account_id": user_row[3]
     }
 
+@app.get("/events/status")
+async def stream_status_events(request: Request, user_id: str = Depends(get_stream_user)):
+    queue = status_events.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                    yield format_sse(event)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            status_events.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/bootstrap")
+async def get_bootstrap(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    return load_bootstrap(db, current_user["id"])
+
+@app.get("/search")
+async def search(
+    q: str,
+    types: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else None
+    return search_documents(db, current_user["id"], q, kinds, limit, offset)
+
 @app.get("/workspaces")
-async def get_workspaces(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_workspaces(
+    request: Request,
+    response: Response,
+    tags: Optional[str] = None,
+    match: str = "any",
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        tag_clause, tag_params = tag_filter(parse_tags(tags), match)
+    except InvalidTagFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = collection_etag(
+        db, "workspaces",
+        "SELECT count(*), max(updated_at) FROM workspaces WHERE user_id = :user_id",
+        {"user_id": current_user["id"]}, request
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     result = db.execute(
-        text("""
+        text(f"""
             SELECT id, name, description, category, tags, icon, color, created_at, updated_at
-            FROM workspaces WHERE user_id = :user_id ORDER BY created_at DESC
+            FROM workspaces WHERE user_id = :user_id{tag_clause} ORDER BY created_at DESC
         """),
-        {"user_id": current_user["id"]}
+        {"user_id": current_user["id"], **tag_params}
     )
     workspaces = []
     for row in result:
@@ -326,6 +518,19 @@ async def get_workspaces(current_user: dict = Depends(get_current_user), db: Ses
         })
     return workspaces
 
+@app.get("/workspaces/tags")
+async def get_workspace_tags(
+    tags: Optional[str] = None,
+    match: str = "any",
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        return tag_facets(db, "workspaces", current_user["id"], parse_tags(tags), match, limit)
+    except InvalidTagFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/workspaces")
 async def create_workspace(
     data: Dict[str, Any],
@@ -358,7 +563,8 @@ async def create_workspace(
 async def get_data_sources(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     result = db.execute(
         text("""
-            SELECT id, name, type, config, status, description, created_at, updated_at
+            SELECT id, name, type, config, status, description, created_at, updated_at,
+                   last_tested, last_error, last_latency_ms
             FROM data_sources WHERE user_id = :user_id ORDER BY created_at DESC
         """),
         {"user_id": current_user["id"]}
@@ -373,7 +579,10 @@ async def get_data_sources(current_user: dict = Depends(get_current_user), db: S
             "status": row[4],
             "description": row[5],
             "created_at": row[6].isoformat() if row[6] else None,
-            "updated_at": row[7].isoformat() if row[7] else None
+            "updated_at": row[7].isoformat() if row[7] else None,
+            "last_tested": row[8].isoformat() if row[8] else None,
+            "last_error": row[9],
+            "last_latency_ms": row[10]
         })
     return sources
 
@@ -383,6 +592,16 @@ async def create_data_source(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    if data.get("type") in ("sqlite", "duckdb"):
+        try:
+            build_url(data["type"], data.get("config") or {})
+        except ConnectorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if data.get("type") in OBJECT_STORE_TYPES:
+        try:
+            await asyncio.to_thread(validate_config, data["type"], data.get("config") or {})
+        except ObjectStoreError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     source_id = uuid.uuid4()
     db.execute(
         text("""
@@ -404,12 +623,502 @@ async def create_data_source(
     db.commit()
     return {"id": str(source_id), **data}
 
+@app.delete("/data-sources/{source_id}")
+async def delete_data_source(
+    source_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    row = db.execute(
+        text("DELETE FROM data_sources WHERE id = :id AND user_id = :user_id RETURNING id, type"),
+        {"id": source_id, "user_id": current_user["id"]}
+    ).fetchone()
+    db.commit()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    connectors.invalidate(str(row[0]))
+    if row[1] in EMBEDDED_TYPES:
+        # The files are only reachable through the row, which is gone.
+        await asyncio.to_thread(get_engine().drop_source, {"id": str(row[0])})
+    return {"id": source_id, "deleted": True}
+
+@app.post("/data-sources/{source_id}/test")
+async def test_data_source(
+    source_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    row = db.execute(
+        text("""
+            SELECT id, type, config, updated_at, consecutive_failures
+            FROM data_sources WHERE id = :id AND user_id = :user_id
+        """),
+        {"id": source_id, "user_id": current_user["id"]}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    source = {"id": str(row[0]), "type": row[1], "config": row[2] or {}, "updated_at": row[3], "failures": row[4]}
+    # Connecting to a remote host can take seconds; keep it off the event loop.
+    result = await asyncio.to_thread(test_connection, connectors, source)
+    await asyncio.to_thread(record_results, engine, [source], [{"id": source["id"], **result}])
+    return result
+
+@app.post("/data-sources/test-all")
+async def test_all_data_sources(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    job_id = enqueue(
+        db,
+        "data_sources.test_all",
+        {"user_id": current_user["id"]},
+        lane="high",
+        user_id=current_user["id"],
+        dedupe_key=f"data_sources.test_all:{current_user['id']}"
+    )
+    db.commit()
+    return {"job_id": job_id, "status": "queued" if job_id else "already_queued"}
+
+def load_object_source(db: Session, source_id: str, user_id: str) -> Dict[str, Any]:
+    row = db.execute(
+        text("SELECT id, type, config FROM data_sources WHERE id = :id AND user_id = :user_id"),
+        {"id": source_id, "user_id": user_id}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    if row[1] not in OBJECT_STORE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Data source type '{row[1]}' is not an object store")
+    return {"id": str(row[0]), "type": row[1], "config": row[2] or {}}
+
+def parse_content_hash(request: Request, probe: bool = False) -> Optional[str]:
+    try:
+        digest = parse_hash_header(request.headers.get(HASH_HEADER))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if probe and digest is None:
+        raise HTTPException(status_code=400, detail="probe needs an X-Content-Hash header")
+    return digest
+
+def object_store_http_error(e: ObjectStoreError) -> HTTPException:
+    if isinstance(e, ObjectNotFound):
+        return HTTPException(status_code=404, detail=f"Object not found: {e}")
+    if isinstance(e, ObjectStoreUnavailable):
+        return HTTPException(status_code=503, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+def iter_request_body(request: Request, loop: asyncio.AbstractEventLoop):
+    """Lets a worker thread pull the request body from the event loop one chunk at a time."""
+    stream = request.stream().__aiter__()
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(stream.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+@app.get("/data-sources/{source_id}/objects")
+async def list_source_objects(
+    source_id: str,
+    prefix: str = "",
+    limit: int = 1000,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    source = load_object_source(db, source_id, current_user["id"])
+    try:
+        backend = await asyncio.to_thread(backend_for_source, source)
+        return await asyncio.to_thread(backend.list, prefix, max(1, min(limit, 1000)))
+    except ObjectStoreError as e:
+        raise object_store_http_error(e)
+
+@app.get("/data-sources/{source_id}/objects/content")
+async def read_source_object(
+    source_id: str,
+    key: str,
+    max_bytes: Optional[int] = None,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Streams an object through parallel ranged reads; max_bytes limits it to a preview."""
+    source = load_object_source(db, source_id, current_user["id"])
+    try:
+        backend = await asyncio.to_thread(backend_for_source, source)
+        size = await asyncio.to_thread(backend.size, key)
+    except ObjectStoreError as e:
+        raise object_store_http_error(e)
+    length = size if max_bytes is None else max(0, min(max_bytes, size))
+    headers = {"Content-Length": str(length), "X-Object-Size": str(size)}
+    return StreamingResponse(
+        object_transfers.iter_object(backend, key, end=length - 1),
+        media_type="application/octet-stream", headers=headers
+    )
+
+@app.put("/data-sources/{source_id}/objects/content")
+async def write_source_object(
+    source_id: str,
+    key: str,
+    request: Request,
+    probe: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Uploads the request body as it arrives, in parallel parts, without buffering the whole file.
+
+    The body is hashed on the way through and recorded in the source's upload manifest. With X-Content-Hash and
+    probe=true, content already stored under key is recognised without a body; otherwise the outcome is "missing"."""
+    source = load_object_source(db, source_id, current_user["id"])
+    length = request.headers.get("content-length")
+    size = int(length) if length and length.isdigit() and not probe else None
+    digest = parse_content_hash(request, probe)
+    try:
+        backend = await asyncio.to_thread(backend_for_source, source)
+        entry = load_manifest(db, source_id).get(key) if digest else None
+        if entry is not None and entry["content_hash"] == digest and size in (None, entry["size"]):
+            try:
+                unchanged = await asyncio.to_thread(backend.size, key) == entry["stored_size"]
+            except ObjectNotFound:
+                unchanged = False
+            if unchanged:
+                dedup = {"outcome": "unchanged", "bytes_not_sent": entry["size"]}
+                record_upload(db, source_id, key, entry, dedup)
+                db.commit()
+                return {"key": key, "size": entry["size"], "dedup": dedup}
+        if probe:
+            return {"key": key, "dedup": {"outcome": "missing"}}
+        hasher = StreamHasher()
+        result = await asyncio.to_thread(
+            object_transfers.upload, backend, key,
+            hasher.wrap(iter_request_body(request, asyncio.get_running_loop())), size
+        )
+    except ObjectStoreError as e:
+        raise object_store_http_error(e)
+    dedup = {"outcome": "stored", "bytes_received": hasher.size, "bytes_written": hasher.size}
+    record_upload(db, source_id, key, {**hasher.entry(), "stored_size": hasher.size}, dedup)
+    db.commit()
+    return {**result, "dedup": dedup}
+
+@app.post("/data-sources/{source_id}/read")
+async def read_data_source(
+    source_id: str,
+    data: Dict[str, Any],
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Reads a table or Parquet object with the requested columns and filters pushed down to the source.
+
+    JSON responses are capped at SOURCE_READ_MAX_ROWS. Arrow IPC and Parquet responses (Accept header or
+    "format") stream batch by batch, so they return the whole result unless a limit is given; whole SQL
+    tables can then be read in parallel partitions ("partitioning")."""
+    row = db.execute(
+        text("SELECT id, type, config, updated_at FROM data_sources WHERE id = :id AND user_id = :user_id"),
+        {"id": source_id, "user_id": current_user["id"]}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    source = {"id": str(row[0]), "type": row[1], "config": row[2] or {}, "updated_at": row[3]}
+    try:
+        fmt = negotiate_format(request.headers.get("accept"), data.get("format"))
+        spec = {
+            "table_name": data.get("table"),
+            "key": data.get("key"),
+            "columns": parse_columns(data.get("columns")),
+            "filters": parse_filters(data.get("filters")),
+        }
+        if fmt == "json":
+            limit = max(1, min(int(data.get("limit") or SOURCE_READ_MAX_ROWS), SOURCE_READ_MAX_ROWS))
+            return await asyncio.to_thread(read_source, connectors, object_transfers, source, limit=limit, **spec)
+        limit = int(data["limit"]) if data.get("limit") else None
+        partitioning = parse_partitioning(data.get("partitioning"))
+        chunks = encode_batches(fmt, iter_source_batches(connectors, object_transfers, source, limit=limit,
+                                                         partitioning=partitioning, **spec))
+        # Pull the first chunk (the schema) here, so read errors still become proper status codes.
+        first = await asyncio.to_thread(next, chunks)
+    except (InvalidReadSpec, UnsupportedFormat, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (SourceReadUnavailable, ConnectorUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ConnectorBusy as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ConnectorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ObjectStoreError as e:
+        raise object_store_http_error(e)
+    except EmbeddedEngineError as e:
+        raise embedded_http_error(e)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=400, detail=str(e).splitlines()[0])
+    filename = download_filename(spec["key"] or spec["table_name"] or "result", fmt)
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=RESPONSE_FORMATS[fmt][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept"}
+    )
+
+@app.post("/data-sources/{source_id}/export")
+async def export_data_source(
+    source_id: str,
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queues a write of a read (table or key, columns, filters) into another source.
+
+    target_source_id must be an embedded source, where target names a table, or an object store, where it
+    names a key; both get Parquet, and workers > 1 writes a directory of part files in parallel. A
+    postgresql source is bulk loaded through binary COPY into the existing table named by target, with mode
+    append, merge (upsert) or ignore, keyed on conflict_columns or the primary key. pipeline_id (and
+    node_id) record the write as a run of that pipeline.
+
+    SQL sources can be read incrementally ("incremental": a watermark column, with lookback_seconds and
+    reset), which moves only rows above the pipeline's watermark for the table and needs pipeline_id,
+    and in parallel partitions ("partitioning"). cluster_id runs the export on a process compute cluster."""
+    target_id = data.get("target_source_id")
+    target_name = data.get("target")
+    if not target_id or not isinstance(target_name, str) or not target_name.strip("/"):
+        raise HTTPException(status_code=400, detail="target_source_id and target are required")
+    rows = db.execute(
+        text("SELECT id, type FROM data_sources WHERE id IN (:source_id, :target_id) AND user_id = :user_id"),
+        {"source_id": source_id, "target_id": target_id, "user_id": current_user["id"]}
+    ).fetchall()
+    types = {str(row[0]): row[1] for row in rows}
+    if source_id not in types or target_id not in types:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    target_type = types[target_id]
+    if target_type not in EMBEDDED_TYPES and target_type not in OBJECT_STORE_TYPES and target_type not in BULK_LOAD_TYPES:
+        raise HTTPException(status_code=400, detail=f"Data source type '{target_type}' cannot be an export target")
+    mode = data.get("mode") or "append"
+    if mode not in BULK_LOAD_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(BULK_LOAD_MODES)}")
+    conflict_columns = data.get("conflict_columns")
+    if conflict_columns is not None and (
+        not isinstance(conflict_columns, list) or not all(isinstance(name, str) for name in conflict_columns)
+    ):
+        raise HTTPException(status_code=400, detail="conflict_columns must be a list of column names")
+    if data.get("pipeline_id"):
+        ensure_pipeline_owner(db, data["pipeline_id"], current_user["id"])
+    if data.get("cluster_id"):
+        cluster = db.execute(
+            text("""
+                SELECT cc.compute_type FROM compute_clusters cc JOIN cloud_profiles cp ON cc.cloud_profile_id = cp.id
+                WHERE cc.id = :id AND cp.user_id = :user_id
+            """),
+            {"id": data["cluster_id"], "user_id": current_user["id"]}
+        ).fetchone()
+        if cluster is None:
+            raise HTTPException(status_code=404, detail="Compute cluster not found")
+        if cluster[0] != "process":
+            raise HTTPException(status_code=400, detail="Exports run only on process compute clusters")
+    try:
+        incremental = parse_incremental(data.get("incremental"))
+        partitioning = parse_partitioning(data.get("partitioning"))
+    except InvalidReadSpec as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if (incremental or partitioning) and (types[source_id] not in SQL_DRIVERS or not data.get("table")):
+        raise HTTPException(status_code=400, detail="Incremental and partitioned reads are for SQL source tables")
+    if incremental and not data.get("pipeline_id"):
+        raise HTTPException(status_code=400, detail="Incremental exports need pipeline_id to keep their watermark")
+    if incremental and target_type not in BULK_LOAD_TYPES:
+        raise HTTPException(status_code=400, detail="Incremental exports need a SQL target table; "
+                                                    "Parquet targets would be replaced by the delta")
+    try:
+        payload = {
+            "user_id": current_user["id"],
+            "source_id": source_id,
+            "target_id": target_id,
+            "target": target_name,
+            "table": data.get("table"),
+            "key": data.get("key"),
+            "columns": parse_columns(data.get("columns")),
+            "filters": parse_filters(data.get("filters")),
+            "workers": int(data["workers"]) if data.get("workers") else None,
+            "mode": mode,
+            "conflict_columns": conflict_columns,
+            "pipeline_id": data.get("pipeline_id"),
+            "node_id": data.get("node_id"),
+            "incremental": incremental,
+            "partitioning": partitioning,
+            "cluster_id": data.get("cluster_id"),
+        }
+        if target_type in EMBEDDED_TYPES:
+            get_engine().table_path({"id": target_id}, target_name)
+    except (InvalidReadSpec, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmbeddedEngineError as e:
+        raise embedded_http_error(e)
+    job_id = enqueue(
+        db,
+        "data_sources.export",
+        payload,
+        user_id=current_user["id"],
+        dedupe_key=f"data_sources.export:{target_id}:{target_name}"
+    )
+    db.commit()
+    return {"job_id": job_id, "status": "queued" if job_id else "already_queued"}
+
+def load_embedded_source(db: Session, source_id: str, user_id: str) -> Dict[str, Any]:
+    row = db.execute(
+        text("SELECT id, type FROM data_sources WHERE id = :id AND user_id = :user_id"),
+        {"id": source_id, "user_id": user_id}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    if row[1] not in EMBEDDED_TYPES:
+        raise HTTPException(status_code=400, detail=f"Data source type '{row[1]}' does not hold uploaded files")
+    return {"id": str(row[0]), "type": row[1]}
+
+def embedded_http_error(e: EmbeddedEngineError) -> HTTPException:
+    if isinstance(e, EngineUnavailable):
+        return HTTPException(status_code=503, detail=str(e))
+    if isinstance(e, EngineBusy):
+        return HTTPException(status_code=429, detail=str(e))
+    if isinstance(e, QueryTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+@app.get("/data-sources/{source_id}/tables")
+async def list_embedded_tables(
+    source_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    source = load_embedded_source(db, source_id, current_user["id"])
+    try:
+        return await asyncio.to_thread(get_engine().list_tables, source)
+    except EmbeddedEngineError as e:
+        raise embedded_http_error(e)
+
+@app.put("/data-sources/{source_id}/tables/{table_name}")
+async def upload_embedded_table(
+    source_id: str,
+    table_name: str,
+    filename: str,
+    request: Request,
+    probe: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stores the request body as a queryable table; filename's extension (.csv, .parquet, .xlsx, ...) sets the format.
+
+    Content the source already holds, whether as this table or another, is not stored again (see upload_dedup).
+    With X-Content-Hash, such content is recognised before the body is read; probe=true sends no body at all and
+    gets outcome "missing" when the source does not hold the content."""
+    source = load_embedded_source(db, source_id, current_user["id"])
+    length = request.headers.get("content-length")
+    size = int(length) if length and length.isdigit() and not probe else None
+    digest = parse_content_hash(request, probe)
+    manifest = load_manifest(db, source_id)
+    try:
+        result = None
+        if digest is not None:
+            result = await asyncio.to_thread(get_engine().reuse, source, table_name, filename, digest, size, manifest)
+        if result is None and probe:
+            return {"table": table_name, "dedup": {"outcome": "missing"}}
+        if result is None:
+            result = await asyncio.to_thread(
+                get_engine().store, object_transfers, source, table_name, filename,
+                iter_request_body(request, asyncio.get_running_loop()), size, manifest, digest
+            )
+    except EmbeddedEngineError as e:
+        raise embedded_http_error(e)
+    except ObjectStoreError as e:
+        raise object_store_http_error(e)
+    record_upload(db, source_id, table_name, result.pop("manifest"), result["dedup"])
+    db.commit()
+    return result
+
+@app.delete("/data-sources/{source_id}/tables/{table_name}")
+async def delete_embedded_table(
+    source_id: str,
+    table_name: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    source = load_embedded_source(db, source_id, current_user["id"])
+    if not await asyncio.to_thread(get_engine().drop, source, table_name):
+        raise HTTPException(status_code=404, detail="Table not found")
+    forget_upload(db, source_id, table_name)
+    db.commit()
+    return {"message": "Table deleted successfully"}
+
+@app.get("/data-sources/{source_id}/dedup")
+async def get_upload_dedup_stats(
+    source_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """What content-hash deduplication saved on this source's uploads: per file and in total."""
+    row = db.execute(
+        text("SELECT id FROM data_sources WHERE id = :id AND user_id = :user_id"),
+        {"id": source_id, "user_id": current_user["id"]}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    return dedup_stats(db, source_id)
+
+@app.post("/data-sources/{source_id}/query")
+async def query_embedded_source(
+    source_id: str,
+    data: Dict[str, Any],
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Runs one SELECT over the source's uploaded files, in place.
+
+    Responses are negotiated like /read: JSON is capped at SOURCE_READ_MAX_ROWS, while Arrow IPC and Parquet
+    stream the whole result unless a limit is given."""
+    source = load_embedded_source(db, source_id, current_user["id"])
+    sql = data.get("sql")
+    if not isinstance(sql, str) or not sql.strip():
+        raise HTTPException(status_code=400, detail="sql is required")
+    parameters = data.get("parameters") or []
+    if not isinstance(parameters, list):
+        raise HTTPException(status_code=400, detail="parameters must be a list")
+    try:
+        fmt = negotiate_format(request.headers.get("accept"), data.get("format"))
+        if fmt == "json":
+            limit = max(1, min(int(data.get("limit") or SOURCE_READ_MAX_ROWS), SOURCE_READ_MAX_ROWS))
+        else:
+            limit = int(data["limit"]) if data.get("limit") else None
+        stats = {"rows_in": 0, "bytes_in": 0, "metrics": {}}
+        batches = get_engine().query(source, sql, parameters, limit=limit, stats=stats)
+        if fmt == "json":
+            def collect() -> Dict[str, Any]:
+                names, rows = [], []
+                for batch in batches:
+                    names = batch.schema.names
+                    rows.extend(list(row.values()) for row in batch.to_pylist())
+                return {"columns": names, "rows": rows, "stats": stats}
+            return await asyncio.to_thread(collect)
+        chunks = encode_batches(fmt, batches)
+        first = await asyncio.to_thread(next, chunks)
+    except (UnsupportedFormat, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EmbeddedEngineError as e:
+        raise embedded_http_error(e)
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=RESPONSE_FORMATS[fmt][0],
+        headers={"Content-Disposition": f'attachment; filename="{download_filename("query", fmt)}"', "Vary": "Accept"}
+    )
+
 @app.get("/pipelines")
-async def get_pipelines(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_pipelines(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    etag = collection_etag(
+        db, "pipelines",
+        "SELECT count(*), max(updated_at) FROM pipelines WHERE user_id = :user_id",
+        {"user_id": current_user["id"]}, request
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     result = db.execute(
         text("""
             SELECT id, workspace_id, name, description, cloud_provider, git_repo_url, git_branch,
-                   workflow_yaml, pipeline_graph, status, created_at, updated_at
+                   workflow_yaml, pipeline_graph, status, created_at, updated_at,
+                   schedule_cron, schedule_timezone
             FROM pipelines WHERE user_id = :user_id ORDER BY created_at DESC
         """),
         {"user_id": current_user["id"]}
@@ -424,11 +1133,13 @@ async def get_pipelines(current_user: dict = Depends(get_current_user), db: Sess
             "cloud_provider": row[4],
             "git_repo_url": row[5],
             "git_branch": row[6],
-            "workflow_yaml": row[7],
+            "workflow_yaml": resolve_text(row[7]),
             "pipeline_graph": row[8],
             "status": row[9],
             "created_at": row[10].isoformat() if row[10] else None,
-            "updated_at": row[11].isoformat() if row[11] else None
+            "updated_at": row[11].isoformat() if row[11] else None,
+            "schedule_cron": row[12],
+            "schedule_timezone": row[13]
         })
     return pipelines
 
@@ -444,7 +1155,8 @@ async def create_pipeline(
             INSERT INTO pipelines (id, user_id, workspace_id, name, description, cloud_provider,
                                  git_repo_url, git_branch, workflow_yaml, pipeline_graph, status, created_at, updated_at)
             VALUES (:id, :user_id, :workspace_id, :name, :description, :cloud_provider,
-                    :git_repo_url, :git_branch, :workflow_yaml, :pipeline_graph, :status, :created_at, :updated_at)
+                    :git_repo_url, :git_branch, :workflow_yaml, CAST(:pipeline_graph AS jsonb), :status,
+                    :created_at, :updated_at)
         """),
         {
             "id": pipeline_id,
@@ -455,13 +1167,15 @@ async def create_pipeline(
             "cloud_provider": data.get("cloud_provider", "aws"),
             "git_repo_url": data.get("git_repo_url"),
             "git_branch": data.get("git_branch", "main"),
-            "workflow_yaml": data.get("workflow_yaml"),
-            "pipeline_graph": data.get("pipeline_graph", {"nodes": [], "edges": []}),
+            "workflow_yaml": externalize_text(db, data.get("workflow_yaml")),
+            "pipeline_graph": json.dumps(data.get("pipeline_graph", {"nodes": [], "edges": []})),
             "status": "draft",
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
     )
+    record_version(db, str(pipeline_id), current_user["id"], data.get("pipeline_graph", {"nodes": [], "edges": []}),
+                   data.get("workflow_yaml"), data.get("version_message") or "Created")
     db.commit()
     return {"id": str(pipeline_id), **data}
 
@@ -472,11 +1186,11 @@ async def update_pipeline(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db.execute(
+    result = db.execute(
         text("""
             UPDATE pipelines
             SET name = :name, description = :description, workflow_yaml = :workflow_yaml,
-                pipeline_graph = :pipeline_graph, updated_at = :updated_at
+                pipeline_graph = CAST(:pipeline_graph AS jsonb), updated_at = :updated_at
             WHERE id = :id AND user_id = :user_id
         """),
         {
@@ -484,16 +1198,331 @@ async def update_pipeline(
             "user_id": current_user["id"],
             "name": data.get("name"),
             "description": data.get("description"),
-            "workflow_yaml": data.get("workflow_yaml"),
-            "pipeline_graph": data.get("pipeline_graph"),
+            "workflow_yaml": externalize_text(db, data.get("workflow_yaml")),
+            "pipeline_graph": json.dumps(data["pipeline_graph"]) if data.get("pipeline_graph") is not None else None,
             "updated_at": datetime.utcnow()
         }
     )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    # Same transaction as the UPDATE, whose row lock serializes concurrent saves.
+    saved = record_version(db, pipeline_id, current_user["id"], data.get("pipeline_graph"),
+                           data.get("workflow_yaml"), data.get("version_message"))
+    db.commit()
+    return {"id": pipeline_id, **data, "version": saved["version"]}
+
+def ensure_pipeline_owner(db: Session, pipeline_id: str, user_id: str):
+    result = db.execute(
+        text("SELECT id FROM pipelines WHERE id = :id AND user_id = :user_id"),
+        {"id": pipeline_id, "user_id": user_id}
+    )
+    if result.fetchone() is None:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+
+@app.get("/pipelines/{pipeline_id}/versions")
+async def get_pipeline_versions(
+    pipeline_id: str,
+    limit: int = 100,
+    before: Optional[int] = None,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    return list_versions(db, pipeline_id, min(max(limit, 1), 500), before)
+
+@app.get("/pipelines/{pipeline_id}/versions/diff")
+async def diff_pipeline_versions(
+    pipeline_id: str,
+    from_version: int,
+    to_version: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    try:
+        return diff_versions(db, pipeline_id, from_version, to_version)
+    except VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/pipelines/{pipeline_id}/versions/{version}")
+async def get_pipeline_version(
+    pipeline_id: str,
+    version: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    try:
+        return load_version(db, pipeline_id, version)
+    except VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/pipelines/{pipeline_id}/versions/{version}/restore")
+async def restore_pipeline_version(
+    pipeline_id: str,
+    version: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    try:
+        restored = load_version(db, pipeline_id, version)
+    except VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    db.execute(
+        text("""
+            UPDATE pipelines
+            SET workflow_yaml = :workflow_yaml, pipeline_graph = CAST(:pipeline_graph AS jsonb), updated_at = :updated_at
+            WHERE id = :id
+        """),
+        {
+            "id": pipeline_id,
+            "workflow_yaml": externalize_text(db, restored["workflow_yaml"]),
+            "pipeline_graph": json.dumps(restored["pipeline_graph"]),
+            "updated_at": datetime.utcnow()
+        }
+    )
+    saved = record_version(db, pipeline_id, current_user["id"], restored["pipeline_graph"],
+                           restored["workflow_yaml"], f"Restored version {version}")
+    db.commit()
+    return {"id": pipeline_id, "restored_from": version, "version": saved["version"]}
+
+@app.put("/pipelines/{pipeline_id}/schedule")
+async def update_pipeline_schedule(
+    pipeline_id: str,
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    cron = data.get("schedule_cron") or None
+    tz_name = data.get("schedule_timezone") or "UTC"
+    if cron:
+        try:
+            validate_schedule(cron, tz_name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    status_value = "active" if cron and data.get("enabled", True) else "inactive"
+
+    db.execute(
+        text("""
+            UPDATE pipelines
+            SET schedule_cron = :schedule_cron, schedule_timezone = :schedule_timezone,
+                status = :status, updated_at = :updated_at
+            WHERE id = :id AND user_id = :user_id
+        """),
+        {
+            "id": pipeline_id,
+            "user_id": current_user["id"],
+            "schedule_cron": cron,
+            "schedule_timezone": tz_name,
+            "status": status_value,
+            "updated_at": datetime.utcnow()
+        }
+    )
+    db.commit()
+    return {"id": pipeline_id, "schedule_cron": cron, "schedule_timezone": tz_name, "status": status_value}
+
+@app.post("/pipelines/{pipeline_id}/run")
+async def run_pipeline(
+    pipeline_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    # No job worker handles "pipeline.run" yet, so a queued run would only fail; say so instead.
+    raise HTTPException(
+        status_code=501,
+        detail="Pipelines are not executed by this server yet; deploy the pipeline's workflow YAML to run it"
+    )
+
+@app.post("/pipelines/{pipeline_id}/runs")
+async def record_pipeline_run(
+    pipeline_id: str,
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    try:
+        run_id = run_telemetry.record(pipeline_id, data)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid run record: {str(e)}")
+    return {"id": run_id, "pipeline_id": pipeline_id}
+
+@app.get("/pipelines/{pipeline_id}/runs")
+async def get_pipeline_runs(
+    pipeline_id: str,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    result = db.execute(
+        text("""
+            SELECT id, status, trigger, started_at, finished_at, duration_ms, rows_in, rows_out,
+                   bytes_in, bytes_out, peak_memory_bytes, spill_bytes, error, rows_scanned, bytes_skipped
+            FROM pipeline_runs WHERE pipeline_id = :pipeline_id
+            ORDER BY started_at DESC LIMIT :limit
+        """),
+        {"pipeline_id": pipeline_id, "limit": min(max(limit, 1), 500)}
+    )
+    runs = []
+    for row in result:
+        runs.append({
+            "id": str(row[0]),
+            "status": row[1],
+            "trigger": row[2],
+            "started_at": row[3].isoformat() if row[3] else None,
+            "finished_at": row[4].isoformat() if row[4] else None,
+            "duration_ms": row[5],
+            "rows_in": row[6],
+            "rows_out": row[7],
+            "bytes_in": row[8],
+            "bytes_out": row[9],
+            "peak_memory_bytes": row[10],
+            "spill_bytes": row[11],
+            "error": row[12],
+            "rows_scanned": row[13],
+            "bytes_skipped": row[14]
+        })
+    return runs
+
+@app.get("/pipelines/{pipeline_id}/runs/stats")
+async def get_pipeline_run_stats(
+    pipeline_id: str,
+    days: int = 30,
+    status: Optional[str] = "succeeded",
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    since = datetime.utcnow() - timedelta(days=days)
+    return get_run_stats(db, pipeline_id, since, status or None)
+
+@app.get("/pipelines/{pipeline_id}/runs/{run_id}")
+async def get_pipeline_run(
+    pipeline_id: str,
+    run_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    result = db.execute(
+        text("""
+            SELECT id, status, trigger, started_at, finished_at, duration_ms, error
+            FROM pipeline_runs WHERE id = :id AND pipeline_id = :pipeline_id
+        """),
+        {"id": run_id, "pipeline_id": pipeline_id}
+    )
+    run = result.fetchone()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    result = db.execute(
+        text("""
+            SELECT node_id, node_type, status, started_at, finished_at, duration_ms, rows_in, rows_out,
+                   bytes_in, bytes_out, peak_memory_bytes, spill_bytes, metrics, rows_scanned, bytes_skipped
+            FROM pipeline_node_runs WHERE run_id = :run_id ORDER BY started_at
+        """),
+        {"run_id": run_id}
+    )
+    nodes = []
+    for row in result:
+        nodes.append({
+            "node_id": row[0],
+            "node_type": row[1],
+            "status": row[2],
+            "started_at": row[3].isoformat() if row[3] else None,
+            "finished_at": row[4].isoformat() if row[4] else None,
+            "duration_ms": row[5],
+            "rows_in": row[6],
+            "rows_out": row[7],
+            "bytes_in": row[8],
+            "bytes_out": row[9],
+            "peak_memory_bytes": row[10],
+            "spill_bytes": row[11],
+            "rows_scanned": row[13],
+            "bytes_skipped": row[14],
+            "metrics": row[12] or {}
+        })
+
+    return {
+        "id": str(run[0]),
+        "pipeline_id": pipeline_id,
+        "status": run[1],
+        "trigger": run[2],
+        "started_at": run[3].isoformat() if run[3] else None,
+        "finished_at": run[4].isoformat() if run[4] else None,
+        "duration_ms": run[5],
+        "error": run[6],
+        "nodes": nodes
+    }
+
+@app.get("/pipelines/{pipeline_id}/watermarks")
+async def get_pipeline_watermarks(
+    pipeline_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    result = db.execute(
+        text("""
+            SELECT source_id, table_name, column_name, value_type, value, last_rows, total_rows, updated_at
+            FROM extraction_watermarks WHERE pipeline_id = :pipeline_id ORDER BY source_id, table_name
+        """),
+        {"pipeline_id": pipeline_id}
+    )
+    return [
+        {
+            "source_id": str(row[0]),
+            "table": row[1],
+            "column": row[2],
+            "value_type": row[3],
+            "value": row[4],
+            "last_rows": row[5],
+            "total_rows": row[6],
+            "updated_at": row[7].isoformat() if row[7] else None
+        }
+        for row in result
+    ]
+
+@app.delete("/pipelines/{pipeline_id}/watermarks")
+async def reset_pipeline_watermarks(
+    pipeline_id: str,
+    source_id: Optional[str] = None,
+    table: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Forgets watermarks (all of them, or one source's, or one table's), so the next export reads in full."""
+    ensure_pipeline_owner(db, pipeline_id, current_user["id"])
+    result = db.execute(
+        text("""
+            DELETE FROM extraction_watermarks WHERE pipeline_id = :pipeline_id
+            AND (CAST(:source_id AS uuid) IS NULL OR source_id = CAST(:source_id AS uuid))
+            AND (CAST(:table_name AS text) IS NULL OR table_name = :table_name)
+        """),
+        {"pipeline_id": pipeline_id, "source_id": source_id, "table_name": table}
+    )
     db.commit()
-    return {"id": pipeline_id, **data}
+    return {"deleted": result.rowcount}
 
 @app.get("/cloud-profiles")
-async def get_cloud_profiles(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_cloud_profiles(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    etag = collection_etag(
+        db, "cloud-profiles",
+        "SELECT count(*), max(updated_at) FROM cloud_profiles WHERE user_id = :user_id",
+        {"user_id": current_user["id"]}, request
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     result = db.execute(
         text("""
             SELECT id, name, provider, region, external_id, custom_domain, status, created_at, updated_at
@@ -545,11 +1574,29 @@ async def create_cloud_profile(
     return {"id": str(profile_id), **data}
 
 @app.get("/compute-clusters")
-async def get_compute_clusters(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_compute_clusters(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    etag = collection_etag(
+        db, "compute-clusters",
+        """
+            SELECT count(*), max(cc.updated_at)
+            FROM compute_clusters cc JOIN cloud_profiles cp ON cc.cloud_profile_id = cp.id
+            WHERE cp.user_id = :user_id
+        """,
+        {"user_id": current_user["id"]}, request
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     result = db.execute(
         text("""
             SELECT cc.id, cc.cloud_profile_id, cc.name, cc.compute_type, cc.node_type,
-                   cc.num_workers, cc.auto_scaling, cc.status, cc.endpoint_url, cc.created_at, cc.updated_at
+                   cc.num_workers, cc.auto_scaling, cc.status, cc.endpoint_url, cc.created_at, cc.updated_at,
+                   cc.min_workers, cc.max_workers
             FROM compute_clusters cc
             JOIN cloud_profiles cp ON cc.cloud_profile_id = cp.id
             WHERE cp.user_id = :user_id ORDER BY cc.created_at DESC
@@ -569,7 +1616,9 @@ async def get_compute_clusters(current_user: dict = Depends(get_current_user), d
             "status": row[7],
             "endpoint_url": row[8],
             "created_at": row[9].isoformat() if row[9] else None,
-            "updated_at": row[10].isoformat() if row[10] else None
+            "updated_at": row[10].isoformat() if row[10] else None,
+            "min_workers": row[11],
+            "max_workers": row[12]
         })
     return clusters
 
@@ -583,9 +1632,11 @@ async def create_compute_cluster(
     db.execute(
         text("""
             INSERT INTO compute_clusters (id, cloud_profile_id, name, compute_type, node_type,
-                                        num_workers, auto_scaling, status, created_at, updated_at)
+                                        num_workers, auto_scaling, min_workers, max_workers,
+                                        status, created_at, updated_at)
             VALUES (:id, :cloud_profile_id, :name, :compute_type, :node_type,
-                    :num_workers, :auto_scaling, :status, :created_at, :updated_at)
+                    :num_workers, :auto_scaling, :min_workers, :max_workers,
+                    :status, :created_at, :updated_at)
         """),
         {
             "id": cluster_id,
@@ -595,6 +1646,8 @@ async def create_compute_cluster(
             "node_type": data.get("node_type"),
             "num_workers": data.get("num_workers", 2),
             "auto_scaling": data.get("auto_scaling", False),
+            "min_workers": data.get("min_workers", 1),
+            "max_workers": data.get("max_workers", 10),
             "status": "stopped",
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
@@ -603,30 +1656,116 @@ async def create_compute_cluster(
     db.commit()
     return {"id": str(cluster_id), **data}
 
+@app.post("/compute-clusters/{cluster_id}/start")
+async def start_compute_cluster(
+    cluster_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = db.execute(
+        text("""
+            UPDATE compute_clusters cc SET status = 'starting', updated_at = :updated_at
+            FROM cloud_profiles cp
+            WHERE cc.id = :id AND cc.cloud_profile_id = cp.id AND cp.user_id = :user_id
+              AND cc.status IN ('stopped', 'terminated', 'error')
+            RETURNING cc.id
+        """),
+        {"id": cluster_id, "user_id": current_user["id"], "updated_at": datetime.utcnow()}
+    )
+    if result.fetchone() is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Cluster not found or already running")
+
+    job_id = enqueue(
+        db,
+        "cluster.start",
+        {"cluster_id": cluster_id},
+        lane="high",
+        user_id=current_user["id"],
+        dedupe_key=f"cluster.start:{cluster_id}"
+    )
+    db.commit()
+    return {"id": cluster_id, "status": "starting", "job_id": job_id}
+
+@app.post("/compute-clusters/{cluster_id}/stop")
+async def stop_compute_cluster(
+    cluster_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = db.execute(
+        text("""
+            UPDATE compute_clusters cc SET status = 'stopped', updated_at = :updated_at
+            FROM cloud_profiles cp
+            WHERE cc.id = :id AND cc.cloud_profile_id = cp.id AND cp.user_id = :user_id
+              AND cc.status IN ('starting', 'running', 'error')
+            RETURNING cc.id
+        """),
+        {"id": cluster_id, "user_id": current_user["id"], "updated_at": datetime.utcnow()}
+    )
+    if result.fetchone() is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Cluster not found or not running")
+    db.commit()
+    return {"id": cluster_id, "status": "stopped"}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = get_job(db, job_id, current_user["id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def serialize_notebook(row) -> Dict[str, Any]:
+    return {
+        "id": str(row[0]),
+        "workspace_id": str(row[1]),
+        "name": row[2],
+        "language": row[3],
+        "content": row[4],
+        "cluster_id": str(row[5]) if row[5] else None,
+        "created_at": row[6].isoformat() if row[6] else None,
+        "updated_at": row[7].isoformat() if row[7] else None,
+        "version": row[8]
+    }
+
 @app.get("/notebooks")
 async def get_notebooks(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     result = db.execute(
-        text("""
-            SELECT n.id, n.workspace_id, n.name, n.language, n.content, n.cluster_id, n.created_at, n.updated_at
+        text(f"""
+            SELECT n.id, n.workspace_id, n.name, n.language, {NOTEBOOK_CONTENT_SQL}, n.cluster_id,
+                   n.created_at, n.updated_at, n.version
             FROM notebooks n
             JOIN workspaces w ON n.workspace_id = w.id
             WHERE w.user_id = :user_id ORDER BY n.created_at DESC
         """),
         {"user_id": current_user["id"]}
     )
-    notebooks = []
-    for row in result:
-        notebooks.append({
-            "id": str(row[0]),
-            "workspace_id": str(row[1]),
-            "name": row[2],
-            "language": row[3],
-            "content": row[4],
-            "cluster_id": str(row[5]) if row[5] else None,
-            "created_at": row[6].isoformat() if row[6] else None,
-            "updated_at": row[7].isoformat() if row[7] else None
-        })
-    return notebooks
+    return [serialize_notebook(row) for row in result]
+
+@app.get("/notebooks/{notebook_id}")
+async def get_notebook(
+    notebook_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    row = db.execute(
+        text(f"""
+            SELECT n.id, n.workspace_id, n.name, n.language, {NOTEBOOK_CONTENT_SQL}, n.cluster_id,
+                   n.created_at, n.updated_at, n.version
+            FROM notebooks n
+            JOIN workspaces w ON n.workspace_id = w.id
+            WHERE n.id = :id AND w.user_id = :user_id
+        """),
+        {"id": notebook_id, "user_id": current_user["id"]}
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    return serialize_notebook(row)
 
 @app.post("/notebooks")
 async def create_notebook(
@@ -638,14 +1777,14 @@ async def create_notebook(
     db.execute(
         text("""
             INSERT INTO notebooks (id, workspace_id, name, language, content, cluster_id, created_at, updated_at)
-            VALUES (:id, :workspace_id, :name, :language, :content, :cluster_id, :created_at, :updated_at)
+            VALUES (:id, :workspace_id, :name, :language, CAST(:content AS jsonb), :cluster_id, :created_at, :updated_at)
         """),
         {
             "id": notebook_id,
             "workspace_id": data.get("workspace_id"),
             "name": data.get("name"),
             "language": data.get("language", "python"),
-            "content": data.get("content", {"cells": []}),
+            "content": json.dumps(externalize_notebook_content(db, data.get("content", {"cells": []}))),
             "cluster_id": data.get("cluster_id"),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
@@ -654,14 +1793,139 @@ async def create_notebook(
     db.commit()
     return {"id": str(notebook_id), **data}
 
-@app.get("/saved-queries")
-async def get_saved_queries(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.put("/notebooks/{notebook_id}")
+async def update_notebook(
+    notebook_id: str,
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Whole-document save: replaces the cells and returns the notebook to document mode.
     result = db.execute(
         text("""
+            UPDATE notebooks n
+            SET name = COALESCE(:name, n.name),
+                language = COALESCE(:language, n.language),
+                content = COALESCE(CAST(:content AS jsonb), n.content),
+                cells_normalized = CASE WHEN :has_content THEN false ELSE n.cells_normalized END,
+                cluster_id = CASE WHEN :has_cluster THEN CAST(:cluster_id AS uuid) ELSE n.cluster_id END,
+                version = n.version + 1,
+                updated_at = :updated_at
+            FROM workspaces w
+            WHERE n.id = :id AND w.id = n.workspace_id AND w.user_id = :user_id
+              AND (CAST(:expected AS integer) IS NULL OR n.version = :expected)
+            RETURNING n.version
+        """),
+        {
+            "id": notebook_id,
+            "user_id": current_user["id"],
+            "name": data.get("name"),
+            "language": data.get("language"),
+            "content": json.dumps(externalize_notebook_content(db, data["content"])) if "content" in data else None,
+            "has_content": "content" in data,
+            "has_cluster": "cluster_id" in data,
+            "cluster_id": data.get("cluster_id"),
+            "expected": data.get("version"),
+            "updated_at": datetime.utcnow()
+        }
+    ).fetchone()
+    if result is None:
+        exists = db.execute(
+            text("""
+                SELECT n.version FROM notebooks n JOIN workspaces w ON w.id = n.workspace_id
+                WHERE n.id = :id AND w.user_id = :user_id
+            """),
+            {"id": notebook_id, "user_id": current_user["id"]}
+        ).fetchone()
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Notebook not found")
+        raise HTTPException(status_code=409, detail=f"Notebook has been modified (current version {exists[0]})")
+    db.commit()
+    return {"id": notebook_id, "version": result[0]}
+
+@app.patch("/notebooks/{notebook_id}/cells/{cell_id}")
+async def patch_notebook_cell(
+    notebook_id: str,
+    cell_id: str,
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    cell = data.get("cell")
+    if isinstance(cell, dict) and "output" in cell:
+        data = {**data, "cell": {**cell, "output": externalize_text(db, cell["output"])}}
+    try:
+        result = apply_cell_operation(db, notebook_id, cell_id, current_user["id"], data)
+    except NotebookNotFound:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    except NotebookVersionConflict as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except CellOperationError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    return {"notebook_id": notebook_id, **result}
+
+@app.get("/blobs/{sha256}")
+async def get_blob(
+    sha256: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    info = get_blob_info(db, sha256)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    # Content-addressed, so the hash is a strong validator and the body never changes.
+    headers = {
+        "ETag": f'"{sha256}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    size = info["size"]
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+        if request.headers.get("if-range") not in (None, headers["ETag"]):
+            byte_range = None
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+
+    store = get_blob_store()
+    start, end = byte_range or (0, size - 1)
+    try:
+        store.locate(sha256)
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+    if byte_range is None:
+        return StreamingResponse(store.stream(sha256), media_type=info["content_type"], headers=headers)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        store.stream(sha256, start, end), status_code=206, media_type=info["content_type"], headers=headers
+    )
+
+@app.get("/saved-queries")
+async def get_saved_queries(
+    tags: Optional[str] = None,
+    match: str = "any",
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        tag_clause, tag_params = tag_filter(parse_tags(tags), match)
+    except InvalidTagFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = db.execute(
+        text(f"""
             SELECT id, name, description, query_text, tags, is_favorite, created_at, updated_at
-            FROM saved_queries WHERE user_id = :user_id ORDER BY created_at DESC
+            FROM saved_queries WHERE user_id = :user_id{tag_clause} ORDER BY created_at DESC
         """),
-        {"user_id": current_user["id"]}
+        {"user_id": current_user["id"], **tag_params}
     )
     queries = []
     for row in result:
@@ -677,6 +1941,19 @@ async def get_saved_queries(current_user: dict = Depends(get_current_user), db:
         })
     return queries
 
+@app.get("/saved-queries/tags")
+async def get_saved_query_tags(
+    tags: Optional[str] = None,
+    match: str = "any",
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        return tag_facets(db, "saved_queries", current_user["id"], parse_tags(tags), match, limit)
+    except InvalidTagFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/saved-queries")
 async def create_saved_query(
     data: Dict[str, Any],
@@ -704,6 +1981,219 @@ async def create_saved_query(
     db.commit()
     return {"id": str(query_id), **data}
 
+def serialize_repository(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "workspace_id": str(row[1]) if row[1] else None,
+        "name": row[2],
+        "provider": row[3],
+        "url": row[4],
+        "branch": row[5],
+        "description": row[6],
+        "status": row[7],
+        "last_synced_commit": row[8],
+        "last_sync": row[9].isoformat() if row[9] else None,
+        "last_error": row[10],
+        "created_at": row[11].isoformat() if row[11] else None,
+        "updated_at": row[12].isoformat() if row[12] else None
+    }
+
+REPOSITORY_COLUMNS = """
+    id, workspace_id, name, provider, url, branch, description, status,
+    last_synced_commit, last_sync, last_error, created_at, updated_at
+"""
+
+@app.get("/repositories")
+async def get_repositories(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    result = db.execute(
+        text(f"SELECT {REPOSITORY_COLUMNS} FROM repositories WHERE user_id = :user_id ORDER BY created_at DESC"),
+        {"user_id": current_user["id"]}
+    )
+    return [serialize_repository(row) for row in result]
+
+@app.get("/repositories/{repository_id}")
+async def get_repository(
+    repository_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = db.execute(
+        text(f"SELECT {REPOSITORY_COLUMNS} FROM repositories WHERE id = :id AND user_id = :user_id"),
+        {"id": repository_id, "user_id": current_user["id"]}
+    )
+    row = result.fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    return serialize_repository(row)
+
+@app.post("/repositories")
+async def create_repository(
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not data.get("url"):
+        raise HTTPException(status_code=400, detail="Repository url is required")
+    try:
+        validate_repository_url(data["url"])
+    except RepositorySyncError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    branch = data.get("branch", "main")
+    # Re-adding a repository the user already tracks refreshes its credentials instead of duplicating it.
+    existing = db.execute(
+        text("""
+            UPDATE repositories SET username = :username, access_token = :access_token, updated_at = now()
+            WHERE id = (
+                SELECT id FROM repositories WHERE user_id = :user_id AND url = :url AND branch = :branch
+                ORDER BY created_at LIMIT 1
+            )
+            RETURNING id
+        """),
+        {"user_id": current_user["id"], "url": data["url"], "branch": branch,
+         "username": data.get("username"), "access_token": data.get("access_token")}
+    ).scalar()
+    if existing is not None:
+        db.commit()
+        return {"id": str(existing), **{k: v for k, v in data.items() if k != "access_token"}}
+    repository_id = uuid.uuid4()
+    db.execute(
+        text("""
+            INSERT INTO repositories (id, user_id, workspace_id, name, provider, url, branch, username,
+                                      access_token, description, status, created_at, updated_at)
+            VALUES (:id, :user_id, :workspace_id, :name, :provider, :url, :branch, :username,
+                    :access_token, :description, 'disconnected', :created_at, :updated_at)
+        """),
+        {
+            "id": repository_id,
+            "user_id": current_user["id"],
+            "workspace_id": data.get("workspace_id"),
+            "name": data.get("name") or data["url"].rstrip("/").split("/")[-1],
+            "provider": data.get("provider", "generic"),
+            "url": data["url"],
+            "branch": branch,
+            "username": data.get("username"),
+            "access_token": data.get("access_token"),
+            "description": data.get("description"),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+    )
+    db.commit()
+    return {"id": str(repository_id), **{k: v for k, v in data.items() if k != "access_token"}}
+
+@app.delete("/repositories/{repository_id}")
+async def delete_repository(
+    repository_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = db.execute(
+        text("DELETE FROM repositories WHERE id = :id AND user_id = :user_id"),
+        {"id": repository_id, "user_id": current_user["id"]}
+    )
+    db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    return {"id": repository_id, "deleted": True}
+
+@app.post("/repositories/{repository_id}/sync")
+async def sync_repository(
+    repository_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = db.execute(
+        text("SELECT id FROM repositories WHERE id = :id AND user_id = :user_id"),
+        {"id": repository_id, "user_id": current_user["id"]}
+    )
+    if result.fetchone() is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
+
+    job_id = enqueue(
+        db,
+        "repository.sync",
+        {"repository_id": repository_id},
+        user_id=current_user["id"],
+        dedupe_key=f"repository.sync:{repository_id}"
+    )
+    db.commit()
+    return {"id": repository_id, "job_id": job_id, "status": "queued" if job_id else "already_queued"}
+
+@app.post("/git-import")
+async def git_import(
+    data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    url = data.get("url") or data.get("repoUrl")
+    if not url:
+        raise HTTPException(status_code=400, detail="Repository url is required")
+    try:
+        validate_repository_url(url)
+    except RepositorySyncError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    branch = data.get("branch") or "main"
+    kinds = data.get("kinds") or ["notebook", "pipeline"]
+    if not set(kinds) <= {"notebook", "pipeline"}:
+        raise HTTPException(status_code=400, detail="kinds must be notebook and/or pipeline")
+
+    # Imports are tracked as a repository so later imports and syncs can skip unchanged blobs.
+    row = db.execute(
+        text("""
+            SELECT id FROM repositories
+            WHERE user_id = :user_id AND url = :url AND branch = :branch
+            ORDER BY created_at LIMIT 1
+        """),
+        {"user_id": current_user["id"], "url": url, "branch": branch}
+    ).fetchone()
+    if row is None:
+        workspace_id = data.get("workspace_id") or db.execute(
+            text("SELECT id FROM workspaces WHERE user_id = :user_id ORDER BY created_at LIMIT 1"),
+            {"user_id": current_user["id"]}
+        ).scalar()
+        repository_id = str(uuid.uuid4())
+        db.execute(
+            text("""
+                INSERT INTO repositories (id, user_id, workspace_id, name, provider, url, branch, username,
+                                          access_token, status, created_at, updated_at)
+                VALUES (:id, :user_id, :workspace_id, :name, :provider, :url, :branch, :username,
+                        :access_token, 'disconnected', :now, :now)
+            """),
+            {
+                "id": repository_id,
+                "user_id": current_user["id"],
+                "workspace_id": workspace_id,
+                "name": url.rstrip("/").split("/")[-1].removesuffix(".git"),
+                "provider": data.get("provider", "generic"),
+                "url": url,
+                "branch": branch,
+                "username": data.get("username"),
+                "access_token": data.get("access_token"),
+                "now": datetime.utcnow()
+            }
+        )
+    else:
+        repository_id = str(row[0])
+        if data.get("access_token"):
+            db.execute(
+                text("""
+                    UPDATE repositories SET username = :username, access_token = :access_token, updated_at = now()
+                    WHERE id = :id
+                """),
+                {"id": repository_id, "username": data.get("username"), "access_token": data["access_token"]}
+            )
+
+    path = (data.get("path") or "").strip("/")
+    job_id = enqueue(
+        db,
+        "repository.import",
+        {"repository_id": repository_id, "path": path, "kinds": sorted(kinds)},
+        user_id=current_user["id"],
+        dedupe_key=f"repository.import:{repository_id}:{path}:{','.join(sorted(kinds))}"
+    )
+    db.commit()
+    return {"repository_id": repository_id, "job_id": job_id, "status": "queued" if job_id else "already_queued"}
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting IceCube Complete RDS API...")
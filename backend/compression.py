@@ -0,0 +1,280 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) as ASGI middleware.
+
+The encoding is picked from Accept-Encoding by q-value, preferring zstd, then
+br, then gzip on ties; brotli and zstd are used only when their packages
+(brotli, zstandard) are installed. Bodies below minimum_size go out as-is.
+Streaming responses are compressed chunk by chunk with a flush after each
+one, so a slow stream still reaches the client as it is produced.
+
+Server-sent events, already-encoded bodies, range responses and media types
+that are compressed already pass through untouched. Compressed responses
+get "Vary: Accept-Encoding" and their strong ETag gets an encoding suffix
+("abc" -> "abc-gzip"), since each encoding is a different representation.
+http_cache strips the suffix again when matching If-None-Match.
+
+Benchmark on synthetic pipeline and notebook payloads:
+    python compression.py
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip",
+                      "application/gzip", "application/zstd", "application/x-brotli", "application/vnd.apache.parquet")
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return tuple(
+        encoding for encoding in ENCODING_PREFERENCE
+        if encoding == "gzip" or (encoding == "br" and brotli) or (encoding == "zstd" and zstandard)
+    )
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    for encoding in ENCODING_PREFERENCE:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def negotiate_encoding(accept_encoding: str, supported: Tuple[str, ...]) -> Optional[str]:
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int, zstd_level: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "gzip":
+            out = self._compressor.compress(data)
+            return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + self._compressor.flush() if flush else out
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.flush(zlib.Z_FINISH)
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        zstd_level: int = COMPRESSION_ZSTD_LEVEL,
+        encodings: Optional[Tuple[str, ...]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.encodings = tuple(e for e in (encodings or available_encodings()) if e in available_encodings())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""), self.encodings)
+        if encoding is None or "range" in headers:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(self.app, scope, receive)
+
+    def encoder(self, encoding: str) -> _Encoder:
+        return _Encoder(encoding, self.gzip_level, self.brotli_quality, self.zstd_level)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.intercept)
+
+    def _eligible(self) -> bool:
+        message = self.start_message
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return False
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in message["headers"]}
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not any(content_type.startswith(skip) for skip in SKIP_CONTENT_TYPES)
+
+    def _compressed_headers(self, content_length: Optional[int], encoded: bool = True):
+        headers = []
+        vary = None
+        for key, value in self.start_message["headers"]:
+            name = key.lower()
+            if name == b"content-length":
+                continue
+            if name == b"vary":
+                vary = value
+                continue
+            if name == b"etag" and value.endswith(b'"') and not value.startswith(b"W/"):
+                value = value[:-1] + f'-{self.encoding}"'.encode()
+            headers.append((key, value))
+        if encoded:
+            headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return headers
+
+    async def intercept(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._eligible()
+            if message["status"] == 304:
+                # Keep the validator the client holds, which carries the encoding suffix.
+                await self.send({**message, "headers": self._compressed_headers(None, encoded=False)})
+            elif self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is not None:
+            chunk = self.encoder.compress(body, flush=True) if more_body else self.encoder.compress(body) + self.encoder.finish()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if not more_body:
+            payload = b"".join(self.buffer)
+            if len(payload) < self.middleware.minimum_size:
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": payload, "more_body": False})
+                return
+            encoder = self.middleware.encoder(self.encoding)
+            compressed = encoder.compress(payload) + encoder.finish()
+            await self.send({**self.start_message, "headers": self._compressed_headers(len(compressed))})
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+            return
+        if self.buffered < self.middleware.minimum_size:
+            return
+        # Large enough and still streaming: switch to incremental compression.
+        self.encoder = self.middleware.encoder(self.encoding)
+        payload = b"".join(self.buffer)
+        self.buffer = []
+        await self.send({**self.start_message, "headers": self._compressed_headers(None)})
+        await self.send({"type": "http.response.body", "body": self.encoder.compress(payload, flush=True), "more_body": True})
+
+
+def _bench_payloads() -> Dict[str, bytes]:
+    rng = random.Random(11)
+    pipelines = []
+    for p in range(50):
+        nodes = [{"id": f"node-{p}-{i}", "type": rng.choice(["source", "transform", "sink"]),
+                  "position": {"x": rng.randint(0, 2000), "y": rng.randint(0, 2000)},
+                  "config": {"sql": f"SELECT id, amount, created_at FROM orders_{i} WHERE amount > {rng.randint(0, 99)}"}}
+                 for i in range(40)]
+        pipelines.append({
+            "id": f"{p:08d}-0000-0000-0000-000000000000", "name": f"pipeline {p}", "status": "active",
+            "workflow_yaml": "".join(f"- name: step_{i}\n  run: transform_{i}\n  retries: 3\n" for i in range(40)),
+            "pipeline_graph": {"nodes": nodes, "edges": [{"source": nodes[i]["id"], "target": nodes[i + 1]["id"]}
+                                                          for i in range(len(nodes) - 1)]},
+        })
+    notebook = {"cells": [{"id": f"cell-{i}", "type": "code", "content": "df = spark.read.parquet(path)\ndf.show()\n",
+                           "output": "\n".join(f"| {rng.randint(0, 10**6):>8} | {rng.random():.6f} | ok |"
+                                               for _ in range(60))} for i in range(80)]}
+    return {"GET /pipelines": json.dumps(pipelines).encode(), "notebook content": json.dumps(notebook).encode()}
+
+
+def run_benchmark(rounds: int = 5):
+    levels = {"gzip": (1, 6, 9), "br": (1, 4, 9), "zstd": (1, 3, 9)}
+    for name, payload in _bench_payloads().items():
+        print(f"{name}: {len(payload) / 1024:.0f} KiB uncompressed")
+        for encoding in available_encodings():
+            for level in levels[encoding]:
+                encoder_args = {"gzip_level": level, "brotli_quality": level, "zstd_level": level}
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    encoder = _Encoder(encoding, **encoder_args)
+                    compressed = encoder.compress(payload) + encoder.finish()
+                elapsed = (time.perf_counter() - started) / rounds
+                print(f"  {encoding:>4} level {level}: {len(compressed) / 1024:7.1f} KiB "
+                      f"({len(payload) / len(compressed):5.1f}x), {elapsed * 1000:6.2f} ms "
+                      f"({len(payload) / elapsed / 2**20:6.0f} MiB/s)")
+    missing = [encoding for encoding in ENCODING_PREFERENCE if encoding not in available_encodings()]
+    if missing:
+        print(f"Not installed: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.rounds)
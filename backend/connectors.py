@@ -0,0 +1,340 @@
+"""
+Pooled connections to external data sources.
+
+ConnectorManager keeps one SQLAlchemy engine, and so one connection pool, per
+data source. Queries, previews and tests reuse warm connections instead of
+paying a TCP, TLS and auth handshake every time. Each pool is tied to the
+source's config hash and updated_at. When either one changes, the next
+checkout builds a fresh pool and disposes of the old one. Connections
+already checked out finish on the old pool.
+
+Each source allows at most CONNECTOR_MAX_CONCURRENCY checkouts at once, so
+one busy source cannot exhaust a warehouse's connection limit or starve the
+API's threads. A caller that cannot get a slot within
+CONNECTOR_ACQUIRE_TIMEOUT gets ConnectorBusy. A sweeper thread disposes of
+pools idle for CONNECTOR_IDLE_SECONDS, so sources used once do not hold
+connections open indefinitely.
+
+sqlite and duckdb sources open database files under SQL_FILE_ROOT only
+(unset disables them, except in-memory databases). The path must already
+exist, so a source cannot read arbitrary server files or create new ones.
+
+Drivers beyond psycopg2 are optional: pymysql (mysql), snowflake-sqlalchemy
+(snowflake), sqlalchemy-hana (sap_hana) and duckdb-engine (duckdb). A source
+whose driver is missing raises ConnectorUnavailable.
+
+Benchmark fresh connections against pooled ones (SQLite file by default):
+    python connectors.py [--type postgresql --config '{"host": ...}'] [--queries 200]
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.exc import NoSuchModuleError
+from sqlalchemy.pool import NullPool
+
+CONNECTOR_MAX_CONCURRENCY = int(os.getenv("CONNECTOR_MAX_CONCURRENCY", "4"))
+CONNECTOR_ACQUIRE_TIMEOUT = float(os.getenv("CONNECTOR_ACQUIRE_TIMEOUT", "30"))
+CONNECTOR_IDLE_SECONDS = float(os.getenv("CONNECTOR_IDLE_SECONDS", "300"))
+CONNECTOR_CONNECT_TIMEOUT = int(os.getenv("CONNECTOR_CONNECT_TIMEOUT", "10"))
+SQL_FILE_ROOT = os.getenv("SQL_FILE_ROOT", "")
+
+# data_sources.type -> (SQLAlchemy driver name, default port)
+SQL_DRIVERS = {
+    "postgresql": ("postgresql+psycopg2", 5432),
+    "redshift": ("postgresql+psycopg2", 5439),
+    "mysql": ("mysql+pymysql", 3306),
+    "snowflake": ("snowflake", None),
+    "sap_hana": ("hana", 30015),
+    "sqlite": ("sqlite", None),
+    "duckdb": ("duckdb", None),
+}
+
+
+class ConnectorError(Exception):
+    pass
+
+
+class UnsupportedConnector(ConnectorError):
+    pass
+
+
+class ConnectorUnavailable(ConnectorError):
+    pass
+
+
+class ConnectorBusy(ConnectorError):
+    pass
+
+
+def config_hash(source_type: str, config: Dict[str, Any]) -> str:
+    canonical = json.dumps({"type": source_type, "config": config or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _database_file(source_type: str, config: Dict[str, Any]) -> str:
+    path = config.get("path") or config.get("database") or ":memory:"
+    if path == ":memory:":
+        return path
+    if not SQL_FILE_ROOT:
+        raise UnsupportedConnector(f"{source_type} database files are disabled (SQL_FILE_ROOT is not set)")
+    root = os.path.realpath(SQL_FILE_ROOT)
+    full_path = os.path.realpath(os.path.join(root, path.lstrip("/")))
+    if not full_path.startswith(root + os.sep):
+        raise UnsupportedConnector(f"{source_type} database path must be inside SQL_FILE_ROOT")
+    # Both drivers create a missing file on connect.
+    if not os.path.isfile(full_path):
+        raise ConnectorError(f"{source_type} database file '{path}' does not exist")
+    return full_path
+
+
+def build_url(source_type: str, config: Dict[str, Any]) -> URL:
+    if source_type not in SQL_DRIVERS:
+        raise UnsupportedConnector(f"Data source type '{source_type}' has no SQL connector")
+    driver, default_port = SQL_DRIVERS[source_type]
+    if source_type in ("sqlite", "duckdb"):
+        return URL.create(driver, database=_database_file(source_type, config))
+    if source_type == "snowflake":
+        database = config.get("database")
+        if database and config.get("schema"):
+            database = f"{database}/{config['schema']}"
+        query = {"warehouse": config["warehouse"]} if config.get("warehouse") else {}
+        return URL.create(driver, username=config.get("username"), password=config.get("password"),
+                          host=config.get("account"), database=database, query=query)
+    port = config.get("port") or default_port
+    return URL.create(driver, username=config.get("username"), password=config.get("password"),
+                      host=config.get("host"), port=int(port) if port else None, database=config.get("database"))
+
+
+@functools.lru_cache(maxsize=None)
+def driver_installed(source_type: str) -> bool:
+    if source_type not in SQL_DRIVERS:
+        return False
+    try:
+        URL.create(SQL_DRIVERS[source_type][0]).get_dialect().import_dbapi()
+    except (NoSuchModuleError, ImportError):
+        return False
+    return True
+
+
+def _connect_args(source_type: str) -> Dict[str, Any]:
+    if source_type in ("postgresql", "redshift", "mysql"):
+        return {"connect_timeout": CONNECTOR_CONNECT_TIMEOUT}
+    return {}
+
+
+class _SourcePool:
+    def __init__(self, engine: Engine, fingerprint: str, updated_at: Optional[str], max_concurrency: int):
+        self.engine = engine
+        self.fingerprint = fingerprint
+        self.updated_at = updated_at
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.checkouts = 0
+
+
+class ConnectorManager:
+    def __init__(
+        self,
+        max_concurrency: int = CONNECTOR_MAX_CONCURRENCY,
+        acquire_timeout: float = CONNECTOR_ACQUIRE_TIMEOUT,
+        idle_seconds: float = CONNECTOR_IDLE_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.idle_seconds = idle_seconds
+        self._pools: Dict[str, _SourcePool] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.rebuilds = 0
+        self.evictions = 0
+
+    def _create_engine(self, source_type: str, config: Dict[str, Any]) -> Engine:
+        url = build_url(source_type, config)
+        options: Dict[str, Any] = {"connect_args": _connect_args(source_type), "pool_pre_ping": True}
+        if source_type == "sqlite":
+            options["connect_args"]["check_same_thread"] = False
+        # In-memory databases get a single-connection pool from their dialect; everything else
+        # gets a queue pool capped at the source's concurrency limit.
+        if url.database != ":memory:":
+            options.update(pool_size=self.max_concurrency, max_overflow=0, pool_timeout=self.acquire_timeout)
+        try:
+            return create_engine(url, **options)
+        except (NoSuchModuleError, ImportError) as e:
+            raise ConnectorUnavailable(f"Driver for '{source_type}' is not installed: {e}")
+
+    def _pool_for(self, source: Dict[str, Any]) -> _SourcePool:
+        source_id = str(source["id"])
+        fingerprint = config_hash(source["type"], source.get("config") or {})
+        updated_at = source.get("updated_at")
+        if isinstance(updated_at, datetime):
+            updated_at = updated_at.isoformat()
+        with self._lock:
+            pool = self._pools.get(source_id)
+            if pool is not None and pool.fingerprint == fingerprint and pool.updated_at == updated_at:
+                return pool
+            stale = pool
+            pool = _SourcePool(self._create_engine(source["type"], source.get("config") or {}),
+                               fingerprint, updated_at, self.max_concurrency)
+            self._pools[source_id] = pool
+            if stale is not None:
+                self.rebuilds += 1
+        if stale is not None:
+            stale.engine.dispose()
+        return pool
+
+    @contextmanager
+    def connect(self, source: Dict[str, Any]) -> Iterator[Connection]:
+        """source needs id, type, config and updated_at, as stored in data_sources."""
+        pool = self._pool_for(source)
+        if not pool.slots.acquire(timeout=self.acquire_timeout):
+            raise ConnectorBusy(f"Data source {source['id']} is at its limit of {self.max_concurrency} connections")
+        with self._lock:
+            pool.in_use += 1
+            pool.checkouts += 1
+        try:
+            with pool.engine.connect() as conn:
+                yield conn
+        finally:
+            with self._lock:
+                pool.in_use -= 1
+                pool.last_used = time.monotonic()
+            pool.slots.release()
+
+    def invalidate(self, source_id: str):
+        with self._lock:
+            pool = self._pools.pop(str(source_id), None)
+        if pool is not None:
+            pool.engine.dispose()
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [source_id for source_id, pool in self._pools.items()
+                    if pool.in_use == 0 and pool.last_used < cutoff]
+            evicted = [self._pools.pop(source_id) for source_id in idle]
+            self.evictions += len(evicted)
+        for pool in evicted:
+            pool.engine.dispose()
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "pools": len(self._pools),
+                "rebuilds": self.rebuilds,
+                "evictions": self.evictions,
+                "sources": {
+                    source_id: {
+                        "in_use": pool.in_use,
+                        "checkouts": pool.checkouts,
+                        "idle_seconds": round(now - pool.last_used, 1),
+                        "pooled_connections": pool.engine.pool.checkedin() if hasattr(pool.engine.pool, "checkedin") else 0,
+                    }
+                    for source_id, pool in self._pools.items()
+                },
+            }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="connector-idle-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.engine.dispose()
+
+    def _run(self):
+        interval = max(1.0, min(self.idle_seconds / 4, 60.0))
+        while not self._stopped.wait(interval):
+            self.evict_idle()
+
+
+def test_connection(manager: ConnectorManager, source: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with manager.connect(source) as conn:
+            conn.execute(text("SELECT 1")).scalar()
+    except ConnectorError as e:
+        return {"ok": False, "error": str(e), "latency_ms": None}
+    except Exception as e:
+        return {"ok": False, "error": str(e).splitlines()[0] if str(e) else type(e).__name__,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    return {"ok": True, "error": None, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def run_benchmark(source_type: str, config: Dict[str, Any], queries: int):
+    source = {"id": "bench", "type": source_type, "config": config, "updated_at": "v1"}
+
+    fresh = create_engine(build_url(source_type, config), poolclass=NullPool, connect_args=_connect_args(source_type))
+    started = time.perf_counter()
+    for _ in range(queries):
+        with fresh.connect() as conn:
+            conn.execute(text("SELECT 1")).scalar()
+    fresh_ms = (time.perf_counter() - started) * 1000 / queries
+    print(f"{source_type}: fresh connection per query {fresh_ms:.2f} ms/query")
+
+    manager = ConnectorManager(max_concurrency=4, idle_seconds=0.5)
+    started = time.perf_counter()
+    for _ in range(queries):
+        with manager.connect(source) as conn:
+            conn.execute(text("SELECT 1")).scalar()
+    pooled_ms = (time.perf_counter() - started) * 1000 / queries
+    print(f"{source_type}: pooled connector {pooled_ms:.2f} ms/query ({fresh_ms / pooled_ms:.1f}x)")
+
+    def hold():
+        with manager.connect(source):
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=hold) for _ in range(12)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"12 x 200 ms holders with a limit of 4 took {time.perf_counter() - started:.2f}s (expect ~0.6s)")
+
+    with manager.connect({**source, "updated_at": "v2"}) as conn:
+        conn.execute(text("SELECT 1"))
+    time.sleep(0.6)
+    evicted = manager.evict_idle()
+    print(f"after updated_at change: rebuilds={manager.rebuilds}; idle sweep evicted {evicted} pool(s)")
+    manager.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data source connector pool benchmark")
+    parser.add_argument("--type", default="sqlite", choices=sorted(SQL_DRIVERS))
+    parser.add_argument("--config", default=None, help="data_sources.config JSON")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.config:
+        bench_config = json.loads(args.config)
+    else:
+        SQL_FILE_ROOT = tempfile.mkdtemp()
+        open(os.path.join(SQL_FILE_ROOT, "bench.db"), "wb").close()
+        bench_config = {"path": "bench.db"}
+    run_benchmark(args.type, bench_config, args.queries)
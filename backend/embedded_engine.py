@@ -0,0 +1,517 @@
+"""
+Embedded analytical SQL over uploaded files, queried in place.
+
+Sources of type "embedded", "csv" or "excel" keep their files on the API
+host, one directory per source under EMBEDDED_DATA_DIR. Each file is a
+table named after its stem, such as orders.parquet for "orders"; a
+directory of Parquet parts is a table named after the directory. Nothing
+is loaded into a warehouse. A query opens a private in-memory DuckDB
+database and defines one view per file. DuckDB then scans the files where
+they sit:
+
+- CSV and Parquet go through DuckDB's own readers. These split a file
+  across EMBEDDED_THREADS worker threads and read only the columns and
+  Parquet row groups the query needs.
+- Arrow IPC (.arrow, .feather) files are memory-mapped with pyarrow and
+  registered zero-copy. The page cache serves repeated queries, and a
+  multi-GB file costs no process memory until its pages are touched.
+- Excel workbooks cannot be scanned in place, so each one is converted to
+  Parquet once, at upload time. This needs DuckDB's excel extension.
+
+Uploads stream through object_store.TransferEngine into a temporary file.
+That file replaces the table only once the upload is complete, so a query
+never reads half a file. API uploads are hashed on the way in (see
+upload_dedup), so re-uploading content the source already holds does not
+rewrite or re-convert it.
+
+Each query gets EMBEDDED_MEMORY_LIMIT of working memory. Sorts, joins and
+aggregates that outgrow it spill to a temporary directory under
+EMBEDDED_SPILL_DIR instead of failing. At most EMBEDDED_MAX_QUERIES run at
+once, so the engine's worst case is bounded at EMBEDDED_MAX_QUERIES x
+EMBEDDED_MEMORY_LIMIT. A caller that cannot get a slot within
+EMBEDDED_ACQUIRE_TIMEOUT gets EngineBusy. A query still running after
+EMBEDDED_QUERY_TIMEOUT seconds is interrupted, and that includes the time
+spent streaming its result.
+
+Queries must be a single SELECT. Before user SQL runs, file access is
+limited to the source's own directory and the configuration is locked, so
+a query can neither read other files nor raise its own limits.
+
+Exports into embedded tables run in the job worker (parquet_sink), so the
+worker must see the same EMBEDDED_DATA_DIR as the API: the same host, or a
+shared volume mounted at that path. The API marks the directory at
+startup, and a writer that finds no mark refuses to write tables the API
+would never see.
+
+duckdb is optional. Without it, queries raise EngineUnavailable.
+
+Benchmark scans of generated CSV, Parquet and Arrow files across thread counts:
+    python embedded_engine.py [--rows 20000000] [--threads 1,2,4,8]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from object_store import FilesystemBackend, TransferEngine
+from upload_dedup import current_entry, find_content, link_or_copy, stage_upload
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+EMBEDDED_DATA_DIR = os.getenv("EMBEDDED_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedded_data"))
+EMBEDDED_SPILL_DIR = os.getenv("EMBEDDED_SPILL_DIR", os.path.join(EMBEDDED_DATA_DIR, ".spill"))
+API_DATA_DIR_MARKER = ".api-data-dir"
+EMBEDDED_THREADS = int(os.getenv("EMBEDDED_THREADS", str(os.cpu_count() or 4)))
+EMBEDDED_MEMORY_LIMIT = os.getenv("EMBEDDED_MEMORY_LIMIT", "2GB")
+EMBEDDED_MAX_QUERIES = int(os.getenv("EMBEDDED_MAX_QUERIES", "4"))
+EMBEDDED_ACQUIRE_TIMEOUT = float(os.getenv("EMBEDDED_ACQUIRE_TIMEOUT", "30"))
+EMBEDDED_QUERY_TIMEOUT = float(os.getenv("EMBEDDED_QUERY_TIMEOUT", "300"))
+EMBEDDED_BATCH_ROWS = int(os.getenv("EMBEDDED_BATCH_ROWS", "65536"))
+
+EMBEDDED_TYPES = ("embedded", "csv", "excel")
+
+# stored file extension -> format
+TABLE_FORMATS = {".csv": "csv", ".tsv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+EXCEL_EXTENSIONS = (".xlsx",)
+
+TABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,62}$")
+
+
+class EmbeddedEngineError(Exception):
+    pass
+
+
+class InvalidQuery(EmbeddedEngineError):
+    pass
+
+
+class EngineUnavailable(EmbeddedEngineError):
+    pass
+
+
+class EngineBusy(EmbeddedEngineError):
+    pass
+
+
+class QueryTimeout(EmbeddedEngineError):
+    pass
+
+
+def _stored_extension(ext: str) -> str:
+    """The extension an upload of type ext is kept under."""
+    return ".parquet" if ext in EXCEL_EXTENSIONS else ext
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class EmbeddedEngine:
+    def __init__(
+        self,
+        data_dir: str = EMBEDDED_DATA_DIR,
+        spill_dir: str = EMBEDDED_SPILL_DIR,
+        threads: int = EMBEDDED_THREADS,
+        memory_limit: str = EMBEDDED_MEMORY_LIMIT,
+        max_queries: int = EMBEDDED_MAX_QUERIES,
+        acquire_timeout: float = EMBEDDED_ACQUIRE_TIMEOUT,
+        query_timeout: float = EMBEDDED_QUERY_TIMEOUT,
+    ):
+        self.data_dir = os.path.realpath(data_dir)
+        self.spill_dir = os.path.realpath(spill_dir)
+        self.threads = max(1, threads)
+        self.memory_limit = memory_limit
+        self.acquire_timeout = acquire_timeout
+        self.query_timeout = query_timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_queries))
+
+    # ---- files ----
+
+    def mark_api_data_dir(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        open(os.path.join(self.data_dir, API_DATA_DIR_MARKER), "a").close()
+
+    def shares_api_data_dir(self) -> bool:
+        return os.path.exists(os.path.join(self.data_dir, API_DATA_DIR_MARKER))
+
+    def source_dir(self, source: Dict[str, Any]) -> str:
+        source_id = str(source["id"])
+        if not re.fullmatch(r"[A-Za-z0-9-]+", source_id):
+            raise EmbeddedEngineError(f"Invalid source id '{source_id}'")
+        return os.path.join(self.data_dir, source_id)
+
+    def tables(self, source: Dict[str, Any]) -> Dict[str, Tuple[str, str]]:
+        """table name -> (path, format) for every stored file of the source."""
+        directory = self.source_dir(source)
+        try:
+            names = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            return {}
+        tables = {}
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                # A directory of Parquet parts, as parquet_sink writes with several workers.
+                if TABLE_NAME.match(name):
+                    tables[name] = (path, "parquet")
+            elif ext.lower() in TABLE_FORMATS and TABLE_NAME.match(stem):
+                tables[stem] = (path, TABLE_FORMATS[ext.lower()])
+        return tables
+
+    def list_tables(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+        listed = []
+        for table, (path, fmt) in self.tables(source).items():
+            files = [os.path.join(path, name) for name in os.listdir(path)] if os.path.isdir(path) else [path]
+            stats = [os.stat(name) for name in files]
+            listed.append({"table": table, "format": fmt, "filename": os.path.basename(path),
+                           "size": sum(stat.st_size for stat in stats),
+                           "last_modified": max((stat.st_mtime for stat in stats), default=os.stat(path).st_mtime)})
+        return listed
+
+    def store(self, transfers: TransferEngine, source: Dict[str, Any], table: str, filename: str,
+              chunks: Iterable[bytes], size_hint: Optional[int] = None,
+              manifest: Optional[Dict[str, Dict[str, Any]]] = None,
+              expected_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Streams an upload into the source's directory as table, replacing any earlier file for it.
+
+        Given the source's upload manifest (see upload_dedup), the upload is hashed as it arrives and
+        content the source already holds is not written again. The result then carries the table's new
+        "manifest" entry and the "dedup" outcome."""
+        ext = self._upload_extension(table, filename)
+        directory = self.source_dir(source)
+        os.makedirs(directory, exist_ok=True)
+        if manifest is not None:
+            return self._store_deduplicated(source, table, ext, chunks, manifest, expected_hash)
+        result = transfers.upload(FilesystemBackend(directory), table + ext, chunks, size_hint)
+        if ext in EXCEL_EXTENSIONS:
+            try:
+                self._convert_excel(os.path.join(directory, table + ext), os.path.join(directory, table + ".parquet"))
+            finally:
+                os.unlink(os.path.join(directory, table + ext))
+            ext = ".parquet"
+        path = os.path.join(directory, table + ext)
+        self.remove_other_files(source, table, path)
+        return {"table": table, "format": TABLE_FORMATS[ext], "filename": table + ext,
+                "size": os.path.getsize(path), "upload": result}
+
+    def reuse(self, source: Dict[str, Any], table: str, filename: str, digest: str, size: Optional[int],
+              manifest: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Stores table from content the source already holds, for an upload that declared its digest.
+
+        Returns None when the source has no such content and the body has to be read after all."""
+        ext = self._upload_extension(table, filename)
+        directory = self.source_dir(source)
+        current = self._current_entry(directory, table, ext, manifest)
+        if current is not None and current["content_hash"] == digest and size in (None, current["size"]):
+            return self._stored(directory, table, current["stored_name"], current,
+                                {"outcome": "unchanged", "bytes_not_sent": current["size"]})
+        same = find_content(directory, manifest, digest, size)
+        if same is None or not same["stored_name"].endswith(_stored_extension(ext)):
+            return None
+        stored_name = table + os.path.splitext(same["stored_name"])[1]
+        link_or_copy(os.path.join(directory, same["stored_name"]), os.path.join(directory, stored_name))
+        self.remove_other_files(source, table, os.path.join(directory, stored_name))
+        return self._stored(directory, table, stored_name, same,
+                            {"outcome": "linked", "linked_from": same["path"], "bytes_not_sent": same["size"]})
+
+    def drop(self, source: Dict[str, Any], table: str) -> bool:
+        path = self.tables(source).get(table, (None, None))[0]
+        if path is None:
+            return False
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+        return True
+
+    def table_path(self, source: Dict[str, Any], table: str, dataset: bool = False) -> str:
+        """Where a writer should put table: a directory of parts when dataset, else a single Parquet file."""
+        if not TABLE_NAME.match(table or ""):
+            raise InvalidQuery("Table names must be letters, digits and underscores, starting with a letter")
+        return os.path.join(self.source_dir(source), table if dataset else table + ".parquet")
+
+    def remove_other_files(self, source: Dict[str, Any], table: str, keep: str):
+        """Removes every file or part directory of table except keep, once keep has replaced them."""
+        directory = self.source_dir(source)
+        for other in [table] + [table + ext for ext in TABLE_FORMATS]:
+            path = os.path.join(directory, other)
+            if path == keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _upload_extension(self, table: str, filename: str) -> str:
+        if not TABLE_NAME.match(table or ""):
+            raise InvalidQuery("Table names must be letters, digits and underscores, starting with a letter")
+        ext = os.path.splitext(filename or "")[1].lower()
+        if ext not in TABLE_FORMATS and ext not in EXCEL_EXTENSIONS:
+            raise InvalidQuery(f"Unsupported file type '{ext or filename}'; upload "
+                               f"{', '.join(sorted(set(TABLE_FORMATS) | set(EXCEL_EXTENSIONS)))}")
+        return ext
+
+    def _store_deduplicated(self, source: Dict[str, Any], table: str, ext: str, chunks: Iterable[bytes],
+                            manifest: Dict[str, Dict[str, Any]], expected_hash: Optional[str]) -> Dict[str, Any]:
+        directory = self.source_dir(source)
+        current = self._current_entry(directory, table, ext, manifest)
+        reference = None
+        if current is not None and current["stored_name"] == table + ext:
+            # Stored as uploaded (not converted), so its blocks can stand in for the upload's.
+            reference = (os.path.join(directory, current["stored_name"]), current)
+        staged = stage_upload(chunks, directory, reference, suffix=ext)
+        try:
+            if expected_hash is not None and staged["content_hash"] != expected_hash:
+                raise InvalidQuery("Upload does not match its X-Content-Hash digest")
+            dedup = {"outcome": "stored", "bytes_received": staged["size"], "bytes_written": staged["bytes_written"],
+                     "bytes_copied": staged["bytes_copied"]}
+            if staged["path"] is None or (current is not None and current["content_hash"] == staged["content_hash"]):
+                dedup["outcome"] = "unchanged"
+                return self._stored(directory, table, current["stored_name"], current, dedup)
+            same = find_content(directory, manifest, staged["content_hash"], staged["size"])
+            if same is not None and same["stored_name"].endswith(_stored_extension(ext)):
+                stored_name = table + os.path.splitext(same["stored_name"])[1]
+                link_or_copy(os.path.join(directory, same["stored_name"]), os.path.join(directory, stored_name))
+                dedup.update(outcome="linked", linked_from=same["path"])
+            elif ext in EXCEL_EXTENSIONS:
+                stored_name = table + ".parquet"
+                self._convert_excel(staged["path"], os.path.join(directory, stored_name))
+            else:
+                stored_name = table + ext
+                os.replace(staged["path"], os.path.join(directory, stored_name))
+        finally:
+            if staged["path"] is not None and os.path.exists(staged["path"]):
+                os.unlink(staged["path"])
+        self.remove_other_files(source, table, os.path.join(directory, stored_name))
+        return self._stored(directory, table, stored_name, staged, dedup)
+
+    def _current_entry(self, directory: str, table: str, ext: str,
+                       manifest: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """table's manifest entry, if it still describes the file on disk and an upload of this type."""
+        current = current_entry(directory, manifest.get(table))
+        if current is None or current["stored_name"] != table + _stored_extension(ext):
+            return None
+        return current
+
+    def _stored(self, directory: str, table: str, stored_name: str, content: Dict[str, Any],
+                dedup: Dict[str, Any]) -> Dict[str, Any]:
+        stat = os.stat(os.path.join(directory, stored_name))
+        entry = {key: content[key] for key in ("content_hash", "size", "block_size", "block_hashes")}
+        entry.update(stored_name=stored_name, stored_size=stat.st_size, stored_mtime_ns=stat.st_mtime_ns)
+        dedup = {"bytes_received": 0, "bytes_written": 0, "bytes_copied": 0, "bytes_not_sent": 0, **dedup}
+        return {"table": table, "format": TABLE_FORMATS[os.path.splitext(stored_name)[1]], "filename": stored_name,
+                "size": stat.st_size, "manifest": entry, "dedup": dedup}
+
+    def drop_source(self, source: Dict[str, Any]):
+        shutil.rmtree(self.source_dir(source), ignore_errors=True)
+
+    def _convert_excel(self, workbook: str, target: str):
+        if duckdb is None:
+            raise EngineUnavailable("duckdb is not installed")
+        con = duckdb.connect(":memory:", config={"threads": self.threads, "memory_limit": self.memory_limit})
+        try:
+            try:
+                con.execute("INSTALL excel")
+                con.execute("LOAD excel")
+            except duckdb.Error as e:
+                raise EngineUnavailable(f"Excel uploads need DuckDB's excel extension: {str(e).splitlines()[0]}")
+            partial = os.path.join(os.path.dirname(target), ".upload-" + os.path.basename(target))
+            try:
+                con.execute(f"COPY (SELECT * FROM read_xlsx({_literal(workbook)}, header = true)) "
+                            f"TO {_literal(partial)} (FORMAT parquet, COMPRESSION zstd)")
+            except duckdb.Error as e:
+                raise InvalidQuery(f"Could not read workbook: {str(e).splitlines()[0]}")
+            os.replace(partial, target)
+        finally:
+            con.close()
+
+    # ---- queries ----
+
+    def _connect(self, source: Dict[str, Any], spill: str):
+        con = duckdb.connect(":memory:", config={
+            "threads": self.threads,
+            "memory_limit": self.memory_limit,
+            "temp_directory": spill,
+        })
+        try:
+            tables = self.tables(source)
+            for table, (path, fmt) in tables.items():
+                if fmt == "arrow":
+                    if pa is None:
+                        raise EngineUnavailable(f"Table '{table}' is an Arrow file, which needs pyarrow")
+                    con.register(table, pa.ipc.open_file(pa.memory_map(path)).read_all())
+                else:
+                    reader = "read_parquet" if fmt == "parquet" else "read_csv"
+                    target = os.path.join(path, "*.parquet") if os.path.isdir(path) else path
+                    con.execute(f'CREATE VIEW "{table}" AS SELECT * FROM {reader}({_literal(target)})')
+            # From here on, user SQL can reach the source's own files and nothing else, and cannot undo it.
+            con.execute(f"SET allowed_directories = [{_literal(self.source_dir(source) + os.sep)}]")
+            con.execute("SET enable_external_access = false")
+            con.execute("SET lock_configuration = true")
+        except BaseException:
+            con.close()
+            raise
+        return con
+
+    def query(self, source: Dict[str, Any], sql: str, parameters: Optional[List[Any]] = None,
+              limit: Optional[int] = None, stats: Optional[Dict[str, Any]] = None,
+              batch_rows: int = EMBEDDED_BATCH_ROWS) -> Iterator["pa.RecordBatch"]:
+        """Yields the result as Arrow record batches, at least one (empty if there are no rows)."""
+        if duckdb is None or pa is None:
+            raise EngineUnavailable("Embedded queries need duckdb and pyarrow, which are not installed")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise EngineBusy("The embedded engine is at its limit of concurrent queries")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        spill = tempfile.mkdtemp(dir=self.spill_dir, prefix="query-")
+        con = None
+        timer = None
+        try:
+            con = self._connect(source, spill)
+            try:
+                statements = con.extract_statements(sql)
+            except duckdb.Error as e:
+                raise InvalidQuery(str(e).splitlines()[0])
+            if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+                raise InvalidQuery("Embedded sources run exactly one SELECT statement")
+            timer = threading.Timer(self.query_timeout, con.interrupt)
+            timer.daemon = True
+            timer.start()
+            started = time.perf_counter()
+            result = con.execute(sql, parameters or [])
+            reader = result.to_arrow_reader(batch_rows) if hasattr(result, "to_arrow_reader") \
+                else result.fetch_record_batch(batch_rows)
+            schema = reader.schema
+            remaining = limit
+            delivered = 0
+            for batch in reader:
+                if remaining is not None:
+                    batch = batch.slice(0, remaining)
+                    remaining -= batch.num_rows
+                if batch.num_rows:
+                    delivered += 1
+                    if stats is not None:
+                        stats["rows_in"] += batch.num_rows
+                        stats["bytes_in"] += batch.nbytes
+                    yield batch
+                if remaining == 0:
+                    break
+            if not delivered:
+                yield pa.RecordBatch.from_pylist([], schema=schema)
+            if stats is not None:
+                stats["metrics"].update({"engine": "duckdb", "threads": self.threads,
+                                         "memory_limit": self.memory_limit,
+                                         "query_ms": round((time.perf_counter() - started) * 1000, 1)})
+        except duckdb.InterruptException:
+            raise QueryTimeout(f"Query ran longer than {self.query_timeout:g}s")
+        except duckdb.OutOfMemoryException as e:
+            raise EmbeddedEngineError(f"Query exceeded its {self.memory_limit} memory limit: {str(e).splitlines()[0]}")
+        except duckdb.Error as e:
+            raise EmbeddedEngineError(str(e).splitlines()[0])
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if con is not None:
+                con.close()
+            shutil.rmtree(spill, ignore_errors=True)
+            self._slots.release()
+
+
+_default_engine: Optional[EmbeddedEngine] = None
+
+
+def get_engine() -> EmbeddedEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = EmbeddedEngine()
+    return _default_engine
+
+
+def _write_bench_files(directory: str, rows: int):
+    con = duckdb.connect()
+    con.execute(f"""
+        CREATE TABLE events AS
+        SELECT i AS id,
+               TIMESTAMP '2024-01-01' + to_seconds(i) AS event_time,
+               ['emea', 'amer', 'apac', 'latam'][1 + i % 4] AS region,
+               'customer-' || (i % 65536) AS customer,
+               i % 32 AS quantity,
+               (i % 1024) * 0.25 AS amount
+        FROM range({rows}) t(i)
+    """)
+    con.execute(f"COPY events TO {_literal(os.path.join(directory, 'events_csv.csv'))} (HEADER)")
+    con.execute(f"COPY events TO {_literal(os.path.join(directory, 'events_parquet.parquet'))} "
+                f"(FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE 250000)")
+    with pa.ipc.new_file(os.path.join(directory, "events_arrow.arrow"), con.execute("SELECT * FROM events LIMIT 0")
+                         .to_arrow_table().schema) as writer:
+        for batch in con.execute("SELECT * FROM events").to_arrow_reader(1_000_000):
+            writer.write_batch(batch)
+    con.close()
+
+
+def run_benchmark(rows: int, thread_counts: List[int], memory_limit: str):
+    root = tempfile.mkdtemp(prefix="embedded-bench-")
+    try:
+        source = {"id": "bench"}
+        os.makedirs(os.path.join(root, "bench"))
+        started = time.perf_counter()
+        _write_bench_files(os.path.join(root, "bench"), rows)
+        print(f"{rows} rows written in {time.perf_counter() - started:.1f}s")
+        probe = EmbeddedEngine(root, os.path.join(root, ".spill"))
+        for table in probe.list_tables(source):
+            print(f"  {table['table']:>15}: {table['size'] / 2 ** 20:8.1f} MiB")
+
+        sizes = {table["table"]: table["size"] for table in probe.list_tables(source)}
+        for table in ("events_csv", "events_parquet", "events_arrow"):
+            query = (f"SELECT region, count(*) AS orders, sum(amount) AS revenue, avg(quantity) AS quantity "
+                     f"FROM {table} WHERE event_time >= TIMESTAMP '2024-01-01' + to_seconds({rows // 2}) "
+                     f"GROUP BY region ORDER BY region")
+            size = sizes[table]
+            baseline = None
+            for threads in thread_counts:
+                engine = EmbeddedEngine(root, os.path.join(root, ".spill"), threads=threads, memory_limit=memory_limit)
+                started = time.perf_counter()
+                result = list(engine.query(source, query))
+                seconds = time.perf_counter() - started
+                baseline = baseline or seconds
+                print(f"  {table:>15} threads={threads:<2}: {seconds:6.2f}s, {size / 2 ** 20 / seconds:7.0f} MiB/s, "
+                      f"{baseline / seconds:4.1f}x, {sum(batch.num_rows for batch in result)} groups")
+
+        # A sort far larger than the memory limit spills instead of failing.
+        engine = EmbeddedEngine(root, os.path.join(root, ".spill"), memory_limit="256MB")
+        started = time.perf_counter()
+        stats = {"rows_in": 0, "bytes_in": 0, "metrics": {}}
+        sorted_rows = sum(batch.num_rows for batch in engine.query(
+            source, "SELECT * FROM events_parquet ORDER BY customer, amount DESC", stats=stats))
+        print(f"  sort with a 256MB limit: {sorted_rows} rows, {stats['bytes_in'] / 2 ** 20:.0f} MiB streamed "
+              f"in {time.perf_counter() - started:.2f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedded engine scan benchmark")
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--threads", default=",".join(str(n) for n in (1, 2, 4, EMBEDDED_THREADS)))
+    parser.add_argument("--memory-limit", default=EMBEDDED_MEMORY_LIMIT)
+    args = parser.parse_args()
+    if duckdb is None or pa is None:
+        raise SystemExit("duckdb and pyarrow are required")
+    counts = sorted({int(n) for n in args.threads.split(",")})
+    run_benchmark(args.rows, counts, args.memory_limit)
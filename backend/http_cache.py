@@ -0,0 +1,59 @@
+"""
+ETags and conditional GETs for user-scoped collection endpoints.
+
+A collection's validator is derived from count(*) and max(updated_at) over
+the caller's rows, so it changes on every insert, update (the updated_at
+triggers) and delete. The aggregate runs off a (user, updated_at) index, and
+an If-None-Match hit returns 304 before the listing query runs or anything
+is serialized.
+
+Responses carry "Cache-Control: private, no-cache", so browsers keep the
+body but revalidate every time, sending If-None-Match on their own.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+
+from compression import strip_encoding_suffix
+
+# Bump when a collection's serialized shape changes, so old cached bodies stop matching.
+REPRESENTATION_VERSION = "1"
+
+COLLECTION_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def collection_etag(db, resource: str, aggregate_sql: str, params: Dict[str, Any], request: Request) -> str:
+    """aggregate_sql must return a single (count, max(updated_at)) row."""
+    count, last_updated = db.execute(text(aggregate_sql), params).fetchone()
+    parts = [
+        REPRESENTATION_VERSION,
+        resource,
+        str(params.get("user_id")),
+        str(request.url.query),
+        str(count),
+        last_updated.isoformat() if last_updated else "",
+    ]
+    return '"' + hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2); the compression
+    # middleware's per-encoding suffix names the same underlying version.
+    return any(strip_encoding_suffix(candidate.removeprefix("W/")) == etag for candidate in candidates)
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Returns a 304 to send if the client's copy is current, else tags response and returns None."""
+    headers = {"ETag": etag, **COLLECTION_HEADERS}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
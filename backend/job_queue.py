@@ -0,0 +1,195 @@
+"""
+Durable job queue backed by the Postgres jobs table.
+
+Workers claim batches with SELECT ... FOR UPDATE SKIP LOCKED so concurrent
+workers never block on or double-claim the same row. A claimed job stays
+invisible until locked_until; workers heartbeat to extend it, and any worker
+requeues jobs whose lease expired. Failures are retried with capped
+exponential backoff and full jitter until max_attempts is reached.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+LANES = ("high", "default", "low")
+
+
+def backoff_seconds(attempts: int, base: float = 5.0, cap: float = 900.0) -> float:
+    return random.uniform(0, min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+def enqueue(
+    conn,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    lane: str = "default",
+    priority: int = 0,
+    user_id: Optional[str] = None,
+    run_at: Optional[datetime] = None,
+    max_attempts: int = 5,
+    dedupe_key: Optional[str] = None,
+) -> Optional[int]:
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane}")
+    result = conn.execute(
+        text("""
+            INSERT INTO jobs (kind, lane, priority, payload, user_id, run_at, max_attempts, dedupe_key)
+            VALUES (:kind, :lane, :priority, CAST(:payload AS jsonb), :user_id, COALESCE(:run_at, now()),
+                    :max_attempts, :dedupe_key)
+            ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id
+        """),
+        {
+            "kind": kind,
+            "lane": lane,
+            "priority": priority,
+            "payload": json.dumps(payload or {}),
+            "user_id": user_id,
+            "run_at": run_at,
+            "max_attempts": max_attempts,
+            "dedupe_key": dedupe_key,
+        }
+    )
+    row = result.fetchone()
+    return row[0] if row else None
+
+
+def get_job(conn, job_id: int, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    query = """
+        SELECT id, kind, lane, priority, payload, status, attempts, max_attempts, run_at,
+               last_error, result, created_at, updated_at
+        FROM jobs WHERE id = :id
+    """
+    if user_id is not None:
+        query += " AND user_id = :user_id"
+    row = conn.execute(text(query), {"id": job_id, "user_id": user_id}).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "lane": row[2],
+        "priority": row[3],
+        "payload": row[4],
+        "status": row[5],
+        "attempts": row[6],
+        "max_attempts": row[7],
+        "run_at": row[8].isoformat() if row[8] else None,
+        "last_error": row[9],
+        "result": row[10],
+        "created_at": row[11].isoformat() if row[11] else None,
+        "updated_at": row[12].isoformat() if row[12] else None,
+    }
+
+
+class JobQueue:
+    def __init__(self, engine, worker_id: str, visibility_timeout: float = 300.0):
+        self.engine = engine
+        self.worker_id = worker_id
+        self.visibility_timeout = visibility_timeout
+
+    def claim(self, limit: int, lanes=LANES) -> List[Dict[str, Any]]:
+        claimed: List[Dict[str, Any]] = []
+        # Lanes are drained in order so high-priority work always goes first;
+        # each lane query is served by the partial idx_jobs_claim index.
+        with self.engine.begin() as conn:
+            for lane in lanes:
+                if len(claimed) >= limit:
+                    break
+                result = conn.execute(
+                    text("""
+                        WITH next AS (
+                            SELECT id FROM jobs
+                            WHERE status = 'queued' AND lane = :lane AND run_at <= now()
+                            ORDER BY priority DESC, run_at
+                            LIMIT :limit
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE jobs j
+                        SET status = 'running', attempts = j.attempts + 1, locked_by = :worker_id,
+                            locked_until = now() + make_interval(secs => :visibility_timeout)
+                        FROM next WHERE j.id = next.id
+                        RETURNING j.id, j.kind, j.lane, j.payload, j.attempts, j.max_attempts, j.user_id
+                    """),
+                    {
+                        "lane": lane,
+                        "limit": limit - len(claimed),
+                        "worker_id": self.worker_id,
+                        "visibility_timeout": self.visibility_timeout,
+                    }
+                )
+                for row in result:
+                    claimed.append({
+                        "id": row[0],
+                        "kind": row[1],
+                        "lane": row[2],
+                        "payload": row[3] or {},
+                        "attempts": row[4],
+                        "max_attempts": row[5],
+                        "user_id": str(row[6]) if row[6] else None,
+                    })
+        return claimed
+
+    def heartbeat(self, job_ids: List[int]):
+        if not job_ids:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE jobs SET locked_until = now() + make_interval(secs => :visibility_timeout)
+                    WHERE id = ANY(:ids) AND locked_by = :worker_id AND status = 'running'
+                """),
+                {"ids": job_ids, "worker_id": self.worker_id, "visibility_timeout": self.visibility_timeout}
+            )
+
+    def complete(self, job_id: int, result: Optional[Dict[str, Any]] = None):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE jobs SET status = 'succeeded', result = CAST(:result AS jsonb),
+                                    locked_by = NULL, locked_until = NULL
+                    WHERE id = :id AND locked_by = :worker_id
+                """),
+                {"id": job_id, "worker_id": self.worker_id, "result": json.dumps(result) if result is not None else None}
+            )
+
+    def fail(self, job: Dict[str, Any], error: str, retryable: bool = True):
+        exhausted = not retryable or job["attempts"] >= job["max_attempts"]
+        retry_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(job["attempts"]))
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE jobs SET status = :status, last_error = :error, run_at = :run_at,
+                                    locked_by = NULL, locked_until = NULL
+                    WHERE id = :id AND locked_by = :worker_id
+                """),
+                {
+                    "id": job["id"],
+                    "worker_id": self.worker_id,
+                    "status": "failed" if exhausted else "queued",
+                    "error": error[:4000],
+                    "run_at": retry_at,
+                }
+            )
+
+    def requeue_expired(self) -> int:
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text("""
+                    WITH expired AS (
+                        SELECT id FROM jobs
+                        WHERE status = 'running' AND locked_until < now()
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE jobs j
+                    SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'failed' ELSE 'queued' END,
+                        last_error = 'Visibility timeout expired on worker ' || COALESCE(j.locked_by, '?'),
+                        run_at = now(), locked_by = NULL, locked_until = NULL
+                    FROM expired WHERE j.id = expired.id
+                """)
+            )
+            return result.rowcount
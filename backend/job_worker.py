@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Worker pool process for the durable job queue.
+
+Usage:
+    python job_worker.py --concurrency 8 --lanes high,default,low
+    python job_worker.py --bench 20000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from blob_store import collect_garbage
+from bulk_loader import BULK_LOAD_TYPES, BulkLoadError, load_batches
+from connectors import ConnectorManager
+from incremental import describe_plan, get_watermark, parse_incremental, plan_incremental, save_watermark
+from job_queue import LANES, JobQueue
+from local_cluster import reconcile_local_clusters, start_local_cluster
+from embedded_engine import EngineUnavailable, InvalidQuery
+from object_store import ObjectNotFound, ObjectStoreUnavailable, TransferEngine, UnsupportedObjectStore
+from parquet_sink import SinkError, sink_to_source
+from pipeline_runs import RunTelemetryWriter
+from repo_sync import import_repository, sync_repository
+from source_health import check_sources
+from source_reader import InvalidReadSpec, iter_source_batches, parse_columns, parse_filters, parse_partitioning
+
+JobHandler = Callable[[Dict[str, Any], Any], Optional[Dict[str, Any]]]
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+LOCAL_CLUSTER_COOLDOWN = float(os.getenv("LOCAL_CLUSTER_COOLDOWN", "30"))
+LOCAL_CLUSTER_TASK_TIMEOUT = float(os.getenv("LOCAL_CLUSTER_TASK_TIMEOUT", "21600"))
+
+
+class PermanentJobError(Exception):
+    pass
+
+
+def job_handler(kind: str):
+    def register(func: JobHandler) -> JobHandler:
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+@job_handler("noop")
+def run_noop(job: Dict[str, Any], engine):
+    return None
+
+
+@job_handler("cluster.start")
+def start_cluster(job: Dict[str, Any], engine):
+    cluster_id = job["payload"]["cluster_id"]
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT compute_type FROM compute_clusters WHERE id = :id"),
+            {"id": cluster_id}
+        ).fetchone()
+    if row is None:
+        raise PermanentJobError(f"Compute cluster {cluster_id} not found")
+
+    if row[0] == "process":
+        driver = start_local_cluster(engine, cluster_id, cooldown=LOCAL_CLUSTER_COOLDOWN)
+        return {"endpoint_url": driver.endpoint_url, "num_workers": driver.num_workers}
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE compute_clusters SET status = 'error', updated_at = now() WHERE id = :id"),
+            {"id": cluster_id}
+        )
+    raise PermanentJobError(f"No driver available for compute type '{row[0]}'")
+
+
+@job_handler("repository.sync")
+def run_repository_sync(job: Dict[str, Any], engine):
+    return sync_repository(engine, job["payload"]["repository_id"])
+
+
+@job_handler("repository.import")
+def run_repository_import(job: Dict[str, Any], engine):
+    payload = job["payload"]
+    return import_repository(engine, payload["repository_id"], payload.get("path", ""), payload.get("kinds"))
+
+
+@job_handler("blobs.gc")
+def run_blob_gc(job: Dict[str, Any], engine):
+    grace_hours = job["payload"].get("grace_hours")
+    return collect_garbage(engine) if grace_hours is None else collect_garbage(engine, grace_hours=float(grace_hours))
+
+
+@job_handler("data_sources.test_all")
+def run_data_source_tests(job: Dict[str, Any], engine):
+    manager = ConnectorManager()
+    try:
+        return asyncio.run(check_sources(engine, manager, user_id=job["payload"].get("user_id"), force=True))
+    finally:
+        manager.stop()
+
+
+@job_handler("data_sources.export")
+def run_source_export(job: Dict[str, Any], engine):
+    """Writes a read of one data source to another, the way a pipeline target node does: as Parquet for
+    embedded and object-store targets, through a binary COPY bulk load for SQL targets.
+
+    With a pipeline_id (and optionally node_id) in the payload, the write is recorded as a run of that
+    pipeline, so its load rate shows up in the run history. An incremental export reads only the rows
+    above that pipeline's watermark for the table, and a partitioned one reads the table in parallel
+    ranges.
+
+    With a cluster_id, the export runs in a worker process of that (running) "process" compute cluster,
+    whose pool autoscales with the exports in flight."""
+    payload = job["payload"]
+    if payload.get("cluster_id"):
+        driver = _running_local_cluster(engine, payload["cluster_id"])
+        future = driver.submit(_export_on_cluster, {**payload, "cluster_id": None})
+        try:
+            # A lost task must not hold the job forever while this worker keeps heartbeating its lease.
+            result = future.result(timeout=LOCAL_CLUSTER_TASK_TIMEOUT)
+        except FutureTimeout:
+            raise RuntimeError(f"Export on cluster {payload['cluster_id']} did not finish "
+                               f"within {LOCAL_CLUSTER_TASK_TIMEOUT:.0f}s")
+        if "permanent_error" in result:
+            raise PermanentJobError(result["permanent_error"])
+        return result
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("""
+                SELECT id, type, config, updated_at FROM data_sources
+                WHERE id IN (:source_id, :target_id) AND user_id = :user_id
+            """),
+            {"source_id": payload["source_id"], "target_id": payload["target_id"], "user_id": payload["user_id"]}
+        ).fetchall()
+    sources = {str(row[0]): {"id": str(row[0]), "type": row[1], "config": row[2] or {}, "updated_at": row[3]}
+               for row in rows}
+    for key in ("source_id", "target_id"):
+        if payload[key] not in sources:
+            raise PermanentJobError(f"Data source {payload[key]} not found")
+    source, target = sources[payload["source_id"]], sources[payload["target_id"]]
+    manager = ConnectorManager()
+    # Partitioned reads can hold every slot of the reading manager; the loader must not wait behind them
+    # (source and target can be the same source).
+    load_manager = ConnectorManager()
+    transfers = TransferEngine()
+    started_at = datetime.now(timezone.utc)
+    plan = None
+    try:
+        filters = parse_filters(payload.get("filters"))
+        incremental = parse_incremental(payload.get("incremental"))
+        if incremental:
+            if not payload.get("pipeline_id"):
+                raise PermanentJobError("Incremental exports need pipeline_id to keep their watermark")
+            if target["type"] not in BULK_LOAD_TYPES:
+                raise PermanentJobError("Incremental exports need a SQL target table; other targets would be "
+                                        "replaced by the delta")
+            with engine.connect() as conn:
+                previous = get_watermark(conn, payload["pipeline_id"], source["id"], payload.get("table"))
+            plan = plan_incremental(manager, source, payload.get("table"), filters, incremental, previous)
+            filters = plan["filters"]
+        if plan is not None and plan["empty"]:
+            # Nothing above the watermark: leave the target as it is.
+            result = {"rows": 0, "bytes": 0}
+        else:
+            batches = iter_source_batches(
+                manager, transfers, source, table_name=payload.get("table"), key=payload.get("key"),
+                columns=parse_columns(payload.get("columns")), filters=filters,
+                partitioning=parse_partitioning(payload.get("partitioning")),
+            )
+            if target["type"] in BULK_LOAD_TYPES:
+                result = load_batches(load_manager, target, payload["target"], batches,
+                                      mode=payload.get("mode", "append"),
+                                      conflict_columns=payload.get("conflict_columns"))
+            else:
+                options = {"workers": int(payload["workers"])} if payload.get("workers") else {}
+                result = sink_to_source(batches, target, payload["target"], transfers, **options)
+    except (InvalidReadSpec, SinkError, BulkLoadError, InvalidQuery, EngineUnavailable,
+            ObjectNotFound, ObjectStoreUnavailable, UnsupportedObjectStore) as e:
+        raise PermanentJobError(str(e))
+    finally:
+        manager.stop()
+        load_manager.stop()
+    if plan is not None:
+        # Only now that the rows are in the target does the watermark move past them. This is a separate
+        # transaction: dying before it commits means the range is loaded again (see incremental).
+        if not plan["empty"] and plan["watermark"] is not None:
+            with engine.begin() as conn:
+                save_watermark(conn, payload["pipeline_id"], source["id"], payload["table"], plan["column"],
+                               plan["watermark"], result["rows"])
+        result["watermark"] = describe_plan(plan, result["rows"])
+    if payload.get("pipeline_id"):
+        # The rows are already in the target: failing here would retry the job and write them again.
+        try:
+            result["run_id"] = _record_export_run(engine, payload, target["type"], started_at, result)
+        except Exception as e:
+            print(f"❌ Failed to record export run for pipeline {payload['pipeline_id']}: {e}")
+    return result
+
+
+def _running_local_cluster(engine, cluster_id: str):
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT compute_type, status FROM compute_clusters WHERE id = :id"),
+            {"id": cluster_id}
+        ).fetchone()
+    if row is None:
+        raise PermanentJobError(f"Compute cluster {cluster_id} not found")
+    if row[0] != "process" or row[1] not in ("starting", "running"):
+        raise PermanentJobError(f"Compute cluster {cluster_id} is not a running process cluster")
+    return start_local_cluster(engine, cluster_id, cooldown=LOCAL_CLUSTER_COOLDOWN)
+
+
+def _export_on_cluster(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs in a cluster worker process, which has its own engine; PermanentJobError comes back as a value
+    # because the pool returns other exceptions as plain RuntimeErrors.
+    from complete_rds_api import engine
+
+    try:
+        return run_source_export({"payload": payload}, engine)
+    except PermanentJobError as e:
+        return {"permanent_error": str(e)}
+
+
+def _record_export_run(engine, payload: Dict[str, Any], target_type: str, started_at: datetime,
+                       result: Dict[str, Any]) -> str:
+    finished_at = datetime.now(timezone.utc)
+    metrics = {"rows_out": result.get("rows"), "bytes_out": result.get("bytes")}
+    node = {"node_id": payload.get("node_id") or "export", "node_type": f"target:{target_type}",
+            "started_at": started_at, "finished_at": finished_at, "metrics": result, **metrics}
+    return RunTelemetryWriter(engine).record(payload["pipeline_id"], {
+        "trigger": "export", "started_at": started_at, "finished_at": finished_at, "nodes": [node], **metrics,
+    })
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        engine,
+        concurrency: int = 4,
+        lanes=LANES,
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+    ):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.queue = JobQueue(engine, self.worker_id, visibility_timeout)
+        self.concurrency = concurrency
+        self.lanes = tuple(lanes)
+        self.poll_interval = poll_interval
+        self.handlers = handlers if handlers is not None else HANDLERS
+        self.processed = 0
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self._in_flight: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._slot_free = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self, until_empty: bool = False):
+        heartbeat_every = max(self.queue.visibility_timeout / 3, 1.0)
+        next_heartbeat = time.time() + heartbeat_every
+        next_reap = time.time()
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                now = time.time()
+                if now >= next_reap:
+                    self.queue.requeue_expired()
+                    next_reap = now + heartbeat_every
+                if now >= next_heartbeat:
+                    with self._lock:
+                        in_flight = list(self._in_flight)
+                    self.queue.heartbeat(in_flight)
+                    next_heartbeat = now + heartbeat_every
+
+                with self._lock:
+                    free = self.concurrency - len(self._in_flight)
+                jobs = self.queue.claim(free, self.lanes) if free > 0 else []
+                failures = 0
+            except Exception as e:
+                # A database blip must not take the worker down: back off and try again. Leases of in-flight
+                # jobs outlive a few missed heartbeats (visibility_timeout / 3 apart).
+                failures += 1
+                delay = min(self.poll_interval * 2 ** failures, 30.0)
+                print(f"❌ Job worker loop failed ({failures} in a row), retrying in {delay:.1f}s: {e}")
+                self._stopped.wait(delay)
+                continue
+            for job in jobs:
+                with self._lock:
+                    self._in_flight[job["id"]] = job
+                self._executor.submit(self._execute, job)
+
+            if until_empty and not jobs:
+                with self._lock:
+                    if not self._in_flight:
+                        break
+            self._slot_free.wait(self.poll_interval)
+            self._slot_free.clear()
+        self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stopped.set()
+        self._slot_free.set()
+
+    def _execute(self, job: Dict[str, Any]):
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind '{job['kind']}'")
+            self.queue.complete(job["id"], handler(job, self.queue.engine))
+        except PermanentJobError as e:
+            self.queue.fail(job, str(e), retryable=False)
+        except Exception as e:
+            print(f"❌ Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}: {e}")
+            self.queue.fail(job, f"{e}\n{traceback.format_exc()}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(job["id"], None)
+                self.processed += 1
+            self._slot_free.set()
+
+
+def run_benchmark(engine, jobs: int, concurrency: int):
+    with engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO jobs (kind, lane, payload)
+                SELECT 'noop', (ARRAY['high', 'default', 'low'])[1 + i % 3], '{}'::jsonb
+                FROM generate_series(1, :jobs) AS i
+            """),
+            {"jobs": jobs}
+        )
+    pool = WorkerPool(engine, concurrency=concurrency, poll_interval=0.05)
+    started = time.perf_counter()
+    pool.run(until_empty=True)
+    elapsed = time.perf_counter() - started
+    print(f"Processed {pool.processed} jobs with concurrency {concurrency} in {elapsed:.2f}s "
+          f"({pool.processed / elapsed:.0f} claims/sec)")
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM jobs WHERE kind = 'noop' AND status = 'succeeded'"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IceCube job queue worker")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--lanes", default=os.getenv("JOB_WORKER_LANES", ",".join(LANES)))
+    parser.add_argument("--visibility-timeout", type=float, default=float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300")))
+    parser.add_argument("--bench", type=int, default=0, help="enqueue N noop jobs, drain them and report throughput")
+    args = parser.parse_args()
+
+    from complete_rds_api import engine
+
+    if args.bench:
+        run_benchmark(engine, args.bench, args.concurrency)
+    else:
+        pool = WorkerPool(
+            engine,
+            concurrency=args.concurrency,
+            lanes=[lane.strip() for lane in args.lanes.split(",") if lane.strip()],
+            visibility_timeout=args.visibility_timeout,
+        )
+        for cluster_id in reconcile_local_clusters(engine):
+            print(f"⚠️  Local cluster {cluster_id} lost its worker process; marked stopped")
+        print(f"🚀 Job worker {pool.worker_id} started (concurrency={args.concurrency}, lanes={pool.lanes})")
+        try:
+            pool.run()
+        except KeyboardInterrupt:
+            pool.stop()
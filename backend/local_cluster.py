@@ -0,0 +1,399 @@
+"""
+Local "process" compute driver.
+
+Runs a real pool of worker processes on the host for pipeline and notebook
+tasks, so scheduling and autoscaling policies can be exercised without a
+cloud. The pool scales between min_workers and max_workers from the number
+of in-flight tasks, with a cooldown between scaling actions, and mirrors its
+status, endpoint_url and num_workers into compute_clusters.
+
+The driver lives in the job worker process that handled cluster.start, or
+that first got a job for the cluster (data_sources.export with cluster_id
+runs through submit). It polls its compute_clusters row, so a stop
+requested through the API (status set to 'stopped') or edited worker bounds
+are picked up by whichever process owns the pool. A pool dies with its
+process. reconcile_local_clusters, run when a job worker starts, marks rows
+stopped whose owning process on this host is gone.
+
+Workers report which task they picked up before running it. A worker that
+dies while running a task (OOM kill, segfault, non-zero exit) fails that
+task's future instead of leaving its caller waiting.
+"""
+
+import math
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+_drivers: Dict[str, "LocalClusterDriver"] = {}
+_drivers_lock = threading.Lock()
+
+
+def compute_target_workers(
+    current: int,
+    in_flight: int,
+    min_workers: int,
+    max_workers: int,
+    tasks_per_worker: int = 1,
+    scale_down_utilization: float = 0.5,
+) -> int:
+    demand = math.ceil(in_flight / max(tasks_per_worker, 1))
+    if demand > current:
+        target = demand
+    elif current and in_flight / (current * tasks_per_worker) < scale_down_utilization:
+        # Shrink gradually so a short lull doesn't tear down the whole pool.
+        target = max(demand, current - max(1, current // 4))
+    else:
+        target = current
+    return max(min_workers, min(max_workers, target))
+
+
+def _worker_main(tasks, results):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, func, args, kwargs = task
+        results.put((task_id, None, os.getpid()))
+        try:
+            results.put((task_id, True, func(*args, **kwargs)))
+        except Exception as e:
+            results.put((task_id, False, f"{e}\n{traceback.format_exc()}"))
+
+
+class LocalClusterDriver:
+    def __init__(
+        self,
+        cluster_id: str,
+        min_workers: int = 1,
+        max_workers: int = 4,
+        initial_workers: Optional[int] = None,
+        auto_scaling: bool = True,
+        cooldown: float = 30.0,
+        tasks_per_worker: int = 1,
+        scale_down_utilization: float = 0.5,
+        poll_interval: float = 2.0,
+        on_status: Optional[Callable[["LocalClusterDriver", str], None]] = None,
+    ):
+        self.cluster_id = cluster_id
+        self.min_workers = max(min_workers, 0)
+        self.max_workers = max(max_workers, self.min_workers, 1)
+        self.auto_scaling = auto_scaling
+        self.cooldown = cooldown
+        self.tasks_per_worker = tasks_per_worker
+        self.scale_down_utilization = scale_down_utilization
+        self.poll_interval = poll_interval
+        self.on_status = on_status
+        self.endpoint_url = f"local://{socket.gethostname()}:{os.getpid()}/clusters/{cluster_id}"
+        self.status = "stopped"
+
+        initial = initial_workers if initial_workers is not None else self.min_workers
+        self._initial_workers = max(self.min_workers, min(self.max_workers, initial))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        # SimpleQueue writes in the caller, so a start message is in the pipe before the task can crash the worker.
+        self._results = self._ctx.SimpleQueue()
+        self._processes: List[multiprocessing.Process] = []
+        self._retiring = 0
+        self._futures: Dict[str, Future] = {}
+        # pid -> task it is running, and exit codes of reaped workers whose start message may still be queued
+        self._running: Dict[int, str] = {}
+        self._dead: Dict[int, Optional[int]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._last_scaled = 0.0
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def num_workers(self) -> int:
+        with self._lock:
+            self._reap_dead()
+            return self._live_workers()
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def start(self):
+        self._set_status("starting")
+        with self._lock:
+            for _ in range(self._initial_workers):
+                self._spawn_worker()
+        self._last_scaled = time.monotonic()
+        for target, name in ((self._collect_results, "results"), (self._supervise, "supervisor")):
+            thread = threading.Thread(target=target, name=f"local-cluster-{self.cluster_id[:8]}-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._set_status("running")
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        if self._stopped.is_set():
+            raise RuntimeError(f"Local cluster {self.cluster_id} is stopped")
+        future: Future = Future()
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self._futures[task_id] = future
+            if self._live_workers() == 0:
+                self._spawn_worker()
+        self._tasks.put((task_id, func, args, kwargs))
+        return future
+
+    def resize_bounds(self, min_workers: int, max_workers: int, auto_scaling: bool):
+        with self._lock:
+            self.min_workers = max(min_workers, 0)
+            self.max_workers = max(max_workers, self.min_workers, 1)
+            self.auto_scaling = auto_scaling
+
+    def stop(self, final_status: str = "stopped"):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        with self._lock:
+            processes = list(self._processes)
+        for _ in processes:
+            self._tasks.put(None)
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=5)
+        with self._lock:
+            self._processes.clear()
+            for future in self._futures.values():
+                future.set_exception(RuntimeError(f"Local cluster {self.cluster_id} stopped"))
+            self._futures.clear()
+            self._running.clear()
+        self.endpoint_url = None
+        self._set_status(final_status)
+
+    def scale_once(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._reap_dead()
+            current = self._live_workers()
+            if not self.auto_scaling:
+                target = max(self.min_workers, min(self.max_workers, current))
+            else:
+                target = compute_target_workers(
+                    current, len(self._futures), self.min_workers, self.max_workers,
+                    self.tasks_per_worker, self.scale_down_utilization,
+                )
+            if target == current:
+                return
+            out_of_bounds = current < self.min_workers or current > self.max_workers
+            if not out_of_bounds and now - self._last_scaled < self.cooldown:
+                return
+            for _ in range(target - current):
+                self._spawn_worker()
+            for _ in range(current - target):
+                self._retiring += 1
+                self._tasks.put(None)
+            self._last_scaled = now
+        print(f"📈 Local cluster {self.cluster_id} scaled {current} -> {target} workers")
+        self._set_status(self.status)
+
+    def _live_workers(self) -> int:
+        return sum(1 for process in self._processes if process.is_alive()) - self._retiring
+
+    def _spawn_worker(self):
+        process = self._ctx.Process(target=_worker_main, args=(self._tasks, self._results), daemon=True)
+        process.start()
+        self._dead.pop(process.pid, None)
+        self._processes.append(process)
+
+    def _reap_dead(self):
+        alive = []
+        for process in self._processes:
+            if process.is_alive():
+                alive.append(process)
+                continue
+            if process.exitcode == 0 and self._retiring:
+                self._retiring -= 1
+            self._dead[process.pid] = process.exitcode
+            task_id = self._running.pop(process.pid, None)
+            if task_id is not None:
+                self._fail_task(task_id, process.exitcode)
+        self._processes = alive
+
+    def _fail_task(self, task_id: str, exitcode: Optional[int]):
+        future = self._futures.pop(task_id, None)
+        if future is not None:
+            future.set_exception(RuntimeError(
+                f"Local cluster {self.cluster_id} worker died (exit code {exitcode}) while running a task"
+            ))
+
+    def _collect_results(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            task_id, ok, value = item
+            if ok is None:
+                # value is the pid of the worker that picked the task up.
+                with self._lock:
+                    if value in self._dead:
+                        self._fail_task(task_id, self._dead[value])
+                    elif task_id in self._futures:
+                        self._running[value] = task_id
+                continue
+            with self._lock:
+                self._running = {pid: running for pid, running in self._running.items() if running != task_id}
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _supervise(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.scale_once()
+            except Exception as e:
+                print(f"❌ Local cluster {self.cluster_id} autoscaler error: {e}")
+
+    def _set_status(self, status: str):
+        self.status = status
+        if self.on_status is not None:
+            try:
+                self.on_status(self, status)
+            except Exception as e:
+                print(f"❌ Failed to record status for local cluster {self.cluster_id}: {e}")
+
+
+def get_local_cluster(cluster_id: str) -> Optional[LocalClusterDriver]:
+    with _drivers_lock:
+        return _drivers.get(cluster_id)
+
+
+def start_local_cluster(engine, cluster_id: str, cooldown: float = 30.0) -> LocalClusterDriver:
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("""
+                SELECT num_workers, auto_scaling, min_workers, max_workers
+                FROM compute_clusters WHERE id = :id
+            """),
+            {"id": cluster_id}
+        ).fetchone()
+    if row is None:
+        raise ValueError(f"Compute cluster {cluster_id} not found")
+
+    with _drivers_lock:
+        existing = _drivers.get(cluster_id)
+        if existing is not None and existing.status in ("starting", "running"):
+            return existing
+
+        def record_status(driver: LocalClusterDriver, status: str):
+            with engine.begin() as conn:
+                conn.execute(
+                    text("""
+                        UPDATE compute_clusters
+                        SET status = :status, endpoint_url = :endpoint_url,
+                            num_workers = COALESCE(:num_workers, num_workers)
+                        WHERE id = :id
+                    """),
+                    {
+                        "id": driver.cluster_id,
+                        "status": status,
+                        "endpoint_url": driver.endpoint_url if status in ("starting", "running") else None,
+                        "num_workers": driver.num_workers if status == "running" else None,
+                    }
+                )
+
+        driver = LocalClusterDriver(
+            cluster_id,
+            min_workers=row[2] if row[2] is not None else 1,
+            max_workers=row[3] if row[3] is not None else row[0],
+            initial_workers=row[0],
+            auto_scaling=bool(row[1]),
+            cooldown=cooldown,
+            on_status=record_status,
+        )
+        _drivers[cluster_id] = driver
+
+    if existing is not None:
+        # A failed driver can still own processes and threads; its status must not overwrite the new one's.
+        existing.on_status = None
+        existing.stop()
+    driver.start()
+    threading.Thread(
+        target=_watch_cluster_row, args=(engine, driver), name=f"local-cluster-{cluster_id[:8]}-watch", daemon=True
+    ).start()
+    return driver
+
+
+def _watch_cluster_row(engine, driver: LocalClusterDriver, interval: float = 5.0):
+    while not driver._stopped.wait(interval):
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(
+                    text("SELECT status, auto_scaling, min_workers, max_workers FROM compute_clusters WHERE id = :id"),
+                    {"id": driver.cluster_id}
+                ).fetchone()
+        except Exception as e:
+            print(f"❌ Failed to poll local cluster {driver.cluster_id}: {e}")
+            continue
+        if row is None or row[0] in ("stopped", "terminated"):
+            stop_local_cluster(driver.cluster_id, row[0] if row else "terminated")
+            return
+        driver.resize_bounds(row[2] if row[2] is not None else driver.min_workers,
+                             row[3] if row[3] is not None else driver.max_workers,
+                             bool(row[1]))
+
+
+def stop_local_cluster(cluster_id: str, final_status: str = "stopped"):
+    with _drivers_lock:
+        driver = _drivers.pop(cluster_id, None)
+    if driver is not None:
+        driver.stop(final_status)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def reconcile_local_clusters(engine) -> List[str]:
+    """Marks stopped the process clusters whose pool belonged to a process on this host that no longer runs."""
+    prefix = f"local://{socket.gethostname()}:"
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("""
+                SELECT id, endpoint_url FROM compute_clusters
+                WHERE compute_type = 'process' AND status IN ('starting', 'running') AND endpoint_url LIKE :pattern
+            """),
+            {"pattern": prefix.replace("%", r"\%").replace("_", r"\_") + "%"}
+        ).fetchall()
+    stale = []
+    for cluster_id, endpoint_url in rows:
+        pid = endpoint_url[len(prefix):].split("/", 1)[0]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            stale.append(str(cluster_id))
+    if stale:
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE compute_clusters SET status = 'stopped', endpoint_url = NULL, updated_at = now()
+                    WHERE id = ANY(CAST(:ids AS uuid[])) AND status IN ('starting', 'running')
+                """),
+                {"ids": stale}
+            )
+    return stale
@@ -20,6 +20,8 @@ import hashlib
 import hmac
 import base64
 
+from compression import CompressionMiddleware
+
 # Load environment variables
 load_dotenv()
 
@@ -39,6 +41,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (gzip/br/zstd)
+app.add_middleware(CompressionMiddleware)
+
 # Security
 security = HTTPBearer()
 
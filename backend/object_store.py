@@ -0,0 +1,773 @@
+"""
+Parallel object I/O for S3, GCS, Azure Blob and filesystem data sources.
+
+Backends expose only the store primitives: size, ranged read, single put and
+a multipart upload. TransferEngine builds transfers on top of them. A read
+is split into OBJECT_IO_PART_SIZE ranges and up to OBJECT_IO_CONCURRENCY
+ranged GETs run at once. Parts are yielded in order as they complete, so a
+consumer such as a preview response, a CSV parser or an upload to another
+store starts on the first part. At most `concurrency` parts are held in
+memory. Nothing is staged on disk.
+
+A write reads its input stream one part at a time and uploads parts in
+parallel, with the same bound on memory. Input shorter than one part
+becomes a single put. Each part is retried up to OBJECT_IO_RETRIES times
+with exponential backoff and jitter. A transient failure therefore costs
+one part, not the whole object. Errors a backend marks as permanent
+(missing object, access denied) fail at once and abort the upload.
+
+SDKs are optional: boto3 (s3, and any S3-compatible endpoint via the
+config's endpointUrl), google-cloud-storage (gcs) and azure-storage-blob
+(azure_blob). A source whose SDK is missing raises ObjectStoreUnavailable.
+
+Sources are created by users, so validate_config requires their own
+credentials (an s3 or gcs source never falls back to the server's ambient
+credentials) and an endpointUrl must resolve to public addresses only,
+unless its host is listed in OBJECT_IO_ENDPOINT_ALLOWLIST. SDK and OS
+errors surface as ObjectStoreError.
+
+Benchmark sequential against parallel transfers. The filesystem runs can
+add simulated per-request latency and failures; the S3 run needs an
+S3-compatible endpoint such as MinIO or `moto_server`:
+    python object_store.py [--size-mb 256] [--latency-ms 20] [--fail-rate 0.05]
+    python object_store.py --s3-endpoint http://localhost:5000 --bucket bench
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import ipaddress
+import json
+import os
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from connectors import config_hash
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    boto3 = None
+
+try:
+    from google.api_core import exceptions as gcs_exceptions
+    from google.cloud import storage as gcs_storage
+    from google.oauth2 import service_account
+except ImportError:
+    gcs_storage = None
+
+try:
+    from azure.core.exceptions import AzureError, HttpResponseError, ResourceNotFoundError
+    from azure.storage.blob import BlobBlock, BlobServiceClient
+except ImportError:
+    BlobServiceClient = None
+
+OBJECT_IO_PART_SIZE = int(os.getenv("OBJECT_IO_PART_SIZE", str(8 * 1024 * 1024)))
+OBJECT_IO_CONCURRENCY = int(os.getenv("OBJECT_IO_CONCURRENCY", "8"))
+OBJECT_IO_RETRIES = int(os.getenv("OBJECT_IO_RETRIES", "3"))
+OBJECT_IO_RETRY_DELAY = float(os.getenv("OBJECT_IO_RETRY_DELAY", "0.25"))
+OBJECT_IO_ROOT = os.getenv("OBJECT_IO_ROOT", "")
+OBJECT_IO_ENDPOINT_ALLOWLIST = {
+    host.strip().lower() for host in os.getenv("OBJECT_IO_ENDPOINT_ALLOWLIST", "").split(",") if host.strip()
+}
+
+OBJECT_STORE_TYPES = ("s3", "gcs", "azure_blob", "filesystem")
+
+# S3's limits; GCS and Azure allow at least as much.
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+# GCS composes at most 32 source objects per request.
+GCS_COMPOSE_LIMIT = 32
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class ObjectStoreError(Exception):
+    pass
+
+
+class ObjectNotFound(ObjectStoreError):
+    pass
+
+
+class UnsupportedObjectStore(ObjectStoreError):
+    pass
+
+
+class ObjectStoreUnavailable(ObjectStoreError):
+    pass
+
+
+class ObjectBackend:
+    """Store primitives. Read ranges are inclusive; part numbers start at 1."""
+
+    min_part_size = 1
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        raise NotImplementedError
+
+    def list(self, prefix: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    def create_upload(self, key: str) -> str:
+        raise NotImplementedError
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        raise NotImplementedError
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        raise NotImplementedError
+
+    def abort_upload(self, key: str, upload_id: str):
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        return not isinstance(error, (ObjectNotFound, UnsupportedObjectStore, ObjectStoreUnavailable))
+
+
+@contextmanager
+def _filesystem_errors(key: str) -> Iterator[None]:
+    try:
+        yield
+    except FileNotFoundError:
+        raise ObjectNotFound(key)
+    except OSError as e:
+        raise ObjectStoreError(f"{key}: {e.strerror or e}") from e
+
+
+class FilesystemBackend(ObjectBackend):
+    """Keys are paths under root. Parts are written at their offsets into a temporary file in the
+    target directory, which replaces the target only once every part has landed."""
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, key.lstrip("/")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise ObjectNotFound(key)
+        return path
+
+    def size(self, key: str) -> int:
+        with _filesystem_errors(key):
+            return os.path.getsize(self._path(key))
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        with _filesystem_errors(key), open(self._path(key), "rb") as handle:
+            handle.seek(start)
+            return handle.read(end - start + 1)
+
+    def list(self, prefix: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        with _filesystem_errors(prefix):
+            return self._list(prefix, limit)
+
+    def _list(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        objects = []
+        for directory, directories, files in os.walk(self.root):
+            directories.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if name.startswith(".upload-") or not key.startswith(prefix):
+                    continue
+                stat = os.stat(path)
+                objects.append({"key": key, "size": stat.st_size, "last_modified": stat.st_mtime})
+                if len(objects) >= limit:
+                    return objects
+        return objects
+
+    def put(self, key: str, data: bytes):
+        upload_id = self.create_upload(key)
+        try:
+            self.upload_part(key, upload_id, 1, 0, data)
+            self.complete_upload(key, upload_id, [(1, "")])
+        except BaseException:
+            self.abort_upload(key, upload_id)
+            raise
+
+    def create_upload(self, key: str) -> str:
+        path = self._path(key)
+        with _filesystem_errors(key):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+            os.close(fd)
+        return os.path.basename(tmp_path)
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        with _filesystem_errors(key):
+            fd = os.open(os.path.join(os.path.dirname(self._path(key)), upload_id), os.O_WRONLY)
+            try:
+                view = memoryview(data)
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view, offset = view[written:], offset + written
+            finally:
+                os.close(fd)
+        return str(number)
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        path = self._path(key)
+        with _filesystem_errors(key):
+            os.replace(os.path.join(os.path.dirname(path), upload_id), path)
+
+    def abort_upload(self, key: str, upload_id: str):
+        try:
+            os.unlink(os.path.join(os.path.dirname(self._path(key)), upload_id))
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend(ObjectBackend):
+    min_part_size = MIN_PART_SIZE
+
+    def __init__(self, bucket: str, region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, endpoint_url: Optional[str] = None,
+                 max_connections: int = OBJECT_IO_CONCURRENCY):
+        if boto3 is None:
+            raise ObjectStoreUnavailable("boto3 is not installed")
+        self.bucket = bucket
+        # TransferEngine retries each part itself; botocore retrying underneath would multiply attempts.
+        try:
+            self.client = boto3.client(
+                "s3", region_name=region or None, endpoint_url=endpoint_url or None,
+                aws_access_key_id=access_key_id or None, aws_secret_access_key=secret_access_key or None,
+                config=BotoConfig(max_pool_connections=max(max_connections, 10), retries={"max_attempts": 1}),
+            )
+        except (BotoCoreError, ValueError) as e:
+            raise UnsupportedObjectStore(f"Invalid S3 configuration: {e}")
+
+    @contextmanager
+    def _errors(self, key: str) -> Iterator[None]:
+        try:
+            yield
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound"):
+                raise ObjectNotFound(key)
+            raise ObjectStoreError(f"S3 {key}: {e}") from e
+        except BotoCoreError as e:
+            raise ObjectStoreError(f"S3 {key}: {e}") from e
+
+    def _call(self, key: str, operation: Callable[..., Any], **kwargs) -> Any:
+        with self._errors(key):
+            return operation(Bucket=self.bucket, Key=key, **kwargs)
+
+    def size(self, key: str) -> int:
+        return self._call(key, self.client.head_object)["ContentLength"]
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        return self._call(key, self.client.get_object, Range=f"bytes={start}-{end}")["Body"].read()
+
+    def list(self, prefix: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        with self._errors(prefix):
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix,
+                                           PaginationConfig={"MaxItems": limit, "PageSize": min(limit, 1000)}):
+                for item in page.get("Contents", []):
+                    objects.append({"key": item["Key"], "size": item["Size"],
+                                    "last_modified": item["LastModified"].timestamp()})
+        return objects
+
+    def put(self, key: str, data: bytes):
+        self._call(key, self.client.put_object, Body=data)
+
+    def create_upload(self, key: str) -> str:
+        return self._call(key, self.client.create_multipart_upload)["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        return self._call(key, self.client.upload_part, UploadId=upload_id, PartNumber=number, Body=data)["ETag"]
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self._call(key, self.client.complete_multipart_upload, UploadId=upload_id,
+                   MultipartUpload={"Parts": [{"PartNumber": number, "ETag": etag} for number, etag in parts]})
+
+    def abort_upload(self, key: str, upload_id: str):
+        self._call(key, self.client.abort_multipart_upload, UploadId=upload_id)
+
+    def is_retryable(self, error: Exception) -> bool:
+        # _errors wraps SDK errors; retry decisions still look at the original.
+        cause = error.__cause__ if isinstance(error, ObjectStoreError) and error.__cause__ else error
+        if isinstance(cause, ClientError):
+            status = cause.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            code = cause.response.get("Error", {}).get("Code", "")
+            return status in _RETRYABLE_STATUS or "Throttl" in code or code in ("RequestTimeout", "SlowDown")
+        return isinstance(cause, BotoCoreError) or super().is_retryable(error)
+
+
+class GCSBackend(ObjectBackend):
+    """Parts upload as temporary objects that compose() joins, at most GCS_COMPOSE_LIMIT at a time."""
+
+    def __init__(self, bucket: str, project: Optional[str] = None, service_account_info: Optional[Dict[str, Any]] = None):
+        if gcs_storage is None:
+            raise ObjectStoreUnavailable("google-cloud-storage is not installed")
+        credentials = None
+        if service_account_info:
+            try:
+                credentials = service_account.Credentials.from_service_account_info(service_account_info)
+            except ValueError as e:
+                raise UnsupportedObjectStore(f"Invalid serviceAccountKey: {e}")
+        self.client = gcs_storage.Client(project=project or None, credentials=credentials)
+        self.bucket = self.client.bucket(bucket)
+
+    def _call(self, key: str, operation: Callable[..., Any], *args, **kwargs) -> Any:
+        try:
+            return operation(*args, **kwargs)
+        except gcs_exceptions.NotFound:
+            raise ObjectNotFound(key)
+
+    def _part_name(self, key: str, upload_id: str, number: int) -> str:
+        return f"{key}.upload-{upload_id}/{number:05d}"
+
+    def size(self, key: str) -> int:
+        blob = self._call(key, self.bucket.get_blob, key)
+        if blob is None:
+            raise ObjectNotFound(key)
+        return blob.size
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        return self._call(key, self.bucket.blob(key).download_as_bytes, start=start, end=end, checksum=None)
+
+    def list(self, prefix: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        return [{"key": blob.name, "size": blob.size, "last_modified": blob.updated.timestamp() if blob.updated else None}
+                for blob in self.client.list_blobs(self.bucket, prefix=prefix or None, max_results=limit)]
+
+    def put(self, key: str, data: bytes):
+        self.bucket.blob(key).upload_from_string(data)
+
+    def create_upload(self, key: str) -> str:
+        return uuid.uuid4().hex
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        name = self._part_name(key, upload_id, number)
+        self.bucket.blob(name).upload_from_string(data)
+        return name
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        names = [name for _, name in sorted(parts)]
+        target = self.bucket.blob(key)
+        target.compose([self.bucket.blob(name) for name in names[:GCS_COMPOSE_LIMIT]])
+        for index in range(GCS_COMPOSE_LIMIT, len(names), GCS_COMPOSE_LIMIT - 1):
+            chunk = names[index:index + GCS_COMPOSE_LIMIT - 1]
+            target.compose([target] + [self.bucket.blob(name) for name in chunk])
+        self.abort_upload(key, upload_id)
+
+    def abort_upload(self, key: str, upload_id: str):
+        blobs = list(self.client.list_blobs(self.bucket, prefix=f"{key}.upload-{upload_id}/"))
+        if blobs:
+            self.bucket.delete_blobs(blobs, on_error=lambda blob: None)
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, gcs_exceptions.GoogleAPICallError):
+            return getattr(error, "code", None) in _RETRYABLE_STATUS
+        return super().is_retryable(error)
+
+
+class AzureBlobBackend(ObjectBackend):
+    """Parts are staged as uncommitted blocks; commit_block_list publishes them in order. Azure
+    discards uncommitted blocks on its own, so aborting needs no request."""
+
+    def __init__(self, account_name: str, account_key: str, container: str):
+        if BlobServiceClient is None:
+            raise ObjectStoreUnavailable("azure-storage-blob is not installed")
+        service = BlobServiceClient(f"https://{account_name}.blob.core.windows.net", credential=account_key)
+        self.container = service.get_container_client(container)
+
+    def _call(self, key: str, operation: Callable[..., Any], *args, **kwargs) -> Any:
+        try:
+            return operation(*args, **kwargs)
+        except ResourceNotFoundError:
+            raise ObjectNotFound(key)
+
+    def size(self, key: str) -> int:
+        return self._call(key, self.container.get_blob_client(key).get_blob_properties).size
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        return self._call(key, self.container.download_blob, key, offset=start, length=end - start + 1).readall()
+
+    def list(self, prefix: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        objects = []
+        for blob in self.container.list_blobs(name_starts_with=prefix or None):
+            objects.append({"key": blob.name, "size": blob.size,
+                            "last_modified": blob.last_modified.timestamp() if blob.last_modified else None})
+            if len(objects) >= limit:
+                break
+        return objects
+
+    def put(self, key: str, data: bytes):
+        self.container.upload_blob(key, data, overwrite=True)
+
+    def create_upload(self, key: str) -> str:
+        return uuid.uuid4().hex
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        # Block ids must all have the same length within a blob.
+        block_id = base64.b64encode(f"{upload_id}-{number:05d}".encode()).decode()
+        self.container.get_blob_client(key).stage_block(block_id, data, length=len(data))
+        return block_id
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self.container.get_blob_client(key).commit_block_list([BlobBlock(block_id=block) for _, block in sorted(parts)])
+
+    def abort_upload(self, key: str, upload_id: str):
+        pass
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, HttpResponseError):
+            return error.status_code in _RETRYABLE_STATUS
+        return isinstance(error, AzureError) or super().is_retryable(error)
+
+
+def _check_endpoint(url: str):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsupportedObjectStore("endpointUrl must be an http(s) URL")
+    if parts.hostname.lower() in OBJECT_IO_ENDPOINT_ALLOWLIST:
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise UnsupportedObjectStore(f"endpointUrl host '{parts.hostname}' does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        # Covers loopback, link-local (cloud metadata), private and reserved ranges.
+        if not ip.is_global:
+            raise UnsupportedObjectStore("endpointUrl must not point at a private, loopback or link-local address")
+
+
+def validate_config(source_type: str, config: Dict[str, Any]):
+    """Rejects s3 and gcs configs without their own credentials, and endpointUrls that reach internal addresses."""
+    if source_type == "s3":
+        if not config.get("accessKeyId") or not config.get("secretAccessKey"):
+            raise UnsupportedObjectStore("S3 sources need an accessKeyId and secretAccessKey")
+        if config.get("endpointUrl"):
+            _check_endpoint(config["endpointUrl"])
+    elif source_type == "gcs":
+        key = config.get("serviceAccountKey")
+        if isinstance(key, str):
+            try:
+                key = json.loads(key) if key.strip() else None
+            except ValueError:
+                raise UnsupportedObjectStore("serviceAccountKey is not valid JSON")
+        if not isinstance(key, dict) or not key:
+            raise UnsupportedObjectStore("GCS sources need a serviceAccountKey")
+
+
+def build_backend(source_type: str, config: Dict[str, Any]) -> ObjectBackend:
+    """config is data_sources.config as the S3, GCS and Azure Blob forms store it."""
+    validate_config(source_type, config)
+    if source_type == "s3":
+        return S3Backend(config.get("bucket"), config.get("region"), config.get("accessKeyId"),
+                         config.get("secretAccessKey"), config.get("endpointUrl"))
+    if source_type == "gcs":
+        key = config.get("serviceAccountKey")
+        key = json.loads(key) if isinstance(key, str) else key
+        return GCSBackend(config.get("bucketName"), config.get("projectId") or key.get("project_id"), key)
+    if source_type == "azure_blob":
+        return AzureBlobBackend(config.get("accountName"), config.get("accountKey"), config.get("containerName"))
+    if source_type == "filesystem":
+        # Only directories under OBJECT_IO_ROOT; unset means filesystem sources are disabled.
+        if not OBJECT_IO_ROOT:
+            raise UnsupportedObjectStore("Filesystem sources are disabled (OBJECT_IO_ROOT is not set)")
+        root = os.path.realpath(os.path.join(OBJECT_IO_ROOT, (config.get("path") or "").lstrip("/")))
+        if root != os.path.realpath(OBJECT_IO_ROOT) and not root.startswith(os.path.realpath(OBJECT_IO_ROOT) + os.sep):
+            raise UnsupportedObjectStore("Filesystem source path must be inside OBJECT_IO_ROOT")
+        return FilesystemBackend(root)
+    raise UnsupportedObjectStore(f"Data source type '{source_type}' is not an object store")
+
+
+_backends: Dict[str, Tuple[str, ObjectBackend]] = {}
+_backends_lock = threading.Lock()
+
+
+def backend_for_source(source: Dict[str, Any]) -> ObjectBackend:
+    """SDK clients are thread-safe and slow to build, so each source keeps one until its config changes."""
+    source_id = str(source["id"])
+    fingerprint = config_hash(source["type"], source.get("config") or {})
+    with _backends_lock:
+        cached = _backends.get(source_id)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+    backend = build_backend(source["type"], source.get("config") or {})
+    with _backends_lock:
+        _backends[source_id] = (fingerprint, backend)
+    return backend
+
+
+class TransferEngine:
+    def __init__(
+        self,
+        part_size: int = OBJECT_IO_PART_SIZE,
+        concurrency: int = OBJECT_IO_CONCURRENCY,
+        retries: int = OBJECT_IO_RETRIES,
+        retry_delay: float = OBJECT_IO_RETRY_DELAY,
+    ):
+        self.part_size = part_size
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self.retried = 0
+
+    def _attempt(self, backend: ObjectBackend, operation: Callable[..., Any], *args) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return operation(*args)
+            except Exception as e:
+                if attempt >= self.retries or not backend.is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+                attempt += 1
+
+    def iter_object(self, backend: ObjectBackend, key: str, start: int = 0, end: Optional[int] = None,
+                    size: Optional[int] = None) -> Iterator[bytes]:
+        """Yields bytes [start, end] (inclusive; end defaults to the last byte) one part at a time, in order."""
+        if end is None:
+            end = (size if size is not None else self._attempt(backend, backend.size, key)) - 1
+        ranges = ((offset, min(offset + self.part_size, end + 1) - 1)
+                  for offset in range(start, end + 1, self.part_size))
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="object-read")
+        window: deque = deque()
+        try:
+            for first, last in ranges:
+                window.append(pool.submit(self._attempt, backend, backend.read_range, key, first, last))
+                if len(window) >= self.concurrency:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            # A consumer that stops early (a preview, a closed response) must not wait for read-ahead.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def read_ranges(self, backend: ObjectBackend, key: str, ranges: List[Tuple[int, int]]) -> List[bytes]:
+        """Fetches several inclusive ranges of one object at once; ranges longer than a part are split."""
+        pieces = [(index, first, min(first + self.part_size, end + 1) - 1)
+                  for index, (start, end) in enumerate(ranges)
+                  for first in range(start, end + 1, self.part_size)]
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="object-read") as pool:
+            data = pool.map(lambda piece: self._attempt(backend, backend.read_range, key, piece[1], piece[2]), pieces)
+            joined: List[List[bytes]] = [[] for _ in ranges]
+            for (index, _, _), chunk in zip(pieces, data):
+                joined[index].append(chunk)
+        return [b"".join(chunks) for chunks in joined]
+
+    def open(self, backend: ObjectBackend, key: str, start: int = 0, end: Optional[int] = None,
+             size: Optional[int] = None) -> io.BufferedReader:
+        """A file object over iter_object, for parsers that want read() rather than chunks."""
+        return io.BufferedReader(_ChunkReader(self.iter_object(backend, key, start, end, size)),
+                                 buffer_size=min(self.part_size, 1024 * 1024))
+
+    def upload(self, backend: ObjectBackend, key: str, chunks: Iterable[bytes],
+               size_hint: Optional[int] = None) -> Dict[str, Any]:
+        part_size = max(self.part_size, backend.min_part_size)
+        if size_hint:
+            part_size = max(part_size, -(-size_hint // MAX_PARTS))
+        started = time.perf_counter()
+        retried = self.retried
+        parts = _split_parts(chunks, part_size)
+        first = next(parts, b"")
+        second = next(parts, None)
+        if second is None:
+            self._attempt(backend, backend.put, key, first)
+            return {"key": key, "size": len(first), "parts": 1, "multipart": False,
+                    "seconds": round(time.perf_counter() - started, 3), "retries": self.retried - retried}
+
+        upload_id = self._attempt(backend, backend.create_upload, key)
+        completed: List[Tuple[int, str]] = []
+        pending = set()
+        total = 0
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="object-write")
+        try:
+            for number, data in enumerate(_chain([first, second], parts), start=1):
+                if number > MAX_PARTS:
+                    raise ObjectStoreError(f"Upload needs more than {MAX_PARTS} parts; pass size_hint or raise part_size")
+                if len(pending) >= self.concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    completed.extend(future.result() for future in done)
+                offset = (number - 1) * part_size
+                pending.add(pool.submit(self._upload_part, backend, key, upload_id, number, offset, data))
+                total += len(data)
+            completed.extend(future.result() for future in wait(pending).done)
+            self._attempt(backend, backend.complete_upload, key, upload_id, sorted(completed))
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            try:
+                backend.abort_upload(key, upload_id)
+            except Exception as e:
+                print(f"❌ Failed to abort upload of {key}: {e}")
+            raise
+        pool.shutdown()
+        return {"key": key, "size": total, "parts": len(completed), "multipart": True,
+                "seconds": round(time.perf_counter() - started, 3), "retries": self.retried - retried}
+
+    def _upload_part(self, backend: ObjectBackend, key: str, upload_id: str, number: int, offset: int,
+                     data: bytes) -> Tuple[int, str]:
+        return number, self._attempt(backend, backend.upload_part, key, upload_id, number, offset, data)
+
+    def copy(self, source: ObjectBackend, source_key: str, target: ObjectBackend, target_key: str) -> Dict[str, Any]:
+        size = self._attempt(source, source.size, source_key)
+        return self.upload(target, target_key, self.iter_object(source, source_key, size=size), size_hint=size)
+
+
+def _split_parts(chunks: Iterable[bytes], part_size: int) -> Iterator[bytes]:
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _chain(head: List[bytes], tail: Iterator[bytes]) -> Iterator[bytes]:
+    yield from head
+    yield from tail
+
+
+class _ChunkReader(io.RawIOBase):
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._current = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._current = memoryview(chunk)
+        count = min(len(buffer), len(self._current))
+        buffer[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+    def close(self):
+        if not self.closed:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+        super().close()
+
+
+class _SimulatedRemote(ObjectBackend):
+    """Wraps a backend with a fixed per-request latency and random transient failures."""
+
+    def __init__(self, inner: ObjectBackend, latency: float, fail_rate: float):
+        self.inner = inner
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.min_part_size = inner.min_part_size
+
+    def _request(self, operation: Callable[..., Any], *args) -> Any:
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            raise ConnectionResetError("simulated transient failure")
+        return operation(*args)
+
+    def size(self, key: str) -> int:
+        return self._request(self.inner.size, key)
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        return self._request(self.inner.read_range, key, start, end)
+
+    def put(self, key: str, data: bytes):
+        self._request(self.inner.put, key, data)
+
+    def create_upload(self, key: str) -> str:
+        return self._request(self.inner.create_upload, key)
+
+    def upload_part(self, key: str, upload_id: str, number: int, offset: int, data: bytes) -> str:
+        return self._request(self.inner.upload_part, key, upload_id, number, offset, data)
+
+    def complete_upload(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self._request(self.inner.complete_upload, key, upload_id, parts)
+
+    def abort_upload(self, key: str, upload_id: str):
+        self.inner.abort_upload(key, upload_id)
+
+
+def run_benchmark(backend: ObjectBackend, label: str, size_mb: int, part_size: int, concurrency: int):
+    payload_part = os.urandom(1024 * 1024)
+    expected = hashlib.sha256()
+    for _ in range(size_mb):
+        expected.update(payload_part)
+    source = lambda: (payload_part for _ in range(size_mb))  # noqa: E731
+    key = f"object-io-bench/{uuid.uuid4().hex}.bin"
+
+    print(f"{label}: {size_mb} MiB, part size {part_size // (1024 * 1024)} MiB")
+    for workers in sorted({1, concurrency}):
+        engine = TransferEngine(part_size=part_size, concurrency=workers)
+        result = engine.upload(backend, key, source())
+        upload_mbps = size_mb / max(result["seconds"], 1e-9)
+
+        started = time.perf_counter()
+        digest = hashlib.sha256()
+        for chunk in engine.iter_object(backend, key):
+            digest.update(chunk)
+        seconds = time.perf_counter() - started
+        status = "ok" if digest.hexdigest() == expected.hexdigest() else "CHECKSUM MISMATCH"
+        print(f"  concurrency {workers:>2}: upload {upload_mbps:7.1f} MiB/s ({result['parts']} parts), "
+              f"download {size_mb / seconds:7.1f} MiB/s, {engine.retried} part retries, {status}")
+
+        started = time.perf_counter()
+        with engine.open(backend, key) as reader:
+            reader.read(64)
+        print(f"  concurrency {workers:>2}: first 64 bytes after {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel object transfer benchmark")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--part-size-mb", type=int, default=OBJECT_IO_PART_SIZE // (1024 * 1024))
+    parser.add_argument("--concurrency", type=int, default=OBJECT_IO_CONCURRENCY)
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated per-request latency (filesystem)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="simulated transient failure rate (filesystem)")
+    parser.add_argument("--s3-endpoint", default=None, help="S3-compatible endpoint, e.g. MinIO or moto_server")
+    parser.add_argument("--bucket", default="object-io-bench")
+    args = parser.parse_args()
+
+    part_bytes = args.part_size_mb * 1024 * 1024
+    if args.s3_endpoint:
+        s3 = S3Backend(args.bucket, "us-east-1", os.getenv("AWS_ACCESS_KEY_ID", "bench"),
+                       os.getenv("AWS_SECRET_ACCESS_KEY", "bench"), args.s3_endpoint, args.concurrency)
+        try:
+            s3.client.create_bucket(Bucket=args.bucket)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+        run_benchmark(s3, f"s3 {args.s3_endpoint}", args.size_mb, part_bytes, args.concurrency)
+    else:
+        bench_root = tempfile.mkdtemp()
+        try:
+            simulated = _SimulatedRemote(FilesystemBackend(bench_root), args.latency_ms / 1000, args.fail_rate)
+            run_benchmark(simulated, f"filesystem +{args.latency_ms:g} ms/request, {args.fail_rate:.0%} failures",
+                          args.size_mb, part_bytes, args.concurrency)
+        finally:
+            shutil.rmtree(bench_root)
@@ -0,0 +1,259 @@
+"""
+Pipeline run history and per-node performance telemetry.
+
+Runs are recorded append-only once they finish. RunTelemetryWriter buffers
+run and node records in memory and flushes them in batched multi-row
+INSERTs from a background thread, so executors never pay a database round
+trip per node.
+"""
+
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import column, insert, table, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import DataError, IntegrityError
+
+RUN_METRICS = ("rows_in", "rows_out", "bytes_in", "bytes_out", "peak_memory_bytes", "spill_bytes",
+               "rows_scanned", "bytes_skipped")
+
+# The CHECK constraints on pipeline_runs.status and pipeline_node_runs.status
+RUN_STATUSES = ("succeeded", "failed", "cancelled")
+NODE_STATUSES = RUN_STATUSES + ("skipped",)
+
+pipeline_runs_table = table(
+    "pipeline_runs",
+    column("id"), column("pipeline_id"), column("status"), column("trigger"),
+    column("started_at"), column("finished_at"), column("duration_ms"),
+    *[column(name) for name in RUN_METRICS],
+    column("error"),
+)
+
+pipeline_node_runs_table = table(
+    "pipeline_node_runs",
+    column("run_id"), column("pipeline_id"), column("node_id"), column("node_type"),
+    column("status"), column("started_at"), column("finished_at"), column("duration_ms"),
+    *[column(name) for name in RUN_METRICS],
+    column("metrics", JSONB),
+)
+
+
+def _parse_time(value) -> datetime:
+    """An aware UTC datetime; naive values are taken to be UTC already."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _duration_ms(started_at: datetime, finished_at: datetime) -> int:
+    return max(0, int((finished_at - started_at).total_seconds() * 1000))
+
+
+def _status(value: Any, allowed) -> str:
+    if value not in allowed:
+        raise ValueError(f"status must be one of {', '.join(allowed)}")
+    return value
+
+
+def _metrics(data: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = {}
+    for name in RUN_METRICS:
+        value = data.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(f"{name} must be an integer")
+        metrics[name] = value
+    return metrics
+
+
+def build_run_record(pipeline_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    started_at = _parse_time(data["started_at"])
+    finished_at = _parse_time(data["finished_at"])
+    run_id = data.get("id")
+    record = {
+        "id": str(uuid.UUID(str(run_id))) if run_id else str(uuid.uuid4()),
+        "pipeline_id": pipeline_id,
+        "status": _status(data.get("status", "succeeded"), RUN_STATUSES),
+        "trigger": str(data.get("trigger", "manual")),
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "duration_ms": _duration_ms(started_at, finished_at),
+        "error": data.get("error"),
+    }
+    record.update(_metrics(data))
+    return record
+
+
+def build_node_run_record(run: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    started_at = _parse_time(data["started_at"])
+    finished_at = _parse_time(data["finished_at"])
+    if not isinstance(data["node_id"], str) or not data["node_id"]:
+        raise ValueError("node_id must be a non-empty string")
+    metrics = data.get("metrics") or {}
+    if not isinstance(metrics, dict):
+        raise ValueError("metrics must be an object")
+    record = {
+        "run_id": run["id"],
+        "pipeline_id": run["pipeline_id"],
+        "node_id": data["node_id"],
+        "node_type": data.get("node_type"),
+        "status": _status(data.get("status", run["status"]), NODE_STATUSES),
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "duration_ms": _duration_ms(started_at, finished_at),
+        "metrics": metrics,
+    }
+    record.update(_metrics(data))
+    return record
+
+
+class RunTelemetryWriter:
+    def __init__(self, engine, batch_size: int = 500, flush_interval: float = 2.0):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._runs: List[Dict[str, Any]] = []
+        self._node_runs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, pipeline_id: str, data: Dict[str, Any]) -> str:
+        run = build_run_record(pipeline_id, data)
+        node_runs = [build_node_run_record(run, node) for node in data.get("nodes", [])]
+        with self._lock:
+            self._runs.append(run)
+            self._node_runs.extend(node_runs)
+            pending = len(self._runs) + len(self._node_runs)
+        if self._thread is None:
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+        return run["id"]
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                runs, self._runs = self._runs, []
+                node_runs, self._node_runs = self._node_runs, []
+            if not runs and not node_runs:
+                return
+            try:
+                self._insert(runs, node_runs)
+            except (IntegrityError, DataError):
+                # Some record the database rejects (a duplicate id, a deleted pipeline); retrying the batch
+                # would block every later one, so write run by run and drop only the rejected runs.
+                self._insert_each(runs, node_runs)
+            except Exception:
+                with self._lock:
+                    self._runs[:0] = runs
+                    self._node_runs[:0] = node_runs
+                raise
+
+    def _insert(self, runs: List[Dict[str, Any]], node_runs: List[Dict[str, Any]]):
+        with self.engine.begin() as conn:
+            if runs:
+                conn.execute(insert(pipeline_runs_table), runs)
+            if node_runs:
+                conn.execute(insert(pipeline_node_runs_table), node_runs)
+
+    def _insert_each(self, runs: List[Dict[str, Any]], node_runs: List[Dict[str, Any]]):
+        by_run: Dict[str, List[Dict[str, Any]]] = {}
+        for node_run in node_runs:
+            by_run.setdefault(node_run["run_id"], []).append(node_run)
+        for run in runs:
+            try:
+                self._insert([run], by_run.pop(run["id"], []))
+            except (IntegrityError, DataError) as e:
+                print(f"❌ Dropped pipeline run {run['id']} rejected by the database: {str(e).splitlines()[0]}")
+        for run_id, orphans in by_run.items():
+            # Node runs whose run was written in an earlier flush.
+            try:
+                self._insert([], orphans)
+            except (IntegrityError, DataError) as e:
+                print(f"❌ Dropped node runs of pipeline run {run_id}: {str(e).splitlines()[0]}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="run-telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Failed to flush pipeline run telemetry: {e}")
+
+
+def get_run_stats(db, pipeline_id: str, since: datetime, status: Optional[str] = "succeeded") -> Dict[str, Any]:
+    params = {"pipeline_id": pipeline_id, "since": since, "status": status}
+    status_filter = "AND status = :status" if status else ""
+
+    row = db.execute(
+        text(f"""
+            SELECT count(*),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                   max(duration_ms)
+            FROM pipeline_runs
+            WHERE pipeline_id = :pipeline_id AND started_at >= :since {status_filter}
+        """),
+        params
+    ).fetchone()
+
+    node_rows = db.execute(
+        text(f"""
+            SELECT node_id, max(node_type), count(*),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY peak_memory_bytes),
+                   sum(spill_bytes), sum(bytes_in), sum(bytes_skipped)
+            FROM pipeline_node_runs
+            WHERE pipeline_id = :pipeline_id AND started_at >= :since {status_filter}
+            GROUP BY node_id
+            ORDER BY 5 DESC NULLS LAST
+        """),
+        params
+    )
+
+    return {
+        "pipeline_id": pipeline_id,
+        "since": since.isoformat(),
+        "runs": row[0],
+        "p50_ms": row[1],
+        "p95_ms": row[2],
+        "max_ms": row[3],
+        "nodes": [
+            {
+                "node_id": r[0],
+                "node_type": r[1],
+                "runs": r[2],
+                "p50_ms": r[3],
+                "p95_ms": r[4],
+                "p95_peak_memory_bytes": r[5],
+                "total_spill_bytes": r[6],
+                "total_bytes_in": r[7],
+                "total_bytes_skipped": r[8],
+            }
+            for r in node_rows
+        ],
+    }
@@ -0,0 +1,331 @@
+"""
+Delta-encoded version history for pipelines.
+
+Every save of a pipeline appends a pipeline_versions row. Most rows hold only
+the change from the previous version: an RFC 6902 JSON patch for
+pipeline_graph and a line-based delta for workflow_yaml. Every
+SNAPSHOT_INTERVAL versions a full snapshot is written instead, so rebuilding
+any version replays at most SNAPSHOT_INTERVAL - 1 deltas.
+
+Diffing two versions rebuilds the older one and rolls it forward when they
+share a snapshot window, otherwise rebuilds both; either way the work is
+bounded by the snapshot interval, not by the length of the history.
+
+Snapshot YAML goes through the blob store, so a large workflow_yaml that
+does not change between snapshots is stored once.
+
+Benchmark without a database:
+    python pipeline_versions.py --nodes 2000 --saves 500
+"""
+
+import argparse
+import copy
+import difflib
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from blob_store import externalize_text, resolve_text
+
+SNAPSHOT_INTERVAL = 20
+
+Patch = List[Dict[str, Any]]
+TextDelta = List[List[Any]]
+
+
+class VersionNotFound(Exception):
+    pass
+
+
+def _pointer(path: str, key: Any) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def json_diff(old: Any, new: Any, path: str = "") -> Patch:
+    """RFC 6902 patch turning old into new. Lists keep their common prefix and suffix."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(old, dict):
+        patch: Patch = []
+        for key in old:
+            if key not in new:
+                patch.append({"op": "remove", "path": _pointer(path, key)})
+        for key, value in new.items():
+            if key not in old:
+                patch.append({"op": "add", "path": _pointer(path, key), "value": value})
+            else:
+                patch.extend(json_diff(old[key], value, _pointer(path, key)))
+        return patch
+    if isinstance(old, list):
+        prefix = 0
+        while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(old), len(new)) - prefix
+               and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]):
+            suffix += 1
+        old_middle = old[prefix:len(old) - suffix]
+        new_middle = new[prefix:len(new) - suffix]
+        patch = []
+        for offset in range(min(len(old_middle), len(new_middle))):
+            patch.extend(json_diff(old_middle[offset], new_middle[offset], _pointer(path, prefix + offset)))
+        for _ in range(len(old_middle) - len(new_middle)):
+            patch.append({"op": "remove", "path": _pointer(path, prefix + len(new_middle))})
+        for offset in range(len(old_middle), len(new_middle)):
+            patch.append({"op": "add", "path": _pointer(path, prefix + offset), "value": new_middle[offset]})
+        return patch
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def _split_pointer(path: str) -> List[str]:
+    return [part.replace("~1", "/").replace("~0", "~") for part in path.split("/")[1:]]
+
+
+def apply_patch(document: Any, patch: Patch, in_place: bool = False) -> Any:
+    if not in_place:
+        document = copy.deepcopy(document)
+    for operation in patch:
+        parts = _split_pointer(operation["path"])
+        if not parts:
+            document = copy.deepcopy(operation.get("value"))
+            continue
+        parent = document
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        key = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if key == "-" else int(key)
+            if operation["op"] == "add":
+                parent.insert(index, copy.deepcopy(operation["value"]))
+            elif operation["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(operation["value"])
+        elif operation["op"] == "remove":
+            del parent[key]
+        else:
+            parent[key] = copy.deepcopy(operation["value"])
+    return document
+
+
+def text_delta(old: str, new: str) -> TextDelta:
+    """[[start, end, replacement_lines], ...] over the old text's lines."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [[i1, i2, new_lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def apply_text_delta(old: str, delta: TextDelta) -> str:
+    lines = old.splitlines(keepends=True)
+    result: List[str] = []
+    cursor = 0
+    for start, end, replacement in delta:
+        result.extend(lines[cursor:start])
+        result.extend(replacement)
+        cursor = end
+    result.extend(lines[cursor:])
+    return "".join(result)
+
+
+def _resolve_yaml(value: Optional[str]) -> str:
+    return resolve_text(value) or ""
+
+
+def rebuild(rows, state: Optional[Tuple[Any, str]] = None) -> Tuple[Any, str]:
+    """Replays (kind, graph, yaml) rows onto state, or from the snapshot the rows start with."""
+    graph, yaml_text = (copy.deepcopy(state[0]), state[1]) if state else (None, "")
+    for kind, graph_data, yaml_data in rows:
+        if kind == "snapshot":
+            graph, yaml_text = copy.deepcopy(graph_data), _resolve_yaml(yaml_data)
+        else:
+            # graph is already a private copy, so patches apply in place.
+            graph = apply_patch(graph, graph_data or [], in_place=True)
+            yaml_text = apply_text_delta(yaml_text, yaml_data or [])
+    return graph, yaml_text
+
+
+def _delta_rows(conn, pipeline_id: str, first: int, last: int):
+    return conn.execute(
+        text("""
+            SELECT version, kind, graph, yaml FROM pipeline_versions
+            WHERE pipeline_id = :pipeline_id AND version BETWEEN :first AND :last
+            ORDER BY version
+        """),
+        {"pipeline_id": pipeline_id, "first": first, "last": last}
+    ).fetchall()
+
+
+def _snapshot_at_or_before(conn, pipeline_id: str, version: int) -> int:
+    snapshot = conn.execute(
+        text("""
+            SELECT max(version) FROM pipeline_versions
+            WHERE pipeline_id = :pipeline_id AND version <= :version AND kind = 'snapshot'
+        """),
+        {"pipeline_id": pipeline_id, "version": version}
+    ).scalar()
+    if snapshot is None:
+        raise VersionNotFound(f"Version {version} not found")
+    return snapshot
+
+
+def load_version(conn, pipeline_id: str, version: int) -> Dict[str, Any]:
+    rows = _delta_rows(conn, pipeline_id, _snapshot_at_or_before(conn, pipeline_id, version), version)
+    if not rows or rows[-1][0] != version:
+        raise VersionNotFound(f"Version {version} not found")
+    graph, yaml_text = rebuild(row[1:] for row in rows)
+    return {"version": version, "pipeline_graph": graph, "workflow_yaml": yaml_text}
+
+
+def diff_versions(conn, pipeline_id: str, from_version: int, to_version: int) -> Dict[str, Any]:
+    low, high = sorted((from_version, to_version))
+    low_snapshot = _snapshot_at_or_before(conn, pipeline_id, low)
+    high_snapshot = _snapshot_at_or_before(conn, pipeline_id, high)
+    if high_snapshot == low_snapshot:
+        rows = _delta_rows(conn, pipeline_id, low_snapshot, high)
+        low_state = rebuild(row[1:] for row in rows if row[0] <= low)
+        high_state = rebuild((row[1:] for row in rows if row[0] > low), state=low_state)
+    else:
+        low_state = rebuild(row[1:] for row in _delta_rows(conn, pipeline_id, low_snapshot, low))
+        high_state = rebuild(row[1:] for row in _delta_rows(conn, pipeline_id, high_snapshot, high))
+    old, new = (low_state, high_state) if from_version <= to_version else (high_state, low_state)
+    return {
+        "from": from_version,
+        "to": to_version,
+        "graph_patch": json_diff(old[0], new[0]),
+        "yaml_diff": "".join(difflib.unified_diff(
+            old[1].splitlines(keepends=True), new[1].splitlines(keepends=True),
+            fromfile=f"v{from_version}", tofile=f"v{to_version}",
+        )),
+    }
+
+
+def record_version(conn, pipeline_id: str, user_id: Optional[str], graph: Any, yaml_text: Optional[str],
+                   message: Optional[str] = None, snapshot_interval: int = SNAPSHOT_INTERVAL) -> Dict[str, Any]:
+    """Appends a version; call in the same transaction as the pipelines UPDATE, which serializes saves."""
+    yaml_text = _resolve_yaml(yaml_text)
+    latest = conn.execute(
+        text("SELECT max(version) FROM pipeline_versions WHERE pipeline_id = :pipeline_id"),
+        {"pipeline_id": pipeline_id}
+    ).scalar()
+    version = (latest or 0) + 1
+
+    if latest is None or (version - 1) % snapshot_interval == 0:
+        kind, graph_data, yaml_data = "snapshot", graph, externalize_text(conn, yaml_text)
+        changes = None
+    else:
+        parent = load_version(conn, pipeline_id, latest)
+        graph_patch = json_diff(parent["pipeline_graph"], graph)
+        yaml_data = text_delta(parent["workflow_yaml"], yaml_text)
+        if not graph_patch and not yaml_data:
+            return {"version": latest, "unchanged": True}
+        kind, graph_data = "delta", graph_patch
+        changes = {"graph_ops": len(graph_patch), "yaml_hunks": len(yaml_data)}
+
+    stored_bytes = len(json.dumps(graph_data)) + len(json.dumps(yaml_data))
+    conn.execute(
+        text("""
+            INSERT INTO pipeline_versions (pipeline_id, version, kind, graph, yaml, message, changes,
+                                           stored_bytes, created_by)
+            VALUES (:pipeline_id, :version, :kind, CAST(:graph AS jsonb), CAST(:yaml AS jsonb), :message,
+                    CAST(:changes AS jsonb), :stored_bytes, :created_by)
+        """),
+        {
+            "pipeline_id": pipeline_id,
+            "version": version,
+            "kind": kind,
+            "graph": json.dumps(graph_data),
+            "yaml": json.dumps(yaml_data),
+            "message": message,
+            "changes": json.dumps(changes) if changes is not None else None,
+            "stored_bytes": stored_bytes,
+            "created_by": user_id,
+        }
+    )
+    return {"version": version, "kind": kind, "stored_bytes": stored_bytes}
+
+
+def list_versions(conn, pipeline_id: str, limit: int = 100, before: Optional[int] = None) -> List[Dict[str, Any]]:
+    result = conn.execute(
+        text("""
+            SELECT v.version, v.kind, v.message, v.changes, v.stored_bytes, v.created_at, u.email
+            FROM pipeline_versions v
+            LEFT JOIN users u ON u.id = v.created_by
+            WHERE v.pipeline_id = :pipeline_id AND (CAST(:before AS integer) IS NULL OR v.version < :before)
+            ORDER BY v.version DESC
+            LIMIT :limit
+        """),
+        {"pipeline_id": pipeline_id, "before": before, "limit": limit}
+    )
+    return [
+        {
+            "version": row[0],
+            "kind": row[1],
+            "message": row[2],
+            "changes": row[3],
+            "stored_bytes": row[4],
+            "created_at": row[5].isoformat() if row[5] else None,
+            "created_by": row[6],
+        }
+        for row in result
+    ]
+
+
+def run_benchmark(nodes: int, saves: int, snapshot_interval: int = SNAPSHOT_INTERVAL):
+    rng = random.Random(7)
+    graph = {
+        "nodes": [{"id": f"n{i}", "type": "transform", "config": {"sql": f"SELECT * FROM t{i}", "retries": 3}}
+                  for i in range(nodes)],
+        "edges": [{"source": f"n{i}", "target": f"n{i + 1}"} for i in range(nodes - 1)],
+    }
+    yaml_text = "".join(f"- name: step_{i}\n  run: transform_{i}\n" for i in range(nodes))
+    full_size = len(json.dumps(graph)) + len(yaml_text)
+
+    rows = []
+    previous = (None, "")
+    stored = 0
+    started = time.perf_counter()
+    for version in range(1, saves + 1):
+        graph = copy.deepcopy(graph)
+        target = rng.randrange(len(graph["nodes"]))
+        graph["nodes"][target]["config"]["retries"] += 1
+        if version % 5 == 0:
+            graph["nodes"].insert(target, {"id": f"x{version}", "type": "filter", "config": {"retries": 0}})
+        yaml_text = yaml_text.replace(f"run: transform_{target}\n", f"run: transform_{target}_v{version}\n", 1)
+        if (version - 1) % snapshot_interval == 0:
+            row = ("snapshot", graph, yaml_text)
+        else:
+            row = ("delta", json_diff(previous[0], graph), text_delta(previous[1], yaml_text))
+        stored += len(json.dumps(row[1])) + len(json.dumps(row[2]))
+        rows.append(row)
+        previous = (graph, yaml_text)
+    elapsed = time.perf_counter() - started
+    print(f"{saves} saves of a {nodes}-node pipeline ({full_size / 1024:.0f} KiB per full copy): "
+          f"{stored / 1024:.0f} KiB stored vs {full_size * saves / 1024:.0f} KiB as full copies, "
+          f"{elapsed / saves * 1000:.1f} ms/save to encode")
+
+    worst = max(range(saves), key=lambda v: v % snapshot_interval)
+    start = worst - worst % snapshot_interval
+    started = time.perf_counter()
+    rebuilt = rebuild(rows[start:worst + 1])
+    print(f"Rebuilt worst-case version {worst + 1} ({worst - start} deltas) in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    other = rebuild(rows[0:1])
+    started = time.perf_counter()
+    patch = json_diff(other[0], rebuilt[0])
+    print(f"Diffed version 1 against version {worst + 1}: {len(patch)} ops in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline version history benchmark")
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--saves", type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.nodes, args.saves)
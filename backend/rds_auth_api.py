@@ -15,6 +15,8 @@ import jwt
 from passlib.context import CryptContext
 import uuid
 
+from compression import CompressionMiddleware
+
 load_dotenv()
 
 app = FastAPI(
@@ -39,6 +41,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 security = HTTPBearer()
 
@@ -0,0 +1,573 @@
+"""
+Repository sync for /repositories/{id}/sync.
+
+Each remote URL gets one bare mirror in a shared cache directory, reused by
+every repository row (and user) that points at it. A sync fetches only the
+tracked branch, so git transfers just the objects that are new since the
+last fetch, then diffs the tree of the last synced commit against the new
+head and extracts only the changed notebook and pipeline files.
+
+Files picked up:
+  *.ipynb                                   -> notebooks
+  pipelines/**/*.y(a)ml, *.pipeline.y(a)ml  -> pipelines (workflow_yaml)
+
+Remote URLs must be https:// or ssh (ssh:// or scp-style user@host:path).
+file:// URLs and local paths are accepted only with ALLOW_LOCAL_GIT_URLS=true,
+a development setting: otherwise any user could mirror repositories from the
+server's own filesystem.
+
+import_repository (/git-import) walks the whole tree instead of a diff, so
+it also covers the first import and path-filtered imports. Files whose blob
+hash matches the source_blob_sha already stored for them are skipped, the
+rest are parsed in a process pool and written with one multi-row upsert per
+table.
+
+Benchmark against a synthetic repository (no database needed):
+    python repo_sync.py --bench 5000
+"""
+
+import argparse
+import base64
+import fcntl
+import hashlib
+import json
+import multiprocessing
+import os
+import posixpath
+import re
+import subprocess
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import yaml
+from psycopg2.extras import execute_values
+from sqlalchemy import text
+
+from blob_store import externalize_notebook_content, externalize_text
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "repo_cache"))
+GIT_TIMEOUT_SECONDS = int(os.getenv("GIT_TIMEOUT_SECONDS", "600"))
+NOTEBOOK_LANGUAGES = ("python", "sql", "scala", "r")
+ZERO_SHA = "0" * 40
+ALLOW_LOCAL_GIT_URLS = os.getenv("ALLOW_LOCAL_GIT_URLS", "false").lower() == "true"
+GIT_IMPORT_WORKERS = int(os.getenv("GIT_IMPORT_WORKERS", "0")) or os.cpu_count() or 1
+# Below this many files, process start-up costs more than it saves.
+PARALLEL_PARSE_MIN_FILES = 64
+PARSE_BATCH_SIZE = 100
+UPSERT_PAGE_SIZE = 500
+SCP_URL_PATTERN = re.compile(r"^(?:[\w.-]+@)?[A-Za-z0-9][A-Za-z0-9.-]*:(?![:/])\S+$")
+
+
+class RepositorySyncError(Exception):
+    pass
+
+
+def validate_repository_url(url: str, allow_local: Optional[bool] = None) -> str:
+    allow_local = ALLOW_LOCAL_GIT_URLS if allow_local is None else allow_local
+    if "://" in url:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme in ("https", "ssh") and parts.hostname and not parts.hostname.startswith("-"):
+            return url
+        if scheme == "file" and allow_local:
+            return url
+    elif SCP_URL_PATTERN.match(url):
+        return url
+    elif allow_local and os.path.isabs(url):
+        return url
+    raise RepositorySyncError("Repository url must be https:// or ssh (ssh://host/path or user@host:path)")
+
+
+def classify_path(path: str) -> Optional[str]:
+    parts = path.split("/")
+    if any(part.startswith(".") for part in parts[:-1]):
+        return None
+    lower = path.lower()
+    if lower.endswith(".ipynb"):
+        return "notebook"
+    if lower.endswith((".yaml", ".yml")) and ("pipelines" in parts[:-1] or lower.endswith((".pipeline.yaml", ".pipeline.yml"))):
+        return "pipeline"
+    return None
+
+
+def _display_name(path: str) -> str:
+    name = posixpath.basename(path)
+    for suffix in (".ipynb", ".pipeline.yaml", ".pipeline.yml", ".yaml", ".yml"):
+        if name.lower().endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _join_source(source) -> str:
+    if isinstance(source, list):
+        return "".join(part for part in source if isinstance(part, str))
+    return source if isinstance(source, str) else ""
+
+
+def _dict(value) -> Dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def _cell_output(outputs) -> Optional[str]:
+    chunks = []
+    for output in outputs if isinstance(outputs, list) else []:
+        output = _dict(output)
+        data = _dict(output.get("data"))
+        if output.get("output_type") == "stream":
+            chunks.append(_join_source(output.get("text")))
+        elif "text/plain" in data:
+            chunks.append(_join_source(data["text/plain"]))
+        elif output.get("output_type") == "error":
+            chunks.append(f"{output.get('ename')}: {output.get('evalue')}")
+    return "".join(chunks) or None
+
+
+def parse_notebook(path: str, data: bytes) -> Dict[str, Any]:
+    document = json.loads(data.decode("utf-8"))
+    if not isinstance(document, dict):
+        raise ValueError("Notebook must be a JSON object")
+    source_cells = document.get("cells", [])
+    if not isinstance(source_cells, list):
+        raise ValueError("Notebook cells must be a list")
+    metadata = _dict(document.get("metadata"))
+    language = (_dict(metadata.get("kernelspec")).get("language")
+                or _dict(metadata.get("language_info")).get("name") or "python")
+    language = language.lower() if isinstance(language, str) else "python"
+    cells = []
+    for index, cell in enumerate(source_cells):
+        if not isinstance(cell, dict):
+            raise ValueError(f"Notebook cell {index} must be a JSON object")
+        cell_id = cell.get("id")
+        cells.append({
+            "id": cell_id if isinstance(cell_id, str) and cell_id else f"cell-{index}",
+            "type": "code" if cell.get("cell_type") == "code" else "markdown",
+            "content": _join_source(cell.get("source")),
+            "output": _cell_output(cell.get("outputs")),
+        })
+    return {
+        "name": _display_name(path),
+        "language": language if language in NOTEBOOK_LANGUAGES else "python",
+        "content": {"cells": cells},
+    }
+
+
+def parse_pipeline(path: str, data: bytes) -> Dict[str, Any]:
+    workflow_yaml = data.decode("utf-8")
+    try:
+        document = yaml.load(workflow_yaml, Loader=YamlLoader)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid pipeline YAML: {e}") from e
+    document = document if isinstance(document, dict) else {}
+    name = document.get("name")
+    description = document.get("description")
+    return {
+        "name": name if isinstance(name, str) and name.strip() else _display_name(path),
+        "description": description if isinstance(description, str) else None,
+        "workflow_yaml": workflow_yaml,
+    }
+
+
+PARSERS = {"notebook": parse_notebook, "pipeline": parse_pipeline}
+
+
+def _parse_batch(batch: List[Tuple[str, str, str, bytes]]):
+    results = []
+    for kind, path, sha, data in batch:
+        try:
+            results.append((kind, path, sha, PARSERS[kind](path, data), None))
+        except (ValueError, UnicodeDecodeError) as e:
+            results.append((kind, path, sha, None, str(e)))
+        except (AttributeError, TypeError) as e:
+            # Well-formed JSON/YAML with an unexpected shape; skip the file rather than fail the sync.
+            results.append((kind, path, sha, None, f"Unsupported {kind} structure: {e}"))
+    return results
+
+
+def parse_files(files: List[Tuple[str, str, str]], blobs: Dict[str, bytes], workers: int = GIT_IMPORT_WORKERS):
+    """Parses (kind, path, blob_sha) files; returns (parsed, skipped)."""
+    items = [(kind, path, sha, blobs[sha]) for kind, path, sha in files]
+    batches = [items[i:i + PARSE_BATCH_SIZE] for i in range(0, len(items), PARSE_BATCH_SIZE)]
+    if workers > 1 and len(items) >= PARALLEL_PARSE_MIN_FILES:
+        pool_size = min(workers, len(batches))
+        # spawn, not fork: the job worker that calls this is multi-threaded.
+        with ProcessPoolExecutor(max_workers=pool_size, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = [result for batch in pool.map(_parse_batch, batches) for result in batch]
+    else:
+        results = [result for batch in batches for result in _parse_batch(batch)]
+
+    parsed = [(kind, path, sha, fields) for kind, path, sha, fields, error in results if error is None]
+    skipped = [{"path": path, "error": error} for _, path, _, _, error in results if error is not None]
+    return parsed, skipped
+
+
+class GitMirror:
+    def __init__(self, url: str, cache_dir: str = REPO_CACHE_DIR, username: Optional[str] = None,
+                 access_token: Optional[str] = None, allow_local: Optional[bool] = None):
+        self.url = validate_repository_url(url, allow_local)
+        allow_local = ALLOW_LOCAL_GIT_URLS if allow_local is None else allow_local
+        # Also enforced by git itself, so submodules and redirects cannot reach other transports.
+        self._allowed_protocols = "https:ssh:file" if allow_local else "https:ssh"
+        self.path = os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest()[:32] + ".git")
+        self._auth_config: List[str] = []
+        if access_token:
+            credentials = base64.b64encode(f"{username or 'git'}:{access_token}".encode()).decode()
+            # Passed per command so credentials never land in the shared mirror's config.
+            self._auth_config = ["-c", f"http.extraHeader=Authorization: Basic {credentials}"]
+
+    def git(self, *args: str, input: Optional[bytes] = None) -> bytes:
+        result = subprocess.run(
+            ["git", "--git-dir", self.path, *self._auth_config, *args],
+            input=input,
+            capture_output=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0", "GIT_ALLOW_PROTOCOL": self._allowed_protocols},
+        )
+        if result.returncode != 0:
+            raise RepositorySyncError(result.stderr.decode(errors="replace").strip() or f"git {args[0]} failed")
+        return result.stdout
+
+    @contextmanager
+    def locked(self) -> Iterator["GitMirror"]:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch(self, branch: str) -> str:
+        # Always fetch, even when the mirror is warm: it is also what proves the
+        # caller can read the remote before cached objects are served to them.
+        if not os.path.isdir(self.path):
+            subprocess.run(["git", "init", "--bare", "--quiet", self.path], check=True, capture_output=True)
+            self.git("remote", "add", "origin", self.url)
+        ref = f"refs/heads/{branch}"
+        self.git("fetch", "--quiet", "--no-tags", "--prune", "origin", f"+{ref}:{ref}")
+        return self.git("rev-parse", ref).decode().strip()
+
+    def has_commit(self, sha: Optional[str]) -> bool:
+        if not sha:
+            return False
+        try:
+            self.git("cat-file", "-e", f"{sha}^{{commit}}")
+            return True
+        except RepositorySyncError:
+            return False
+
+    def list_tree(self, commit: str) -> List[Tuple[str, str]]:
+        entries = []
+        for record in self.git("ls-tree", "-r", "-z", "--full-tree", commit).split(b"\0"):
+            if not record:
+                continue
+            meta, path = record.split(b"\t", 1)
+            _, object_type, sha = meta.decode().split(" ")
+            if object_type == "blob":
+                entries.append((path.decode(), sha))
+        return entries
+
+    def diff_trees(self, old: str, new: str) -> List[Tuple[str, str, str]]:
+        changes = []
+        tokens = self.git("diff-tree", "-r", "-z", "--no-renames", old, new).split(b"\0")
+        index = 0
+        while index + 1 < len(tokens):
+            meta = tokens[index].decode()
+            if not meta.startswith(":"):
+                index += 1
+                continue
+            _, _, _, new_sha, status = meta[1:].split(" ")
+            changes.append((status[0], tokens[index + 1].decode(), new_sha))
+            index += 2
+        return changes
+
+    def read_blobs(self, shas: List[str]) -> Dict[str, bytes]:
+        if not shas:
+            return {}
+        output = self.git("cat-file", "--batch", input="".join(f"{sha}\n" for sha in shas).encode())
+        blobs: Dict[str, bytes] = {}
+        offset = 0
+        while offset < len(output):
+            header_end = output.index(b"\n", offset)
+            sha, _, size = output[offset:header_end].decode().split(" ")
+            start = header_end + 1
+            blobs[sha] = output[start:start + int(size)]
+            offset = start + int(size) + 1
+        return blobs
+
+
+def changed_files(mirror: GitMirror, old_commit: Optional[str], new_commit: str):
+    """Returns (upserts, deletes): upserts are (kind, path, blob_sha)."""
+    upserts: List[Tuple[str, str, str]] = []
+    deletes: List[Tuple[str, str]] = []
+    if mirror.has_commit(old_commit):
+        for status, path, sha in mirror.diff_trees(old_commit, new_commit):
+            kind = classify_path(path)
+            if kind is None:
+                continue
+            if status == "D" or sha == ZERO_SHA:
+                deletes.append((kind, path))
+            else:
+                upserts.append((kind, path, sha))
+    else:
+        for path, sha in mirror.list_tree(new_commit):
+            kind = classify_path(path)
+            if kind is not None:
+                upserts.append((kind, path, sha))
+    return upserts, deletes
+
+
+NOTEBOOK_UPSERT = """
+    INSERT INTO notebooks (id, workspace_id, repository_id, source_path, source_blob_sha,
+                           name, language, content, created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (repository_id, source_path) DO UPDATE
+    SET name = EXCLUDED.name, language = EXCLUDED.language, content = EXCLUDED.content,
+        cells_normalized = false, version = notebooks.version + 1,
+        source_blob_sha = EXCLUDED.source_blob_sha, updated_at = EXCLUDED.updated_at
+"""
+
+PIPELINE_UPSERT = """
+    INSERT INTO pipelines (id, user_id, workspace_id, repository_id, source_path, source_blob_sha,
+                           name, description, workflow_yaml, git_repo_url, git_branch, status,
+                           created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (repository_id, source_path) DO UPDATE
+    SET name = EXCLUDED.name, description = COALESCE(EXCLUDED.description, pipelines.description),
+        workflow_yaml = EXCLUDED.workflow_yaml, source_blob_sha = EXCLUDED.source_blob_sha,
+        git_branch = EXCLUDED.git_branch, updated_at = EXCLUDED.updated_at
+"""
+
+
+def apply_changes(conn, repo: Dict[str, Any], parsed: List[Tuple[str, str, str, Dict[str, Any]]],
+                  deletes: Iterable[Tuple[str, str]] = ()):
+    now = datetime.utcnow()
+    notebooks = [
+        (str(uuid.uuid4()), repo["workspace_id"], repo["id"], path, sha,
+         fields["name"], fields["language"], json.dumps(externalize_notebook_content(conn, fields["content"])), now, now)
+        for kind, path, sha, fields in parsed if kind == "notebook" and repo["workspace_id"]
+    ]
+    pipelines = [
+        (str(uuid.uuid4()), repo["user_id"], repo["workspace_id"], repo["id"], path, sha,
+         fields["name"], fields.get("description"), externalize_text(conn, fields["workflow_yaml"]),
+         repo["url"], repo["branch"],
+         "draft", now, now)
+        for kind, path, sha, fields in parsed if kind == "pipeline"
+    ]
+
+    # execute_values sends UPSERT_PAGE_SIZE rows per statement; executemany
+    # through text() would be one round trip per file.
+    cursor = conn.connection.cursor()
+    try:
+        if notebooks:
+            execute_values(cursor, NOTEBOOK_UPSERT, notebooks,
+                           template="(%s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s)", page_size=UPSERT_PAGE_SIZE)
+        if pipelines:
+            execute_values(cursor, PIPELINE_UPSERT, pipelines, page_size=UPSERT_PAGE_SIZE)
+    finally:
+        cursor.close()
+
+    deletes = list(deletes)
+    for kind, table in (("notebook", "notebooks"), ("pipeline", "pipelines")):
+        paths = [path for deleted_kind, path in deletes if deleted_kind == kind]
+        if paths:
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE repository_id = :repository_id AND source_path = ANY(:paths)"),
+                {"repository_id": repo["id"], "paths": paths}
+            )
+    return {"notebooks": len(notebooks), "pipelines": len(pipelines), "deleted": len(deletes)}
+
+
+def existing_blob_shas(conn, repository_id: str) -> Dict[Tuple[str, str], str]:
+    result = conn.execute(
+        text("""
+            SELECT 'notebook', source_path, source_blob_sha FROM notebooks WHERE repository_id = :id
+            UNION ALL
+            SELECT 'pipeline', source_path, source_blob_sha FROM pipelines WHERE repository_id = :id
+        """),
+        {"id": repository_id}
+    )
+    return {(row[0], row[1]): row[2] for row in result}
+
+
+def unchanged_filter(files: List[Tuple[str, str, str]], known: Dict[Tuple[str, str], str]):
+    changed = [(kind, path, sha) for kind, path, sha in files if known.get((kind, path)) != sha]
+    return changed, len(files) - len(changed)
+
+
+def load_repository(conn, repository_id: str) -> Dict[str, Any]:
+    row = conn.execute(
+        text("""
+            SELECT id, user_id, workspace_id, url, branch, username, access_token, last_synced_commit
+            FROM repositories WHERE id = :id
+        """),
+        {"id": repository_id}
+    ).fetchone()
+    if row is None:
+        raise RepositorySyncError(f"Repository {repository_id} not found")
+    return {
+        "id": str(row[0]),
+        "user_id": str(row[1]),
+        "workspace_id": str(row[2]) if row[2] else None,
+        "url": row[3],
+        "branch": row[4] or "main",
+        "username": row[5],
+        "access_token": row[6],
+        "last_synced_commit": row[7],
+    }
+
+
+def _record_sync_error(engine, repository_id: str, error: Exception):
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE repositories SET status = 'error', last_error = :error WHERE id = :id"),
+            {"id": repository_id, "error": str(error)[:4000]}
+        )
+
+
+def sync_repository(engine, repository_id: str, cache_dir: str = REPO_CACHE_DIR) -> Dict[str, Any]:
+    with engine.connect() as conn:
+        repo = load_repository(conn, repository_id)
+        known = existing_blob_shas(conn, repository_id)
+
+    try:
+        mirror = GitMirror(repo["url"], cache_dir, repo["username"], repo["access_token"])
+        with mirror.locked():
+            new_commit = mirror.fetch(repo["branch"])
+            if new_commit == repo["last_synced_commit"]:
+                upserts, deletes, unchanged, blobs = [], [], 0, {}
+            else:
+                upserts, deletes = changed_files(mirror, repo["last_synced_commit"], new_commit)
+                upserts, unchanged = unchanged_filter(upserts, known)
+                blobs = mirror.read_blobs(sorted({sha for _, _, sha in upserts}))
+    except (RepositorySyncError, subprocess.SubprocessError) as e:
+        _record_sync_error(engine, repository_id, e)
+        raise
+
+    parsed, skipped = parse_files(upserts, blobs)
+
+    with engine.begin() as conn:
+        counts = apply_changes(conn, repo, parsed, deletes)
+        conn.execute(
+            text("""
+                UPDATE repositories
+                SET status = 'connected', last_synced_commit = :commit, last_sync = now(), last_error = NULL
+                WHERE id = :id
+            """),
+            {"id": repository_id, "commit": new_commit}
+        )
+    return {"commit": new_commit, "previous_commit": repo["last_synced_commit"], "unchanged": unchanged,
+            "skipped": skipped, **counts}
+
+
+def _in_scope(path: str, prefix: str) -> bool:
+    return not prefix or path == prefix or path.startswith(prefix + "/")
+
+
+def import_repository(engine, repository_id: str, path: str = "", kinds: Optional[Iterable[str]] = None,
+                      cache_dir: str = REPO_CACHE_DIR) -> Dict[str, Any]:
+    prefix = path.strip("/")
+    kinds = set(kinds or PARSERS)
+    full_import = not prefix and kinds >= set(PARSERS)
+
+    with engine.connect() as conn:
+        repo = load_repository(conn, repository_id)
+        known = existing_blob_shas(conn, repository_id)
+
+    try:
+        mirror = GitMirror(repo["url"], cache_dir, repo["username"], repo["access_token"])
+        with mirror.locked():
+            new_commit = mirror.fetch(repo["branch"])
+            files = []
+            for file_path, sha in mirror.list_tree(new_commit):
+                kind = classify_path(file_path)
+                if kind in kinds and _in_scope(file_path, prefix):
+                    files.append((kind, file_path, sha))
+            changed, unchanged = unchanged_filter(files, known)
+            blobs = mirror.read_blobs(sorted({sha for _, _, sha in changed}))
+    except (RepositorySyncError, subprocess.SubprocessError) as e:
+        _record_sync_error(engine, repository_id, e)
+        raise
+
+    parsed, skipped = parse_files(changed, blobs)
+
+    # Only an import of the whole tree can stand in for a sync: it is the only
+    # case where missing files are known to be deleted upstream.
+    deletes = []
+    if full_import:
+        present = {(kind, file_path) for kind, file_path, _ in files}
+        deletes = [key for key in known if key not in present]
+
+    with engine.begin() as conn:
+        counts = apply_changes(conn, repo, parsed, deletes)
+        conn.execute(
+            text("""
+                UPDATE repositories
+                SET status = 'connected', last_sync = now(), last_error = NULL,
+                    last_synced_commit = CASE WHEN :full_import THEN :commit ELSE last_synced_commit END
+                WHERE id = :id
+            """),
+            {"id": repository_id, "commit": new_commit, "full_import": full_import}
+        )
+    return {"commit": new_commit, "files": len(files), "unchanged": unchanged, "skipped": skipped, **counts}
+
+
+def _build_bench_repository(root: str, notebooks: int) -> str:
+    source = os.path.join(root, "source.git")
+    subprocess.run(["git", "init", "--bare", "--quiet", source], check=True)
+    cell = {"cell_type": "code", "source": ["import pandas as pd\n", "df = pd.read_csv('data.csv')\n"],
+            "outputs": [{"output_type": "stream", "text": ["ok\n"]}], "metadata": {}}
+    stream = [b"commit refs/heads/main\n", b"committer bench <bench@example.com> 0 +0000\n", b"data 5\nbench\n"]
+    for index in range(notebooks):
+        document = {"cells": [cell] * 20, "metadata": {"kernelspec": {"language": "python"}, "bench": index}}
+        files = [(f"notebooks/team{index % 50}/nb{index}.ipynb", json.dumps(document).encode())]
+        if index % 10 == 0:
+            files.append((f"pipelines/p{index}.yaml",
+                          f"name: pipeline {index}\nsteps:\n  - extract: orders\n  - load: warehouse\n".encode()))
+        for path, data in files:
+            stream.append(f"M 100644 inline {path}\ndata {len(data)}\n".encode() + data + b"\n")
+    subprocess.run(["git", "--git-dir", source, "fast-import", "--quiet"], input=b"".join(stream), check=True)
+    return f"file://{source}"
+
+
+def run_benchmark(notebooks: int, workers: int):
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        url = _build_bench_repository(root, notebooks)
+        print(f"Built synthetic repository with {notebooks} notebooks in {time.perf_counter() - started:.2f}s")
+
+        mirror = GitMirror(url, os.path.join(root, "cache"), allow_local=True)
+        started = time.perf_counter()
+        with mirror.locked():
+            commit = mirror.fetch("main")
+            files = [(classify_path(path), path, sha) for path, sha in mirror.list_tree(commit) if classify_path(path)]
+            blobs = mirror.read_blobs(sorted({sha for _, _, sha in files}))
+        print(f"Fetched and read {len(files)} files in {time.perf_counter() - started:.2f}s")
+
+        for label, pool_size in (("serial", 1), (f"{workers} processes", workers)):
+            started = time.perf_counter()
+            parsed, skipped = parse_files(files, blobs, workers=pool_size)
+            print(f"Parsed {len(parsed)} files ({len(skipped)} skipped), {label}: {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        changed, unchanged = unchanged_filter(files, {(kind, path): sha for kind, path, sha in files})
+        print(f"Re-import with no changes: {len(changed)} to parse, {unchanged} unchanged, "
+              f"{time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repository sync/import benchmark")
+    parser.add_argument("--bench", type=int, default=5000, help="number of notebooks in the synthetic repository")
+    parser.add_argument("--workers", type=int, default=GIT_IMPORT_WORKERS)
+    args = parser.parse_args()
+    run_benchmark(args.bench, args.workers)
@@ -0,0 +1,266 @@
+"""
+Cron scheduler for active pipelines.
+
+All schedules live in an in-memory min-heap keyed by next fire time, so each
+tick only looks at the heap top instead of scanning the pipelines table.
+Schedules are refreshed incrementally from rows whose updated_at moved. The
+watermark is taken from the database clock and every incremental refresh
+re-reads the last overlap_seconds of changes, because a transaction can
+commit after a refresh with an updated_at from before it. Every
+full_refresh_interval the whole active set is diffed against the heap, which
+also drops deleted pipelines.
+
+Every API process may run a scheduler. A fire is claimed with a Postgres
+advisory lock plus a conditional upsert into pipeline_schedule_state keyed
+on the nominal fire time, so exactly one process fires each run. on_fire
+runs in the claim's transaction, so a run is enqueued if and only if its
+fire is claimed.
+
+The API does not start a scheduler yet: pipelines deploy as workflow_yaml
+and no job handler executes them, so there is nothing for on_fire to
+enqueue. PUT /pipelines/{id}/schedule stores and validates schedules in the
+meantime; start a PipelineScheduler alongside the first pipeline executor.
+"""
+
+import functools
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from croniter import croniter
+from sqlalchemy import text
+
+SCHEDULE_LOCK_CLASS = 27001
+
+
+@functools.lru_cache(maxsize=4096)
+def validate_schedule(cron: str, tz_name: str = "UTC"):
+    if not croniter.is_valid(cron):
+        raise ValueError(f"Invalid cron expression: {cron}")
+    try:
+        ZoneInfo(tz_name)
+    except ZoneInfoNotFoundError:
+        raise ValueError(f"Unknown timezone: {tz_name}")
+
+
+@functools.lru_cache(maxsize=65536)
+def next_fire_time(cron: str, tz_name: str, after: int) -> datetime:
+    # Cached on whole seconds: pipelines sharing an expression share the lookup,
+    # so croniter runs once per distinct schedule rather than once per pipeline.
+    base = datetime.fromtimestamp(after, ZoneInfo(tz_name))
+    return croniter(cron, base).get_next(datetime).astimezone(timezone.utc)
+
+
+def jitter_offset(pipeline_id: str, jitter_seconds: float) -> float:
+    # Deterministic per pipeline so every process agrees on the actual start
+    # time, while pipelines sharing a cron expression are spread over the window.
+    if jitter_seconds <= 0:
+        return 0.0
+    digest = hashlib.blake2b(pipeline_id.encode(), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") / 2 ** 64) * jitter_seconds
+
+
+class ScheduleEntry:
+    __slots__ = ("pipeline_id", "cron", "tz_name", "version", "nominal", "fire_at")
+
+    def __init__(self, pipeline_id: str, cron: str, tz_name: str, version: int):
+        self.pipeline_id = pipeline_id
+        self.cron = cron
+        self.tz_name = tz_name
+        self.version = version
+        self.nominal: Optional[datetime] = None
+        self.fire_at = 0.0
+
+    def advance(self, after: datetime, jitter_seconds: float):
+        self.nominal = next_fire_time(self.cron, self.tz_name, int(after.timestamp()))
+        self.fire_at = self.nominal.timestamp() + jitter_offset(self.pipeline_id, jitter_seconds)
+
+
+class PipelineScheduler:
+    def __init__(
+        self,
+        engine,
+        on_fire: Callable[[Any, str, datetime], None],
+        jitter_seconds: float = 30.0,
+        refresh_interval: float = 30.0,
+        fire_workers: int = 4,
+        overlap_seconds: float = 300.0,
+        full_refresh_interval: float = 600.0,
+    ):
+        self.engine = engine
+        self.on_fire = on_fire
+        self.jitter_seconds = jitter_seconds
+        self.refresh_interval = refresh_interval
+        self.overlap_seconds = overlap_seconds
+        self.full_refresh_interval = full_refresh_interval
+        self._next_full_refresh = 0.0
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._versions = itertools.count()
+        self._seq = itertools.count()
+        self._watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fire_pool = ThreadPoolExecutor(max_workers=fire_workers, thread_name_prefix="schedule-fire")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="pipeline-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self._fire_pool.shutdown(wait=True)
+
+    def upsert(self, pipeline_id: str, cron: Optional[str], tz_name: Optional[str], active: bool = True,
+               now: Optional[datetime] = None):
+        with self._lock:
+            if not active or not cron:
+                self._entries.pop(pipeline_id, None)
+                return
+            existing = self._entries.get(pipeline_id)
+            if existing is not None and existing.cron == cron and existing.tz_name == (tz_name or "UTC"):
+                return
+            try:
+                validate_schedule(cron, tz_name or "UTC")
+            except ValueError as e:
+                print(f"⚠️  Skipping schedule for pipeline {pipeline_id}: {e}")
+                self._entries.pop(pipeline_id, None)
+                return
+            entry = ScheduleEntry(pipeline_id, cron, tz_name or "UTC", next(self._versions))
+            entry.advance(now or datetime.now(timezone.utc), self.jitter_seconds)
+            self._entries[pipeline_id] = entry
+            heapq.heappush(self._heap, (entry.fire_at, next(self._seq), pipeline_id, entry.version))
+        self._wakeup.set()
+
+    def refresh(self, full: Optional[bool] = None):
+        if full is None:
+            full = self._watermark is None or time.time() >= self._next_full_refresh
+        query = """
+            SELECT p.id, p.schedule_cron, p.schedule_timezone, p.status, p.updated_at, s.last_scheduled_at
+            FROM pipelines p
+            LEFT JOIN pipeline_schedule_state s ON s.pipeline_id = p.id
+        """
+        if full:
+            query += " WHERE p.status = 'active' AND p.schedule_cron IS NOT NULL"
+            params = {}
+        else:
+            query += " WHERE p.updated_at > :since"
+            params = {"since": self._watermark - timedelta(seconds=self.overlap_seconds)}
+
+        now = datetime.now(timezone.utc)
+        seen = set()
+        with self.engine.connect() as conn:
+            # The database's clock, read before the scan: changes committed later are at or after it, give or
+            # take transactions still open, which the overlap re-reads.
+            watermark = conn.execute(text("SELECT now()")).scalar()
+            result = conn.execution_options(stream_results=True).execute(text(query), params)
+            for row in result:
+                last_scheduled = row[5]
+                after = max(now, last_scheduled) if last_scheduled else now
+                self.upsert(str(row[0]), row[1], row[2], row[3] == "active", after)
+                seen.add(str(row[0]))
+        if full:
+            with self._lock:
+                for pipeline_id in [pipeline_id for pipeline_id in self._entries if pipeline_id not in seen]:
+                    del self._entries[pipeline_id]
+            self._next_full_refresh = time.time() + self.full_refresh_interval
+        self._watermark = watermark
+
+    def claim(self, conn, pipeline_id: str, nominal: datetime) -> bool:
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_class, hashtext(:pipeline_id))"),
+            {"lock_class": SCHEDULE_LOCK_CLASS, "pipeline_id": pipeline_id}
+        ).scalar()
+        if not locked:
+            return False
+        result = conn.execute(
+            text("""
+                INSERT INTO pipeline_schedule_state (pipeline_id, last_scheduled_at, last_fired_at)
+                SELECT id, :nominal, now() FROM pipelines WHERE id = :pipeline_id AND status = 'active'
+                ON CONFLICT (pipeline_id) DO UPDATE
+                SET last_scheduled_at = EXCLUDED.last_scheduled_at, last_fired_at = EXCLUDED.last_fired_at
+                WHERE pipeline_schedule_state.last_scheduled_at < EXCLUDED.last_scheduled_at
+            """),
+            {"pipeline_id": pipeline_id, "nominal": nominal}
+        )
+        return result.rowcount == 1
+
+    def _pop_due(self, now: float) -> Tuple[List[Tuple[str, datetime]], Optional[float]]:
+        due = []
+        with self._lock:
+            while self._heap:
+                fire_at, _, pipeline_id, version = self._heap[0]
+                entry = self._entries.get(pipeline_id)
+                if entry is None or entry.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+                if fire_at > now:
+                    return due, fire_at
+                heapq.heappop(self._heap)
+                due.append((pipeline_id, entry.nominal))
+                entry.advance(entry.nominal, self.jitter_seconds)
+                heapq.heappush(self._heap, (entry.fire_at, next(self._seq), pipeline_id, entry.version))
+        return due, None
+
+    def _fire(self, pipeline_id: str, nominal: datetime):
+        try:
+            with self.engine.begin() as conn:
+                if self.claim(conn, pipeline_id, nominal):
+                    self.on_fire(conn, pipeline_id, nominal)
+        except Exception as e:
+            print(f"❌ Failed to fire scheduled run for pipeline {pipeline_id}: {e}")
+
+    def _run(self):
+        next_refresh = time.time()
+        while not self._stopped.is_set():
+            now = time.time()
+            if now >= next_refresh:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"❌ Failed to refresh pipeline schedules: {e}")
+                next_refresh = now + self.refresh_interval
+
+            due, next_fire = self._pop_due(now)
+            for pipeline_id, nominal in due:
+                self._fire_pool.submit(self._fire, pipeline_id, nominal)
+
+            wait_until = next_refresh if next_fire is None else min(next_fire, next_refresh)
+            self._wakeup.wait(max(0.0, wait_until - time.time()))
+            self._wakeup.clear()
+
+
+if __name__ == "__main__":
+    # Synthetic load check: heap maintenance for 50k schedules without a database.
+    import random
+
+    scheduler = PipelineScheduler(engine=None, on_fire=lambda conn, pid, nominal: None)
+    expressions = ["* * * * *", "*/5 * * * *", "0 * * * *", "15 2 * * *", "*/15 9-17 * * 1-5"]
+
+    started = time.perf_counter()
+    for i in range(50_000):
+        scheduler.upsert(f"pipeline-{i}", random.choice(expressions), "UTC")
+    print(f"Loaded {len(scheduler)} schedules in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    due, _ = scheduler._pop_due(time.time() + 3600)
+    print(f"Popped {len(due)} due fires over one simulated hour in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,170 @@
+"""
+Ranked full-text and fuzzy search over workspaces, pipelines, notebooks and
+saved queries.
+
+Triggers on the source tables keep one search_documents row per object up to
+date. Each row has a generated, weighted tsvector with four weights: title
+(A), tags and category (B), description (C) and query_text (D). Two indexes
+serve the search, both GIN and both led by user_id through btree_gin so a
+lookup only reads the caller's postings:
+
+- one over the tsvector, for prefix full-text matches;
+- one over the title with gin_trgm_ops, so a typo in a name still finds it.
+
+Each path stops after SEARCH_CANDIDATE_LIMIT rows. Ranking and sorting
+therefore stay bounded even when a very common term matches most of a user's
+documents. Snippets (ts_headline) are computed only for the returned page.
+
+Benchmark against the configured database (seeds a throwaway user):
+    python search.py --documents 1000000
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+SEARCH_KINDS = ("workspace", "pipeline", "notebook", "saved_query")
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "1000"))
+SEARCH_MAX_PAGE_SIZE = 100
+
+SEARCH_SQL = """
+    WITH query AS (SELECT to_tsquery('english', :tsquery) AS q),
+    candidates AS (
+        (SELECT d.kind, d.id FROM search_documents d, query
+         WHERE d.user_id = :user_id AND d.document @@ query.q AND d.kind = ANY(:kinds)
+         LIMIT :candidate_limit)
+        UNION
+        (SELECT d.kind, d.id FROM search_documents d
+         WHERE d.user_id = :user_id AND d.title %> :text AND d.kind = ANY(:kinds)
+         LIMIT :candidate_limit)
+    ),
+    page AS (
+        SELECT d.kind, d.id, d.workspace_id, d.title, d.description, d.body, d.updated_at,
+               ts_rank_cd(d.document, query.q, 32) + 0.5 * word_similarity(:text, d.title) AS score
+        FROM candidates c
+        JOIN search_documents d ON d.kind = c.kind AND d.id = c.id
+        CROSS JOIN query
+        ORDER BY score DESC, d.updated_at DESC NULLS LAST, d.id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT page.kind, page.id, page.workspace_id, page.title, page.description, page.updated_at, page.score,
+           ts_headline('english', coalesce(page.description, page.body, ''), query.q,
+                       'MaxFragments=1, MaxWords=18, MinWords=6, StartSel=<mark>, StopSel=</mark>')
+    FROM page CROSS JOIN query
+    ORDER BY page.score DESC, page.updated_at DESC NULLS LAST, page.id
+"""
+
+
+def build_tsquery(query: str) -> str:
+    """Every word must match, and the last one may be a prefix, so results update as the user types."""
+    terms = re.findall(r"[^\W_]+", query.lower())
+    return " & ".join(f"{term}:*" if index == len(terms) - 1 else term for index, term in enumerate(terms))
+
+
+def search_documents(
+    db,
+    user_id: str,
+    query: str,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    kinds = [kind for kind in (kinds or SEARCH_KINDS) if kind in SEARCH_KINDS]
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    tsquery = build_tsquery(query)
+    if not tsquery or not kinds:
+        return {"results": [], "limit": limit, "offset": offset, "has_more": False}
+
+    rows = db.execute(text(SEARCH_SQL), {
+        "user_id": user_id,
+        "tsquery": tsquery,
+        "text": query.strip(),
+        "kinds": kinds,
+        "candidate_limit": SEARCH_CANDIDATE_LIMIT,
+        # One extra row tells us whether there is a next page without counting every match.
+        "limit": limit + 1,
+        "offset": offset,
+    }).fetchall()
+
+    results: List[Dict[str, Any]] = []
+    for row in rows[:limit]:
+        results.append({
+            "kind": row[0],
+            "id": str(row[1]),
+            "workspace_id": str(row[2]) if row[2] else None,
+            "title": row[3],
+            "description": row[4],
+            "updated_at": row[5].isoformat() if row[5] else None,
+            "score": round(float(row[6]), 4),
+            "snippet": row[7] or None,
+        })
+    return {"results": results, "limit": limit, "offset": offset, "has_more": len(rows) > limit}
+
+
+_BENCH_WORDS = (
+    "orders customers revenue daily weekly monthly events sessions churn forecast inventory "
+    "shipments payments refunds ledger marketing attribution funnel cohort retention warehouse "
+    "spark kafka postgres parquet snowflake bigquery redshift ingest transform export sync "
+    "dashboard report model feature anomaly latency clicks impressions campaign region product"
+).split()
+
+
+def run_benchmark(engine, documents: int, rounds: int):
+    user_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash) VALUES (:id, :email, '')"),
+                     {"id": user_id, "email": f"search-bench-{user_id}@example.invalid"})
+        started = time.perf_counter()
+        conn.execute(text("""
+            INSERT INTO search_documents (kind, id, user_id, title, description, keywords, body, updated_at)
+            SELECT (ARRAY['workspace', 'pipeline', 'notebook', 'saved_query'])[1 + i % 4],
+                   uuid_generate_v4(), :user_id,
+                   w[1 + i % cardinality(w)] || ' ' || w[1 + (i / 7) % cardinality(w)] || ' ' || i,
+                   'Computes ' || w[1 + (i / 3) % cardinality(w)] || ' by ' || w[1 + (i / 11) % cardinality(w)],
+                   w[1 + (i / 13) % cardinality(w)],
+                   CASE WHEN i % 4 = 3 THEN 'SELECT * FROM ' || w[1 + (i / 5) % cardinality(w)] END,
+                   now() - make_interval(secs => i)
+            FROM generate_series(1, :documents) AS i, (SELECT CAST(:words AS text[]) AS w) words
+        """), {"user_id": user_id, "documents": documents, "words": list(_BENCH_WORDS)})
+        conn.execute(text("ANALYZE search_documents"))
+        print(f"Seeded {documents} documents in {time.perf_counter() - started:.1f}s")
+
+    cases = {
+        "single term": "revenue",
+        "two terms": "daily orders",
+        "prefix": "forec",
+        "typo in title": "shipmnets",
+        "rare term": "anomaly latency 4242",
+    }
+    try:
+        with engine.connect() as conn:
+            for label, query in cases.items():
+                search_documents(conn, user_id, query)
+                timings = []
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    page = search_documents(conn, user_id, query)
+                    timings.append((time.perf_counter() - started) * 1000)
+                print(f"  {label:>14} {query!r:>24}: {len(page['results'])} results, "
+                      f"median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE id = :id"), {"id": user_id})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search latency benchmark")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    from complete_rds_api import engine
+
+    run_benchmark(engine, args.documents, args.rounds)
@@ -0,0 +1,151 @@
+"""
+Status change fan-out for server-sent events.
+
+Triggers on compute_clusters, pipelines and data_sources publish status
+changes with pg_notify on the status_changes channel. Each API process holds
+a single LISTEN connection, driven from the event loop with add_reader, and
+fans notifications out to per-user subscriber queues, so thousands of open
+dashboards cost one database connection per process instead of a poll loop
+each.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+import psycopg2
+import psycopg2.extensions
+
+STATUS_CHANNEL = "status_changes"
+
+
+class StatusEventHub:
+    def __init__(self, dsn: str, queue_size: int = 100, reconnect_delay: float = 5.0):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._conn = None
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_handle: Optional[asyncio.TimerHandle] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._closed = False
+        try:
+            await self._connect()
+        except psycopg2.Error as e:
+            print(f"❌ Status listener failed to connect: {e}")
+            self._schedule_reconnect()
+
+    async def stop(self):
+        self._closed = True
+        if self._reconnect_handle is not None:
+            self._reconnect_handle.cancel()
+            self._reconnect_handle = None
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._disconnect()
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(str(event.get("user_id")), ())):
+            if queue.full():
+                # Slow client: drop its oldest event rather than block the fan-out.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _open(self):
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {STATUS_CHANNEL};")
+        except psycopg2.Error:
+            conn.close()
+            raise
+        return conn
+
+    async def _connect(self):
+        # Connecting blocks (DNS, TCP, auth), so it runs off the event loop; the reader is
+        # registered only once the LISTEN is in place.
+        conn = await asyncio.to_thread(self._open)
+        if self._closed or self._conn is not None:
+            conn.close()
+            return
+        self._conn = conn
+        # Kept separately: fileno() raises once the server has dropped the connection.
+        self._fd = conn.fileno()
+        self._loop.add_reader(self._fd, self._on_readable)
+        print("✅ Listening for status changes")
+
+    def _disconnect(self):
+        if self._conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._fd)
+        except (ValueError, OSError):
+            pass
+        try:
+            self._conn.close()
+        except psycopg2.Error:
+            pass
+        self._conn = None
+        self._fd = None
+
+    def _schedule_reconnect(self):
+        if not self._closed:
+            self._reconnect_handle = self._loop.call_later(self.reconnect_delay, self._start_reconnect)
+
+    def _start_reconnect(self):
+        self._reconnect_handle = None
+        self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        if self._closed or self._conn is not None:
+            return
+        try:
+            await self._connect()
+        except psycopg2.Error as e:
+            print(f"❌ Status listener reconnect failed: {e}")
+            self._schedule_reconnect()
+
+    def _on_readable(self):
+        try:
+            self._conn.poll()
+        except psycopg2.Error as e:
+            print(f"❌ Status listener connection lost: {e}")
+            self._disconnect()
+            self._schedule_reconnect()
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                continue
+            self.publish(event)
+
+
+def format_sse(event: Dict[str, Any], event_name: str = "status") -> str:
+    return f"event: {event_name}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,104 @@
+"""
+Tag filtering and tag facets for workspaces and saved queries.
+
+?tags=a,b&match=all compiles to "tags @> ARRAY[a, b]" and match=any to
+"tags && ARRAY[a, b]". Both operators belong to the default GIN array
+opclass, so idx_workspaces_tags and idx_saved_queries_tags answer them.
+Forms such as "a = ANY(tags)" or unnest() joins would fall back to scanning
+every row the user owns. Facets count tags within the current selection, so
+a client can show how many results each further tag would leave.
+
+Check that the filters still plan onto the GIN indexes (exits 1 if not):
+    python tag_filters.py --explain
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+TAG_MATCH_OPERATORS = {"all": "@>", "any": "&&"}
+
+# table -> GIN index expected to serve its tag filters
+TAGGED_TABLES = {
+    "workspaces": "idx_workspaces_tags",
+    "saved_queries": "idx_saved_queries_tags",
+}
+
+
+class InvalidTagFilter(Exception):
+    pass
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip() for tag in tags.split(",") if tag.strip()))
+
+
+def tag_filter(tags: List[str], match: str = "any", column: str = "tags") -> Tuple[str, Dict[str, Any]]:
+    """Returns an " AND ..." clause and its params, or ("", {}) when no tags are given."""
+    if match not in TAG_MATCH_OPERATORS:
+        raise InvalidTagFilter("match must be 'any' or 'all'")
+    if not tags:
+        return "", {}
+    return f" AND {column} {TAG_MATCH_OPERATORS[match]} CAST(:filter_tags AS text[])", {"filter_tags": tags}
+
+
+def tag_facets(db, table: str, user_id: str, tags: List[str], match: str = "any", limit: int = 100) -> List[Dict[str, Any]]:
+    if table not in TAGGED_TABLES:
+        raise InvalidTagFilter(f"{table} has no tags")
+    clause, params = tag_filter(tags, match)
+    result = db.execute(
+        text(f"""
+            SELECT tag, count(*) AS count
+            FROM {table}, unnest(tags) AS tag
+            WHERE user_id = :user_id{clause}
+            GROUP BY tag
+            ORDER BY count DESC, tag
+            LIMIT :limit
+        """),
+        {"user_id": user_id, "limit": limit, **params}
+    )
+    return [{"tag": row[0], "count": row[1]} for row in result]
+
+
+def _index_names(plan: Dict[str, Any]) -> List[str]:
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(_index_names(child))
+    return names
+
+
+def explain_tag_filters(engine) -> bool:
+    """EXPLAINs every table/match combination with seq scans disabled, so this checks that the
+    operators can use the GIN index at all, independent of how much data the database holds."""
+    ok = True
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for table, index in TAGGED_TABLES.items():
+            for match in TAG_MATCH_OPERATORS:
+                clause, params = tag_filter(["etl", "finance"], match)
+                plan = conn.execute(
+                    text(f"EXPLAIN (FORMAT JSON) SELECT id FROM {table} WHERE true{clause}"), params
+                ).scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                used = _index_names(plan[0]["Plan"])
+                passed = index in used
+                ok = ok and passed
+                print(f"{'ok  ' if passed else 'FAIL'} {table} match={match}: indexes used {used or 'none'}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag filter index checks")
+    parser.add_argument("--explain", action="store_true", help="confirm tag filters plan onto GIN indexes")
+    args = parser.parse_args()
+
+    from complete_rds_api import engine
+
+    if args.explain:
+        sys.exit(0 if explain_tag_filters(engine) else 1)
+    parser.print_help()
@@ -0,0 +1,413 @@
+"""
+Content-hash deduplication for files uploaded to data sources.
+
+Every upload is hashed while it streams in. Each DEDUP_BLOCK_SIZE block
+gets a SHA-256 digest, and the file's digest is the SHA-256 of its block
+digests, so each byte is hashed once. hashlib's SHA-256 runs on the CPU's
+SHA instructions where it has them, and that beats BLAKE2b and MD5 in
+software by 2-3x. Browsers compute the same digest with WebCrypto. The
+upload_manifest table keeps both kinds of digest per (source, table or
+object key). A re-upload can then skip work at three levels:
+
+- Blocks: while an upload to an existing table matches the stored file
+  block by block, nothing is written. At the first block that differs, the
+  matched prefix is copied from the stored file inside the kernel, with
+  copy_file_range; filesystems with reflinks share those extents. The rest
+  is written as it arrives. A re-upload of an unchanged file writes
+  nothing, and one that changed near its end writes little more than the
+  change.
+- Files: an upload whose digest matches the table's current content leaves
+  the table untouched. One that matches another table of the source
+  becomes a hard link to that table's file, so a workbook is converted to
+  Parquet once.
+- Transfers: a client that computes the digest first (content_hash())
+  can send it as X-Content-Hash with probe=true and no body. If the source
+  already holds that content, the upload is done from there and the bytes
+  never cross the network. Otherwise the outcome is "missing", and the
+  client sends the body, still with the header. A table upload whose body
+  does not match its declared digest is rejected.
+
+Entries also record the stored file's size and mtime. A table that was
+replaced or removed some other way, by an export or a delete for example,
+no longer matches and is treated as new content. Objects in object stores
+are checked by size only. The manifest's counters add up to the savings
+that GET /data-sources/{id}/dedup reports.
+
+Benchmark re-upload patterns against plain stores:
+    python upload_dedup.py [--size-mb 256]
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+# Part of the digest's definition (clients compute it too), so not configurable.
+DEDUP_BLOCK_SIZE = 4 * 1024 * 1024
+
+HASH_HEADER = "x-content-hash"
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def content_hash(data: bytes, block_size: int = DEDUP_BLOCK_SIZE) -> str:
+    """The digest a client declares in X-Content-Hash: SHA-256 over the SHA-256 of each block, hex."""
+    blocks = (hashlib.sha256(data[i:i + block_size]).digest() for i in range(0, len(data), block_size))
+    return hashlib.sha256(b"".join(blocks)).hexdigest()
+
+
+def parse_hash_header(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip().lower()
+    if len(value) != DIGEST_SIZE * 2 or any(c not in "0123456789abcdef" for c in value):
+        raise ValueError(f"X-Content-Hash must be a {DIGEST_SIZE * 2}-character hex digest (see content_hash)")
+    return value
+
+
+class StreamHasher:
+    """Per-block and whole-file digests of a stream, fed one chunk at a time."""
+
+    def __init__(self, block_size: int = DEDUP_BLOCK_SIZE):
+        self.block_size = block_size
+        self.size = 0
+        self.blocks: List[bytes] = []
+        self._block = hashlib.sha256()
+        self._block_fill = 0
+
+    def update(self, chunk: bytes) -> int:
+        """Hashes chunk and returns how many blocks it completed."""
+        self.size += len(chunk)
+        completed = 0
+        view = memoryview(chunk)
+        while view:
+            take = min(len(view), self.block_size - self._block_fill)
+            self._block.update(view[:take])
+            self._block_fill += take
+            view = view[take:]
+            if self._block_fill == self.block_size:
+                self.blocks.append(self._block.digest())
+                self._block = hashlib.sha256()
+                self._block_fill = 0
+                completed += 1
+        return completed
+
+    def finish(self) -> "StreamHasher":
+        if self._block_fill:
+            self.blocks.append(self._block.digest())
+            self._block = hashlib.sha256()
+            self._block_fill = 0
+        return self
+
+    def hexdigest(self) -> str:
+        """The file's digest; call once every chunk is in and finish() has run."""
+        return hashlib.sha256(b"".join(self.blocks)).hexdigest()
+
+    def wrap(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Passes chunks through unchanged, hashing them on the way, for consumers such as uploads."""
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+        self.finish()
+
+    def entry(self) -> Dict[str, Any]:
+        """The manifest fields that describe the content itself."""
+        return {"content_hash": self.hexdigest(), "size": self.size, "block_size": self.block_size,
+                "block_hashes": b"".join(self.blocks)}
+
+
+def _write_all(fd: int, data) -> int:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+    return len(data)
+
+
+def _copy_prefix(source_path: str, fd: int, length: int):
+    with open(source_path, "rb") as source:
+        offset = 0
+        while offset < length:
+            if hasattr(os, "copy_file_range"):
+                try:
+                    copied = os.copy_file_range(source.fileno(), fd, length - offset, offset)
+                except OSError:
+                    copied = 0
+                if copied:
+                    offset += copied
+                    continue
+            # No copy_file_range (or not across these filesystems): copy through user space.
+            data = os.pread(source.fileno(), min(length - offset, 8 * 1024 * 1024), offset)
+            if not data:
+                raise OSError(f"{source_path} is shorter than the manifest says")
+            offset += _write_all(fd, data)
+
+
+def stage_upload(chunks: Iterable[bytes], directory: str, reference: Optional[Tuple[str, Dict[str, Any]]] = None,
+                 suffix: str = "", block_size: int = DEDUP_BLOCK_SIZE) -> Dict[str, Any]:
+    """Writes chunks to a temporary file in directory, hashing them as they arrive.
+
+    reference is (path, manifest entry) of a file holding an earlier version of the same content. While
+    the upload matches it block by block nothing is written. If the whole upload matches, no file is
+    made and "path" is None. Otherwise "path" is the staged file, which the caller moves into place or
+    removes."""
+    hasher = StreamHasher(block_size)
+    reference_blocks: List[bytes] = []
+    if reference is not None and reference[1].get("block_size") == block_size:
+        raw = bytes(reference[1]["block_hashes"])
+        reference_blocks = [raw[i:i + DIGEST_SIZE] for i in range(0, len(raw), DIGEST_SIZE)]
+    pending = bytearray()
+    matched = 0
+    fd: Optional[int] = None
+    path: Optional[str] = None
+    stats = {"bytes_written": 0, "bytes_copied": 0}
+
+    def start_writing():
+        nonlocal fd, path
+        fd, path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=suffix)
+        if matched:
+            _copy_prefix(reference[0], fd, matched)
+            stats["bytes_copied"] = matched
+        stats["bytes_written"] += _write_all(fd, pending)
+        pending.clear()
+
+    try:
+        if not reference_blocks:
+            start_writing()
+        for chunk in chunks:
+            if fd is not None:
+                hasher.update(chunk)
+                stats["bytes_written"] += _write_all(fd, chunk)
+                continue
+            first = len(hasher.blocks)
+            completed = hasher.update(chunk)
+            pending.extend(chunk)
+            for index in range(first, first + completed):
+                if index >= len(reference_blocks) or hasher.blocks[index] != reference_blocks[index]:
+                    start_writing()
+                    break
+                matched += block_size
+                del pending[:block_size]
+        hasher.finish()
+        if fd is None:
+            if hasher.size == reference[1]["size"] and hasher.blocks == reference_blocks:
+                return {**hasher.entry(), "path": None, **stats}
+            start_writing()
+        os.fsync(fd)
+        os.close(fd)
+        fd = None
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if path is not None:
+            os.unlink(path)
+        raise
+    return {**hasher.entry(), "path": path, **stats}
+
+
+def current_entry(directory: str, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """entry, if the file it describes is still the one on disk."""
+    if entry is None or not entry.get("stored_name"):
+        return None
+    try:
+        stat = os.stat(os.path.join(directory, entry["stored_name"]))
+    except FileNotFoundError:
+        return None
+    if stat.st_size != entry.get("stored_size") or stat.st_mtime_ns != entry.get("stored_mtime_ns"):
+        return None
+    return entry
+
+
+def find_content(directory: str, manifest: Dict[str, Dict[str, Any]], digest: str,
+                 size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """A current manifest entry holding content with this digest, if the source has one."""
+    for entry in manifest.values():
+        if entry["content_hash"] == digest and (size is None or entry["size"] == size):
+            if current_entry(directory, entry) is not None:
+                return entry
+    return None
+
+
+def link_or_copy(source_path: str, target_path: str):
+    """Puts a file with source_path's content at target_path, sharing its data where the filesystem can."""
+    directory = os.path.dirname(target_path)
+    fd, staged = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    os.close(fd)
+    os.unlink(staged)
+    try:
+        try:
+            os.link(source_path, staged)
+        except OSError:
+            shutil.copyfile(source_path, staged)
+        os.replace(staged, target_path)
+    except BaseException:
+        if os.path.exists(staged):
+            os.unlink(staged)
+        raise
+
+
+# ---- manifest ----
+
+def load_manifest(db, source_id: str) -> Dict[str, Dict[str, Any]]:
+    """path (table or object key) -> manifest entry, for one source."""
+    rows = db.execute(
+        text("""
+            SELECT path, content_hash, size, block_size, block_hashes, stored_name, stored_size, stored_mtime_ns
+            FROM upload_manifest WHERE source_id = :source_id
+        """),
+        {"source_id": source_id}
+    ).fetchall()
+    return {
+        row[0]: {"path": row[0], "content_hash": row[1], "size": row[2], "block_size": row[3],
+                 "block_hashes": bytes(row[4]), "stored_name": row[5], "stored_size": row[6],
+                 "stored_mtime_ns": row[7]}
+        for row in rows
+    }
+
+
+def record_upload(db, source_id: str, path: str, entry: Dict[str, Any], dedup: Dict[str, Any]):
+    """Upserts path's entry and adds one upload's counters. The caller commits."""
+    db.execute(
+        text("""
+            INSERT INTO upload_manifest (
+                source_id, path, content_hash, size, block_size, block_hashes, stored_name, stored_size,
+                stored_mtime_ns, uploads, duplicate_uploads, bytes_received, bytes_written, bytes_not_sent
+            ) VALUES (
+                :source_id, :path, :content_hash, :size, :block_size, :block_hashes, :stored_name, :stored_size,
+                :stored_mtime_ns, 1, :duplicate, :bytes_received, :bytes_written, :bytes_not_sent
+            )
+            ON CONFLICT (source_id, path) DO UPDATE SET
+                content_hash = EXCLUDED.content_hash,
+                size = EXCLUDED.size,
+                block_size = EXCLUDED.block_size,
+                block_hashes = EXCLUDED.block_hashes,
+                stored_name = EXCLUDED.stored_name,
+                stored_size = EXCLUDED.stored_size,
+                stored_mtime_ns = EXCLUDED.stored_mtime_ns,
+                uploads = upload_manifest.uploads + 1,
+                duplicate_uploads = upload_manifest.duplicate_uploads + EXCLUDED.duplicate_uploads,
+                bytes_received = upload_manifest.bytes_received + EXCLUDED.bytes_received,
+                bytes_written = upload_manifest.bytes_written + EXCLUDED.bytes_written,
+                bytes_not_sent = upload_manifest.bytes_not_sent + EXCLUDED.bytes_not_sent,
+                updated_at = now()
+        """),
+        {
+            "source_id": source_id, "path": path, "content_hash": entry["content_hash"], "size": entry["size"],
+            "block_size": entry["block_size"], "block_hashes": entry["block_hashes"],
+            "stored_name": entry.get("stored_name"), "stored_size": entry.get("stored_size"),
+            "stored_mtime_ns": entry.get("stored_mtime_ns"),
+            "duplicate": 1 if dedup["outcome"] != "stored" else 0,
+            "bytes_received": dedup.get("bytes_received", 0), "bytes_written": dedup.get("bytes_written", 0),
+            "bytes_not_sent": dedup.get("bytes_not_sent", 0),
+        }
+    )
+
+
+def forget_upload(db, source_id: str, path: str):
+    db.execute(
+        text("DELETE FROM upload_manifest WHERE source_id = :source_id AND path = :path"),
+        {"source_id": source_id, "path": path}
+    )
+
+
+def dedup_stats(db, source_id: str) -> Dict[str, Any]:
+    rows = db.execute(
+        text("""
+            SELECT path, content_hash, size, uploads, duplicate_uploads, bytes_received, bytes_written,
+                   bytes_not_sent, updated_at
+            FROM upload_manifest WHERE source_id = :source_id ORDER BY path
+        """),
+        {"source_id": source_id}
+    ).fetchall()
+    files = [
+        {
+            "path": row[0],
+            "content_hash": row[1],
+            "size": row[2],
+            "uploads": row[3],
+            "duplicate_uploads": row[4],
+            "bytes_received": row[5],
+            "bytes_written": row[6],
+            "bytes_not_sent": row[7],
+            "bytes_saved": row[5] - row[6] + row[7],
+            "updated_at": row[8].isoformat() if row[8] else None
+        }
+        for row in rows
+    ]
+    unique = {file["content_hash"]: file["size"] for file in files}
+    return {
+        "files": len(files),
+        "unique_files": len(unique),
+        "content_bytes": sum(file["size"] for file in files),
+        "unique_content_bytes": sum(unique.values()),
+        "uploads": sum(file["uploads"] for file in files),
+        "duplicate_uploads": sum(file["duplicate_uploads"] for file in files),
+        "bytes_received": sum(file["bytes_received"] for file in files),
+        "bytes_written": sum(file["bytes_written"] for file in files),
+        "bytes_not_sent": sum(file["bytes_not_sent"] for file in files),
+        "bytes_saved": sum(file["bytes_saved"] for file in files),
+        "by_file": files,
+    }
+
+
+# ---- benchmark ----
+
+def _chunks(data: bytes, size: int = 1024 * 1024) -> Iterator[bytes]:
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+def run_benchmark(size_mb: int):
+    from embedded_engine import EmbeddedEngine
+    from object_store import TransferEngine
+
+    size = size_mb * 1024 * 1024
+    data = os.urandom(size)
+    sample = data[:64 * 1024 * 1024]
+    for name in ("sha256", "blake2b", "md5"):
+        started = time.perf_counter()
+        hashlib.new(name, sample).digest()
+        print(f"  {name:>8}: {len(sample) / 2 ** 20 / (time.perf_counter() - started):7.0f} MiB/s")
+
+    root = tempfile.mkdtemp(prefix="upload-dedup-bench-")
+    try:
+        engine = EmbeddedEngine(data_dir=root)
+        transfers = TransferEngine()
+        source = {"id": "bench"}
+        manifest: Dict[str, Dict[str, Any]] = {}
+
+        def upload(label: str, table: str, body: bytes, dedup: bool):
+            started = time.perf_counter()
+            result = engine.store(transfers, source, table, f"{table}.csv", _chunks(body), len(body),
+                                  manifest=manifest if dedup else None)
+            seconds = time.perf_counter() - started
+            if dedup:
+                manifest[table] = {"path": table, **result["manifest"]}
+                outcome = result["dedup"]
+                detail = (f"{outcome['outcome']:<9} wrote {outcome['bytes_written'] / 2 ** 20:6.1f} MiB, "
+                          f"copied {outcome['bytes_copied'] / 2 ** 20:6.1f} MiB")
+            else:
+                detail = f"{'plain':<9} wrote {len(body) / 2 ** 20:6.1f} MiB"
+            print(f"  {label:<34}: {seconds:6.2f}s  {detail}")
+
+        changed = bytearray(data)
+        changed[-1024:] = os.urandom(1024)
+        upload("first upload", "events", data, False)
+        upload("re-upload, no dedup", "events", data, False)
+        upload("first upload, hashed", "events", data, True)
+        upload("re-upload unchanged", "events", data, True)
+        upload("re-upload, last KiB changed", "events", bytes(changed), True)
+        upload("re-upload, 1% appended", "events", bytes(changed) + data[:size // 100], True)
+        upload("same content, another table", "events_copy", bytes(changed) + data[:size // 100], True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload deduplication benchmark")
+    parser.add_argument("--size-mb", type=int, default=256)
+    args = parser.parse_args()
+    run_benchmark(args.size_mb)
@@ -4,6 +4,10 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram matching and btree operator classes for the search indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
 -- ============================================
 -- AUTHENTICATION & USER MANAGEMENT
 -- ============================================
@@ -108,7 +112,7 @@ CREATE TABLE IF NOT EXISTS compute_clusters (
   id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
   cloud_profile_id uuid NOT NULL REFERENCES cloud_profiles(id) ON DELETE CASCADE,
   name text NOT NULL,
-  compute_type text NOT NULL CHECK (compute_type IN ('spark', 'dask', 'ray')),
+  compute_type text NOT NULL CHECK (compute_type IN ('spark', 'dask', 'ray', 'process')),
   node_type text NOT NULL,
   num_workers integer NOT NULL DEFAULT 2,
   auto_scaling boolean DEFAULT false,
@@ -134,7 +138,31 @@ CREATE TABLE IF NOT EXISTS data_sources (
   config jsonb NOT NULL DEFAULT '{}'::jsonb,
   status text DEFAULT 'active' CHECK (status IN ('active', 'inactive', 'error')),
   last_tested timestamptz,
+  last_error text,
+  last_latency_ms integer,
+  consecutive_failures integer NOT NULL DEFAULT 0,
+  next_check_at timestamptz,
+  description text,
+  created_at timestamptz DEFAULT now(),
+  updated_at timestamptz DEFAULT now()
+);
+
+-- Repositories table (git remotes synced into notebooks and pipelines)
+CREATE TABLE IF NOT EXISTS repositories (
+  id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
+  user_id uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  workspace_id uuid REFERENCES workspaces(id) ON DELETE SET NULL,
+  name text NOT NULL,
+  provider text NOT NULL DEFAULT 'generic' CHECK (provider IN ('github', 'gitlab', 'bitbucket', 'generic')),
+  url text NOT NULL,
+  branch text NOT NULL DEFAULT 'main',
+  username text,
+  access_token text,
   description text,
+  status text NOT NULL DEFAULT 'disconnected' CHECK (status IN ('connected', 'disconnected', 'error')),
+  last_synced_commit text,
+  last_sync timestamptz,
+  last_error text,
   created_at timestamptz DEFAULT now(),
   updated_at timestamptz DEFAULT now()
 );
@@ -152,6 +180,11 @@ CREATE TABLE IF NOT EXISTS pipelines (
   workflow_yaml text,
   pipeline_graph jsonb DEFAULT '{"nodes": [], "edges": []}',
   status text NOT NULL DEFAULT 'draft' CHECK (status IN ('draft', 'active', 'inactive')),
+  schedule_cron text,
+  schedule_timezone text DEFAULT 'UTC',
+  repository_id uuid REFERENCES repositories(id) ON DELETE SET NULL,
+  source_path text,
+  source_blob_sha text,
   created_at timestamptz DEFAULT now(),
   updated_at timestamptz DEFAULT now()
 );
@@ -168,10 +201,53 @@ CREATE TABLE IF NOT EXISTS notebooks (
   language text NOT NULL DEFAULT 'python' CHECK (language IN ('python', 'sql', 'scala', 'r')),
   content jsonb DEFAULT '{"cells": []}',
   cluster_id uuid REFERENCES compute_clusters(id) ON DELETE SET NULL,
+  repository_id uuid REFERENCES repositories(id) ON DELETE SET NULL,
+  source_path text,
+  source_blob_sha text,
+  version integer NOT NULL DEFAULT 0,
+  cells_normalized boolean NOT NULL DEFAULT false,
   created_at timestamptz DEFAULT now(),
   updated_at timestamptz DEFAULT now()
 );
 
+-- Notebook cells table (per-cell storage once a notebook takes cell-level edits)
+CREATE TABLE IF NOT EXISTS notebook_cells (
+  notebook_id uuid NOT NULL REFERENCES notebooks(id) ON DELETE CASCADE,
+  cell_id text NOT NULL,
+  position double precision NOT NULL,
+  cell_type text NOT NULL DEFAULT 'code',
+  content text NOT NULL DEFAULT '',
+  output text,
+  extra jsonb NOT NULL DEFAULT '{}',
+  updated_at timestamptz DEFAULT now(),
+  PRIMARY KEY (notebook_id, cell_id)
+) WITH (fillfactor = 80);
+
+-- Pipeline versions table (delta-encoded save history; full snapshot every N versions)
+CREATE TABLE IF NOT EXISTS pipeline_versions (
+  pipeline_id uuid NOT NULL REFERENCES pipelines(id) ON DELETE CASCADE,
+  version integer NOT NULL,
+  kind text NOT NULL CHECK (kind IN ('snapshot', 'delta')),
+  graph jsonb,
+  yaml jsonb,
+  message text,
+  changes jsonb,
+  stored_bytes integer NOT NULL DEFAULT 0,
+  created_by uuid REFERENCES users(id) ON DELETE SET NULL,
+  created_at timestamptz DEFAULT now(),
+  PRIMARY KEY (pipeline_id, version)
+);
+
+-- Blobs table (content-addressed store for large outputs and pipeline YAML)
+CREATE TABLE IF NOT EXISTS blobs (
+  sha256 text PRIMARY KEY,
+  size bigint NOT NULL,
+  stored_size bigint NOT NULL,
+  content_type text NOT NULL DEFAULT 'text/plain; charset=utf-8',
+  created_at timestamptz DEFAULT now(),
+  last_stored_at timestamptz DEFAULT now()
+);
+
 -- Saved queries table
 CREATE TABLE IF NOT EXISTS saved_queries (
   id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -185,6 +261,186 @@ CREATE TABLE IF NOT EXISTS saved_queries (
   is_favorite boolean DEFAULT false
 );
 
+-- ============================================
+-- PIPELINE RUNS & TELEMETRY
+-- ============================================
+
+-- Pipeline schedule state (last claimed fire per scheduled pipeline)
+CREATE TABLE IF NOT EXISTS pipeline_schedule_state (
+  pipeline_id uuid PRIMARY KEY REFERENCES pipelines(id) ON DELETE CASCADE,
+  last_scheduled_at timestamptz NOT NULL,
+  last_fired_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Pipeline runs table (append-only execution history)
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+  id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
+  pipeline_id uuid NOT NULL REFERENCES pipelines(id) ON DELETE CASCADE,
+  status text NOT NULL CHECK (status IN ('succeeded', 'failed', 'cancelled')),
+  trigger text NOT NULL DEFAULT 'manual',
+  started_at timestamptz NOT NULL,
+  finished_at timestamptz NOT NULL,
+  duration_ms bigint NOT NULL,
+  rows_in bigint,
+  rows_out bigint,
+  bytes_in bigint,
+  bytes_out bigint,
+  peak_memory_bytes bigint,
+  spill_bytes bigint,
+  rows_scanned bigint,
+  bytes_skipped bigint,
+  error text,
+  created_at timestamptz DEFAULT now() NOT NULL
+);
+
+-- Pipeline node runs table (per-node telemetry for each run)
+CREATE TABLE IF NOT EXISTS pipeline_node_runs (
+  id bigserial PRIMARY KEY,
+  run_id uuid NOT NULL REFERENCES pipeline_runs(id) ON DELETE CASCADE,
+  pipeline_id uuid NOT NULL REFERENCES pipelines(id) ON DELETE CASCADE,
+  node_id text NOT NULL,
+  node_type text,
+  status text NOT NULL CHECK (status IN ('succeeded', 'failed', 'cancelled', 'skipped')),
+  started_at timestamptz NOT NULL,
+  finished_at timestamptz NOT NULL,
+  duration_ms bigint NOT NULL,
+  rows_in bigint,
+  rows_out bigint,
+  bytes_in bigint,
+  bytes_out bigint,
+  peak_memory_bytes bigint,
+  spill_bytes bigint,
+  rows_scanned bigint,
+  bytes_skipped bigint,
+  metrics jsonb DEFAULT '{}'::jsonb
+);
+
+-- Extraction watermarks table (how far each pipeline's incremental reads of a source table have got)
+CREATE TABLE IF NOT EXISTS extraction_watermarks (
+  pipeline_id uuid NOT NULL REFERENCES pipelines(id) ON DELETE CASCADE,
+  source_id uuid NOT NULL REFERENCES data_sources(id) ON DELETE CASCADE,
+  table_name text NOT NULL,
+  column_name text NOT NULL,
+  value_type text NOT NULL,
+  value text NOT NULL,
+  last_rows bigint NOT NULL DEFAULT 0,
+  total_rows bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz DEFAULT now() NOT NULL,
+  PRIMARY KEY (pipeline_id, source_id, table_name)
+);
+
+-- Upload manifest table (content hashes of files uploaded to a source, so re-uploads are deduplicated)
+CREATE TABLE IF NOT EXISTS upload_manifest (
+  source_id uuid NOT NULL REFERENCES data_sources(id) ON DELETE CASCADE,
+  path text NOT NULL,
+  content_hash text NOT NULL,
+  size bigint NOT NULL,
+  block_size integer NOT NULL,
+  block_hashes bytea NOT NULL,
+  stored_name text,
+  stored_size bigint,
+  stored_mtime_ns bigint,
+  uploads integer NOT NULL DEFAULT 0,
+  duplicate_uploads integer NOT NULL DEFAULT 0,
+  bytes_received bigint NOT NULL DEFAULT 0,
+  bytes_written bigint NOT NULL DEFAULT 0,
+  bytes_not_sent bigint NOT NULL DEFAULT 0,
+  created_at timestamptz DEFAULT now() NOT NULL,
+  updated_at timestamptz DEFAULT now() NOT NULL,
+  PRIMARY KEY (source_id, path)
+);
+
+-- ============================================
+-- JOB QUEUE
+-- ============================================
+
+-- Jobs table (durable queue for long-running operations)
+CREATE TABLE IF NOT EXISTS jobs (
+  id bigserial PRIMARY KEY,
+  kind text NOT NULL,
+  lane text NOT NULL DEFAULT 'default' CHECK (lane IN ('high', 'default', 'low')),
+  priority smallint NOT NULL DEFAULT 0,
+  payload jsonb NOT NULL DEFAULT '{}'::jsonb,
+  status text NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+  attempts integer NOT NULL DEFAULT 0,
+  max_attempts integer NOT NULL DEFAULT 5,
+  run_at timestamptz NOT NULL DEFAULT now(),
+  locked_by text,
+  locked_until timestamptz,
+  last_error text,
+  result jsonb,
+  dedupe_key text,
+  user_id uuid REFERENCES users(id) ON DELETE CASCADE,
+  created_at timestamptz DEFAULT now() NOT NULL,
+  updated_at timestamptz DEFAULT now() NOT NULL
+);
+
+-- ============================================
+-- SEARCH
+-- ============================================
+
+-- Search documents table (one row per searchable workspace, pipeline, notebook and saved query, kept in sync by triggers)
+CREATE TABLE IF NOT EXISTS search_documents (
+  kind text NOT NULL CHECK (kind IN ('workspace', 'pipeline', 'notebook', 'saved_query')),
+  id uuid NOT NULL,
+  user_id uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  workspace_id uuid,
+  title text NOT NULL,
+  description text,
+  keywords text,
+  body text,
+  updated_at timestamptz,
+  document tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(keywords, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'D')
+  ) STORED,
+  PRIMARY KEY (kind, id)
+);
+
+-- ============================================
+-- UPGRADES FOR EXISTING DATABASES
+-- ============================================
+
+ALTER TABLE pipelines ADD COLUMN IF NOT EXISTS schedule_cron text;
+ALTER TABLE pipelines ADD COLUMN IF NOT EXISTS schedule_timezone text DEFAULT 'UTC';
+ALTER TABLE compute_clusters DROP CONSTRAINT IF EXISTS compute_clusters_compute_type_check;
+ALTER TABLE compute_clusters ADD CONSTRAINT compute_clusters_compute_type_check
+  CHECK (compute_type IN ('spark', 'dask', 'ray', 'process'));
+ALTER TABLE notebooks ADD COLUMN IF NOT EXISTS repository_id uuid REFERENCES repositories(id) ON DELETE SET NULL;
+ALTER TABLE notebooks ADD COLUMN IF NOT EXISTS source_path text;
+ALTER TABLE notebooks ADD COLUMN IF NOT EXISTS source_blob_sha text;
+ALTER TABLE notebooks ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0;
+ALTER TABLE notebooks ADD COLUMN IF NOT EXISTS cells_normalized boolean NOT NULL DEFAULT false;
+ALTER TABLE pipelines ADD COLUMN IF NOT EXISTS repository_id uuid REFERENCES repositories(id) ON DELETE SET NULL;
+ALTER TABLE pipelines ADD COLUMN IF NOT EXISTS source_path text;
+ALTER TABLE pipelines ADD COLUMN IF NOT EXISTS source_blob_sha text;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS last_error text;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS last_latency_ms integer;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS consecutive_failures integer NOT NULL DEFAULT 0;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS next_check_at timestamptz;
+DROP TRIGGER IF EXISTS update_data_sources_updated_at ON data_sources;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS rows_scanned bigint;
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS bytes_skipped bigint;
+ALTER TABLE pipeline_node_runs ADD COLUMN IF NOT EXISTS rows_scanned bigint;
+ALTER TABLE pipeline_node_runs ADD COLUMN IF NOT EXISTS bytes_skipped bigint;
+
+-- Backfill search documents for rows that predate the search triggers
+INSERT INTO search_documents (kind, id, user_id, workspace_id, title, description, keywords, body, updated_at)
+SELECT 'workspace', id, user_id, id, name, description, concat_ws(' ', category, array_to_string(tags, ' ')), NULL, updated_at
+FROM workspaces
+UNION ALL
+SELECT 'pipeline', id, user_id, workspace_id, name, description, NULL, NULL, updated_at
+FROM pipelines WHERE user_id IS NOT NULL
+UNION ALL
+SELECT 'notebook', n.id, w.user_id, n.workspace_id, n.name, NULL, n.language, NULL, n.updated_at
+FROM notebooks n JOIN workspaces w ON n.workspace_id = w.id
+UNION ALL
+SELECT 'saved_query', id, user_id, NULL, name, description, array_to_string(tags, ' '), query_text, updated_at
+FROM saved_queries
+ON CONFLICT (kind, id) DO NOTHING;
+
 -- ============================================
 -- TRIGGERS FOR UPDATED_AT
 -- ============================================
@@ -223,8 +479,9 @@ CREATE TRIGGER update_compute_clusters_updated_at
   BEFORE UPDATE ON compute_clusters
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Health check bookkeeping (status, last_tested, next_check_at, ...) is not an edit, so it leaves updated_at alone
 CREATE TRIGGER update_data_sources_updated_at
-  BEFORE UPDATE ON data_sources
+  BEFORE UPDATE OF name, type, config, description ON data_sources
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_pipelines_updated_at
@@ -239,6 +496,133 @@ CREATE TRIGGER update_saved_queries_updated_at
   BEFORE UPDATE ON saved_queries
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_repositories_updated_at
+  BEFORE UPDATE ON repositories
+  FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_jobs_updated_at
+  BEFORE UPDATE ON jobs
+  FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Function to publish status changes for server-sent events
+CREATE OR REPLACE FUNCTION notify_status_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  owner_id uuid;
+BEGIN
+  IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+    RETURN NEW;
+  END IF;
+
+  IF TG_TABLE_NAME = 'compute_clusters' THEN
+    SELECT user_id INTO owner_id FROM cloud_profiles WHERE id = NEW.cloud_profile_id;
+  ELSE
+    owner_id := NEW.user_id;
+  END IF;
+
+  PERFORM pg_notify('status_changes', json_build_object(
+    'resource', TG_TABLE_NAME,
+    'id', NEW.id,
+    'status', NEW.status,
+    'user_id', owner_id,
+    'updated_at', NEW.updated_at
+  )::text);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_compute_clusters_status
+  AFTER INSERT OR UPDATE OF status ON compute_clusters
+  FOR EACH ROW EXECUTE FUNCTION notify_status_change();
+
+CREATE TRIGGER notify_pipelines_status
+  AFTER INSERT OR UPDATE OF status ON pipelines
+  FOR EACH ROW EXECUTE FUNCTION notify_status_change();
+
+CREATE TRIGGER notify_data_sources_status
+  AFTER INSERT OR UPDATE OF status ON data_sources
+  FOR EACH ROW EXECUTE FUNCTION notify_status_change();
+
+-- Function to keep search_documents in step with the searchable tables
+CREATE OR REPLACE FUNCTION sync_search_document()
+RETURNS TRIGGER AS $$
+DECLARE
+  doc_kind text;
+  owner_id uuid;
+  doc_workspace_id uuid;
+  doc_description text;
+  doc_keywords text;
+  doc_body text;
+BEGIN
+  doc_kind := CASE TG_TABLE_NAME
+    WHEN 'workspaces' THEN 'workspace'
+    WHEN 'pipelines' THEN 'pipeline'
+    WHEN 'notebooks' THEN 'notebook'
+    ELSE 'saved_query'
+  END;
+
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM search_documents WHERE kind = doc_kind AND id = OLD.id;
+    RETURN OLD;
+  END IF;
+
+  IF TG_TABLE_NAME = 'workspaces' THEN
+    owner_id := NEW.user_id;
+    doc_workspace_id := NEW.id;
+    doc_description := NEW.description;
+    doc_keywords := concat_ws(' ', NEW.category, array_to_string(NEW.tags, ' '));
+  ELSIF TG_TABLE_NAME = 'pipelines' THEN
+    owner_id := NEW.user_id;
+    doc_workspace_id := NEW.workspace_id;
+    doc_description := NEW.description;
+  ELSIF TG_TABLE_NAME = 'notebooks' THEN
+    SELECT user_id INTO owner_id FROM workspaces WHERE id = NEW.workspace_id;
+    doc_workspace_id := NEW.workspace_id;
+    doc_keywords := NEW.language;
+  ELSE
+    owner_id := NEW.user_id;
+    doc_description := NEW.description;
+    doc_keywords := array_to_string(NEW.tags, ' ');
+    doc_body := NEW.query_text;
+  END IF;
+
+  -- Pipelines may have no owner; nobody can search for those
+  IF owner_id IS NULL THEN
+    DELETE FROM search_documents WHERE kind = doc_kind AND id = NEW.id;
+    RETURN NEW;
+  END IF;
+
+  INSERT INTO search_documents (kind, id, user_id, workspace_id, title, description, keywords, body, updated_at)
+  VALUES (doc_kind, NEW.id, owner_id, doc_workspace_id, NEW.name, doc_description, doc_keywords, doc_body, NEW.updated_at)
+  ON CONFLICT (kind, id) DO UPDATE SET
+    user_id = EXCLUDED.user_id,
+    workspace_id = EXCLUDED.workspace_id,
+    title = EXCLUDED.title,
+    description = EXCLUDED.description,
+    keywords = EXCLUDED.keywords,
+    body = EXCLUDED.body,
+    updated_at = EXCLUDED.updated_at;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the indexed columns fire these, so notebook content saves and cell edits skip them
+CREATE TRIGGER sync_workspaces_search
+  AFTER INSERT OR DELETE OR UPDATE OF name, description, category, tags ON workspaces
+  FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+CREATE TRIGGER sync_pipelines_search
+  AFTER INSERT OR DELETE OR UPDATE OF name, description, workspace_id ON pipelines
+  FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+CREATE TRIGGER sync_notebooks_search
+  AFTER INSERT OR DELETE OR UPDATE OF name, language, workspace_id ON notebooks
+  FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+CREATE TRIGGER sync_saved_queries_search
+  AFTER INSERT OR DELETE OR UPDATE OF name, description, tags, query_text ON saved_queries
+  FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
 -- ============================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================
@@ -256,29 +640,60 @@ CREATE INDEX IF NOT EXISTS idx_account_members_user_id ON account_members(user_i
 
 -- Workspaces indexes
 CREATE INDEX IF NOT EXISTS idx_workspaces_user_id ON workspaces(user_id);
+CREATE INDEX IF NOT EXISTS idx_workspaces_user_updated ON workspaces(user_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_workspaces_category ON workspaces(category);
 CREATE INDEX IF NOT EXISTS idx_workspaces_tags ON workspaces USING GIN(tags);
 
 -- Cloud profiles indexes
 CREATE INDEX IF NOT EXISTS idx_cloud_profiles_user_id ON cloud_profiles(user_id);
+CREATE INDEX IF NOT EXISTS idx_cloud_profiles_user_updated ON cloud_profiles(user_id, updated_at);
 
 -- Compute clusters indexes
 CREATE INDEX IF NOT EXISTS idx_compute_clusters_cloud_profile_id ON compute_clusters(cloud_profile_id);
+CREATE INDEX IF NOT EXISTS idx_compute_clusters_profile_updated ON compute_clusters(cloud_profile_id, updated_at);
 
 -- Data sources indexes
 CREATE INDEX IF NOT EXISTS idx_data_sources_user_id ON data_sources(user_id);
 CREATE INDEX IF NOT EXISTS idx_data_sources_type ON data_sources(type);
 CREATE INDEX IF NOT EXISTS idx_data_sources_status ON data_sources(status);
+CREATE INDEX IF NOT EXISTS idx_data_sources_next_check ON data_sources(next_check_at NULLS FIRST) WHERE status IS DISTINCT FROM 'inactive';
 
 -- Pipelines indexes
 CREATE INDEX IF NOT EXISTS idx_pipelines_user_id ON pipelines(user_id);
+CREATE INDEX IF NOT EXISTS idx_pipelines_user_updated ON pipelines(user_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_pipelines_workspace_id ON pipelines(workspace_id);
 CREATE INDEX IF NOT EXISTS idx_pipelines_status ON pipelines(status);
+CREATE INDEX IF NOT EXISTS idx_pipelines_updated_at ON pipelines(updated_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pipelines_repository_path ON pipelines(repository_id, source_path);
+
+-- Repositories indexes
+CREATE INDEX IF NOT EXISTS idx_repositories_user_id ON repositories(user_id);
 
 -- Notebooks indexes
 CREATE INDEX IF NOT EXISTS idx_notebooks_workspace_id ON notebooks(workspace_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notebooks_repository_path ON notebooks(repository_id, source_path);
+CREATE INDEX IF NOT EXISTS idx_pipeline_versions_snapshots ON pipeline_versions(pipeline_id, version) WHERE kind = 'snapshot';
+CREATE INDEX IF NOT EXISTS idx_notebook_cells_position ON notebook_cells(notebook_id, position);
 
 -- Saved queries indexes
 CREATE INDEX IF NOT EXISTS idx_saved_queries_user_id ON saved_queries(user_id);
 CREATE INDEX IF NOT EXISTS idx_saved_queries_created_at ON saved_queries(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_saved_queries_is_favorite ON saved_queries(user_id, is_favorite) WHERE is_favorite = true;
+CREATE INDEX IF NOT EXISTS idx_saved_queries_tags ON saved_queries USING GIN(tags);
+
+-- Pipeline runs indexes
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_pipeline_started ON pipeline_runs(pipeline_id, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_pipeline_node_runs_run_id ON pipeline_node_runs(run_id);
+CREATE INDEX IF NOT EXISTS idx_pipeline_node_runs_pipeline_node ON pipeline_node_runs(pipeline_id, node_id, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_extraction_watermarks_source_id ON extraction_watermarks(source_id);
+CREATE INDEX IF NOT EXISTS idx_upload_manifest_content_hash ON upload_manifest(source_id, content_hash);
+
+-- Jobs indexes
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(lane, priority DESC, run_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(locked_until) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_jobs_user_id ON jobs(user_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe_key ON jobs(dedupe_key) WHERE status IN ('queued', 'running');
+
+-- Search indexes (user_id leads so each user's lookups stay inside their own postings)
+CREATE INDEX IF NOT EXISTS idx_search_documents_document ON search_documents USING GIN(user_id, document);
+CREATE INDEX IF NOT EXISTS idx_search_documents_title_trgm ON search_documents USING GIN(user_id, title gin_trgm_ops);
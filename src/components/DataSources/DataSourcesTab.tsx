@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { Plus, Database, AlertCircle, CheckCircle, Trash2, ChevronRight } from 'lucide-react';
 import AddDataSourceModal from './AddDataSourceModal';
 import DataSourceDetailView from './DataSourceDetailView';
+import { rdsApi } from '../../lib/rdsApi';
 
 export default function DataSourcesTab() {
   const [dataSources, setDataSources] = useState<any[]>([]);
@@ -15,6 +16,15 @@ export default function DataSourcesTab() {
     fetchDataSources();
   }, []);
 
+  useEffect(() => {
+    return rdsApi.events.subscribeStatus((event) => {
+      if (event.resource !== 'data_sources') return;
+      setDataSources((sources) =>
+        sources.map((source) => (source.id === event.id ? { ...source, status: event.status } : source))
+      );
+    });
+  }, []);
+
   const fetchDataSources = async () => {
     try {
       const { data: { user } } = await supabase.auth.getUser();
@@ -95,20 +105,24 @@ export default function DataSourcesTab() {
 
   const handleTestDataSource = async (id: string) => {
     try {
-      const { error } = await supabase
-        .from('data_sources')
-        .update({ last_tested: new Date().toISOString() })
-        .eq('id', id);
-
-      if (error) throw error;
+      const result = await rdsApi.dataSources.test(id);
+      if (!result.ok) throw new Error(result.error);
 
-      alert('Connection test successful!');
-      await fetchDataSources();
+      alert(`Connection test successful! (${result.latency_ms} ms)`);
     } catch (err: any) {
       alert('Connection test failed: ' + err.message);
     }
   };
 
+  const handleTestAll = async () => {
+    try {
+      // Runs as a background job; status changes arrive over the status event stream.
+      await rdsApi.dataSources.testAll();
+    } catch (err: any) {
+      alert('Error starting connection tests: ' + err.message);
+    }
+  };
+
   const handleViewDataSource = (dataSource: any) => {
     setSelectedDataSource(dataSource);
     setViewMode('detail');
@@ -144,13 +158,22 @@ export default function DataSourcesTab() {
           <h2 className="text-2xl font-bold text-gray-900">Data Sources</h2>
           <p className="text-gray-600 mt-1">Manage your data source connections</p>
         </div>
-        <button
-          onClick={() => setShowAddModal(true)}
-          className="flex items-center space-x-2 px-4 py-2 bg-gradient-to-r from-cyan-400 to-blue-500 text-white rounded-lg hover:from-cyan-500 hover:to-blue-600 transition"
-        >
-          <Plus className="w-5 h-5" />
-          <span>Add Data Source</span>
-        </button>
+        <div className="flex items-center space-x-3">
+          <button
+            onClick={handleTestAll}
+            className="flex items-center space-x-2 px-4 py-2 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 transition"
+          >
+            <CheckCircle className="w-5 h-5" />
+            <span>Test All</span>
+          </button>
+          <button
+            onClick={() => setShowAddModal(true)}
+            className="flex items-center space-x-2 px-4 py-2 bg-gradient-to-r from-cyan-400 to-blue-500 text-white rounded-lg hover:from-cyan-500 hover:to-blue-600 transition"
+          >
+            <Plus className="w-5 h-5" />
+            <span>Add Data Source</span>
+          </button>
+        </div>
       </div>
 
       {error && (
@@ -1,19 +1,31 @@
+import { useState, useEffect } from 'react';
 import {
   BarChart3, Server, FileCode, Database, TrendingUp, Activity,
   Clock, CheckCircle2, AlertCircle, Play, Zap, Users,
   FolderOpen, GitBranch, Box, ArrowRight, Sparkles
 } from 'lucide-react';
+import { rdsApi } from '../../lib/rdsApi';
 
 interface HomeTabProps {
   onNavigate?: (tab: string) => void;
 }
 
 export function HomeTab({ onNavigate }: HomeTabProps = {}) {
+  const [bootstrap, setBootstrap] = useState<any>(null);
+
+  useEffect(() => {
+    rdsApi.bootstrap.get()
+      .then(setBootstrap)
+      .catch((error) => console.error('Error loading dashboard:', error));
+  }, []);
+
+  const countOf = (collection: string) => bootstrap ? String(bootstrap[collection].count) : '–';
+
   const stats = [
-    { label: 'Active Clusters', value: '12', change: '+3', trend: 'up', icon: Server, color: 'from-blue-500 to-cyan-600' },
-    { label: 'Running Jobs', value: '8', change: '+2', trend: 'up', icon: Activity, color: 'from-green-500 to-emerald-600' },
-    { label: 'Notebooks', value: '24', change: '+5', trend: 'up', icon: FileCode, color: 'from-violet-500 to-purple-600' },
-    { label: 'Data Sources', value: '6', change: '+1', trend: 'up', icon: Database, color: 'from-orange-500 to-red-600' },
+    { label: 'Compute Clusters', value: countOf('compute_clusters'), icon: Server, color: 'from-blue-500 to-cyan-600' },
+    { label: 'Pipelines', value: countOf('pipelines'), icon: Activity, color: 'from-green-500 to-emerald-600' },
+    { label: 'Notebooks', value: countOf('notebooks'), icon: FileCode, color: 'from-violet-500 to-purple-600' },
+    { label: 'Data Sources', value: countOf('data_sources'), icon: Database, color: 'from-orange-500 to-red-600' },
   ];
 
   const recentActivity = [
@@ -33,11 +45,15 @@ export function HomeTab({ onNavigate }: HomeTabProps = {}) {
     { title: 'Build Pipeline', desc: 'ETL workflow', icon: GitBranch, color: 'pink', gradient: 'from-pink-500 to-rose-600', navigate: 'igo-etl' },
   ];
 
-  const recentNotebooks = [
-    { name: 'Customer Segmentation Analysis', modified: '2 hours ago', type: 'Python' },
-    { name: 'Sales Forecasting Model', modified: '5 hours ago', type: 'SQL' },
-    { name: 'Product Performance Dashboard', modified: '1 day ago', type: 'Python' },
-  ];
+  const recentNotebooks = (bootstrap?.notebooks.items ?? [])
+    .slice()
+    .sort((a: any, b: any) => (b.updated_at || '').localeCompare(a.updated_at || ''))
+    .slice(0, 3)
+    .map((notebook: any) => ({
+      name: notebook.name,
+      modified: notebook.updated_at ? new Date(notebook.updated_at).toLocaleString() : '',
+      type: notebook.language.charAt(0).toUpperCase() + notebook.language.slice(1),
+    }));
 
   const runningJobs = [
     { name: 'Nightly Data Sync', progress: 75, eta: '5 min' },
@@ -69,9 +85,6 @@ export function HomeTab({ onNavigate }: HomeTabProps = {}) {
                 <div className={`w-10 h-10 bg-gradient-to-br ${stat.color} rounded-lg flex items-center justify-center`}>
                   <Icon className="w-5 h-5 text-white" />
                 </div>
-                <span className="text-green-600 dark:text-green-400 text-xs font-bold bg-green-100 dark:bg-green-900/30 px-2 py-1 rounded">
-                  {stat.change}
-                </span>
               </div>
               <h3 className="text-2xl font-bold text-gray-900 dark:text-white mb-0.5">{stat.value}</h3>
               <p className="text-sm text-gray-600 dark:text-slate-400">{stat.label}</p>
@@ -196,7 +209,7 @@ export function HomeTab({ onNavigate }: HomeTabProps = {}) {
             <FileCode className="w-5 h-5 text-violet-600 dark:text-violet-400" />
           </div>
           <div className="space-y-3">
-            {recentNotebooks.map((notebook, index) => (
+            {recentNotebooks.map((notebook: { name: string; modified: string; type: string }, index: number) => (
               <div
                 key={index}
                 className="flex items-center gap-3 p-3 bg-gray-50 dark:bg-slate-700/50 rounded-lg hover:bg-gray-100 dark:hover:bg-slate-700 transition-colors cursor-pointer group"
@@ -68,6 +68,7 @@ export function NotebookEditor({ notebookId, onClose }: NotebookEditorProps) {
         }]);
       } else {
         setCells(notebookCells);
+        loadBlobOutputs(notebookCells);
       }
     } catch (error) {
       console.error('Error fetching notebook:', error);
@@ -76,6 +77,19 @@ export function NotebookEditor({ notebookId, onClose }: NotebookEditorProps) {
     }
   };
 
+  const loadBlobOutputs = (notebookCells: Cell[]) => {
+    notebookCells
+      .filter((cell) => rdsApi.blobs.isRef(cell.output))
+      .forEach(async (cell) => {
+        try {
+          const output = await rdsApi.blobs.getText(cell.output as string);
+          setCells((current) => current.map((c) => (c.id === cell.id ? { ...c, output } : c)));
+        } catch (error) {
+          console.error('Error loading cell output:', error);
+        }
+      });
+  };
+
   const fetchClusters = async () => {
     try {
       const data = await rdsApi.computeClusters.getAll();
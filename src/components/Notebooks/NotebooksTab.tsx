@@ -69,7 +69,13 @@ export function NotebooksTab() {
   };
 
   const handleGitImport = async (data: { repoUrl: string; branch: string; path: string }) => {
-    console.log('Importing from Git:', data);
+    const { job_id } = await rdsApi.repositories.importFiles({
+      url: data.repoUrl,
+      branch: data.branch,
+      path: data.path,
+      kinds: ['notebook'],
+    });
+    if (job_id) await rdsApi.jobs.waitFor(job_id);
     setShowGitModal(false);
     await fetchNotebooks();
   };
@@ -3,6 +3,7 @@ import { Plus, GitBranch, Loader2, Play, Trash2, Calendar, Download, RefreshCw,
 import PipelineWorkflowBuilder from './PipelineWorkflowBuilder';
 import GitImportModal, { GitImportConfig } from './GitImportModal';
 import { CloudIcon } from '../Common/CloudIcon';
+import { rdsApi } from '../../lib/rdsApi';
 
 interface Pipeline {
   id: string;
@@ -312,50 +313,18 @@ export function PipelinesTab() {
 
   const handleGitImport = async (gitConfig: GitImportConfig) => {
     try {
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) throw new Error('Not authenticated');
-
-      const { data: workspaces } = await supabase
-        .from('workspaces')
-        .select('id')
-        .eq('user_id', user.id)
-        .limit(1);
-
-      let workspaceId = workspaces?.[0]?.id;
-
-      if (!workspaceId) {
-        const { data: newWorkspace } = await supabase
-          .from('workspaces')
-          .insert([{ user_id: user.id, name: 'Default Workspace' }])
-          .select()
-          .single();
-        workspaceId = newWorkspace?.id;
-      }
-
-      const { data: newPipeline, error } = await supabase
-        .from('pipelines')
-        .insert([
-          {
-            workspace_id: workspaceId,
-            name: gitConfig.name,
-            description: gitConfig.description,
-            pipeline_graph: { nodes: [], edges: [] },
-            status: 'draft',
-            git_repo_url: gitConfig.gitRepoUrl,
-            git_branch: gitConfig.gitBranch,
-            git_file_path: gitConfig.gitFilePath,
-            git_sync_enabled: gitConfig.gitSyncEnabled,
-            last_git_sync: new Date().toISOString(),
-          },
-        ])
-        .select()
-        .single();
-
-      if (error) throw error;
+      const { job_id } = await rdsApi.repositories.importFiles({
+        url: gitConfig.gitRepoUrl,
+        branch: gitConfig.gitBranch,
+        path: gitConfig.gitFilePath,
+        kinds: ['pipeline'],
+      });
+      // The import runs as a background job; an identical import already queued has no job id to wait on.
+      const job = job_id ? await rdsApi.jobs.waitFor(job_id) : null;
 
       await fetchPipelines();
       setShowGitImportModal(false);
-      alert(`Pipeline "${gitConfig.name}" imported successfully from Git!`);
+      alert(job ? `Imported ${job.result?.pipelines ?? 0} pipeline(s) from Git` : 'This import is already running');
     } catch (error: any) {
       alert('Error importing pipeline: ' + error.message);
     }
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Search, Star, Trash2, Play, Copy, Calendar, Tag, FileText } from 'lucide-react';
+import { rdsApi } from '../../lib/rdsApi';
 
 interface SavedQuery {
   id: string;
@@ -20,25 +21,46 @@ export function SavedQueriesTab({ onLoadQuery }: SavedQueriesTabProps) {
   const [queries, setQueries] = useState<SavedQuery[]>([]);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchRanking, setSearchRanking] = useState<string[] | null>(null);
   const [filterTag, setFilterTag] = useState<string | null>(null);
   const [showFavoritesOnly, setShowFavoritesOnly] = useState(false);
 
+  const [tagFacets, setTagFacets] = useState<{ tag: string; count: number }[]>([]);
+
   useEffect(() => {
     fetchQueries();
+  }, [filterTag]);
+
+  useEffect(() => {
+    rdsApi.savedQueries.getTagFacets()
+      .then(setTagFacets)
+      .catch((err) => console.error('Error fetching tags:', err));
   }, []);
 
+  useEffect(() => {
+    if (!searchTerm.trim()) {
+      setSearchRanking(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const page = await rdsApi.search.query(searchTerm, { types: ['saved_query'], limit: 100 });
+        if (!cancelled) setSearchRanking(page.results.map((result: { id: string }) => result.id));
+      } catch (err) {
+        console.error('Error searching queries:', err);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
   const fetchQueries = async () => {
     try {
-      setLoading(true);
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) return;
-
-      const { data, error } = await supabase
-        .from('saved_queries')
-        .select('*')
-        .order('updated_at', { ascending: false });
-
-      if (error) throw error;
+      // Tag filtering runs server-side against the GIN index on saved_queries.tags.
+      const data = await rdsApi.savedQueries.getAll({ tags: filterTag ? [filterTag] : [] });
       setQueries(data || []);
     } catch (err) {
       console.error('Error fetching queries:', err);
@@ -87,15 +109,17 @@ export function SavedQueriesTab({ onLoadQuery }: SavedQueriesTabProps) {
     alert('Query copied to clipboard!');
   };
 
-  const allTags = Array.from(new Set(queries.flatMap(q => q.tags)));
+  // Server-side search ranks matches; until the first response arrives the full list stays visible.
+  const rankOf = new Map((searchRanking ?? []).map((id, index) => [id, index]));
 
   const filteredQueries = queries.filter(q => {
     if (showFavoritesOnly && !q.is_favorite) return false;
-    if (filterTag && !q.tags.includes(filterTag)) return false;
-    if (searchTerm && !q.name.toLowerCase().includes(searchTerm.toLowerCase()) &&
-        !q.description?.toLowerCase().includes(searchTerm.toLowerCase())) return false;
+    if (searchRanking && !rankOf.has(q.id)) return false;
     return true;
   });
+  if (searchRanking) {
+    filteredQueries.sort((a, b) => rankOf.get(a.id)! - rankOf.get(b.id)!);
+  }
 
   if (loading) {
     return (
@@ -136,15 +160,15 @@ export function SavedQueriesTab({ onLoadQuery }: SavedQueriesTabProps) {
           Favorites
         </button>
 
-        {allTags.length > 0 && (
+        {tagFacets.length > 0 && (
           <select
             value={filterTag || ''}
             onChange={(e) => setFilterTag(e.target.value || null)}
             className="px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-cyan-500"
           >
             <option value="">All Tags</option>
-            {allTags.map(tag => (
-              <option key={tag} value={tag}>{tag}</option>
+            {tagFacets.map(({ tag, count }) => (
+              <option key={tag} value={tag}>{tag} ({count})</option>
             ))}
           </select>
         )}
@@ -10,7 +10,7 @@ interface Repository {
   url: string;
   branch: string;
   status: 'connected' | 'disconnected' | 'error';
-  last_sync: string;
+  last_sync: string | null;
   created_at: string;
 }
 
@@ -26,30 +26,7 @@ export function RepositoriesTab() {
 
   const fetchRepositories = async () => {
     try {
-      // const data = await rdsApi.repositories.getAll();
-      // Placeholder data for now
-      const data = [
-        {
-          id: '1',
-          name: 'data-platform-notebooks',
-          provider: 'github' as const,
-          url: 'https://github.com/company/data-platform-notebooks',
-          branch: 'main',
-          status: 'connected' as const,
-          last_sync: new Date().toISOString(),
-          created_at: new Date().toISOString(),
-        },
-        {
-          id: '2',
-          name: 'ml-pipelines',
-          provider: 'gitlab' as const,
-          url: 'https://gitlab.com/company/ml-pipelines',
-          branch: 'develop',
-          status: 'connected' as const,
-          last_sync: new Date(Date.now() - 3600000).toISOString(),
-          created_at: new Date().toISOString(),
-        },
-      ];
+      const data = await rdsApi.repositories.getAll();
       setRepositories(data);
     } catch (error) {
       console.error('Error fetching repositories:', error);
@@ -59,14 +36,18 @@ export function RepositoriesTab() {
   };
 
   const handleSync = async (id: string) => {
-    console.log('Syncing repository:', id);
+    try {
+      await rdsApi.repositories.sync(id);
+    } catch (error) {
+      console.error('Error syncing repository:', error);
+    }
   };
 
   const handleDelete = async (id: string) => {
     if (!confirm('Are you sure you want to disconnect this repository?')) return;
 
     try {
-      // await rdsApi.repositories.delete(id);
+      await rdsApi.repositories.delete(id);
       await fetchRepositories();
     } catch (error) {
       console.error('Error deleting repository:', error);
@@ -243,7 +224,7 @@ export function RepositoriesTab() {
                         <span>Branch: {repo.branch}</span>
                       </div>
                       <div>
-                        Last sync: {new Date(repo.last_sync).toLocaleString()}
+                        Last sync: {repo.last_sync ? new Date(repo.last_sync).toLocaleString() : 'Never'}
                       </div>
                     </div>
                   </div>
@@ -57,6 +57,37 @@ async function fetchWithAuth(url: string, options: RequestInit = {}) {
   return response.json();
 }
 
+// Must match DEDUP_BLOCK_SIZE in backend/upload_dedup.py: the digest is SHA-256 over each block's SHA-256.
+const DEDUP_BLOCK_SIZE = 4 * 1024 * 1024;
+
+export async function contentHash(file: Blob) {
+  const blocks = new Uint8Array(Math.ceil(file.size / DEDUP_BLOCK_SIZE) * 32);
+  for (let offset = 0, index = 0; offset < file.size; offset += DEDUP_BLOCK_SIZE, index++) {
+    const block = await file.slice(offset, offset + DEDUP_BLOCK_SIZE).arrayBuffer();
+    blocks.set(new Uint8Array(await crypto.subtle.digest('SHA-256', block)), index * 32);
+  }
+  const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', blocks));
+  return Array.from(digest, (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Asks the server to store the upload from content it already holds; sends the body only if it does not.
+async function uploadDeduplicated(url: string, params: URLSearchParams, file: Blob) {
+  const headers = { 'Content-Type': 'application/octet-stream', 'X-Content-Hash': await contentHash(file) };
+  const probe = new URLSearchParams(params);
+  probe.set('probe', 'true');
+  const result = await fetchWithAuth(`${url}?${probe}`, { method: 'PUT', headers });
+  if (result.dedup?.outcome !== 'missing') {
+    return result;
+  }
+  return fetchWithAuth(`${url}?${params}`, { method: 'PUT', headers, body: file });
+}
+
+function tagQuery(filter?: { tags?: string[]; match?: 'any' | 'all' }) {
+  if (!filter?.tags?.length) return '';
+  const params = new URLSearchParams({ tags: filter.tags.join(','), match: filter.match ?? 'any' });
+  return `?${params}`;
+}
+
 export const rdsApi = {
   auth: {
     async signUp(email: string, password: string, fullName: string) {
@@ -112,9 +143,29 @@ export const rdsApi = {
     },
   },
 
+  bootstrap: {
+    async get() {
+      return fetchWithAuth('/bootstrap');
+    },
+  },
+
+  search: {
+    async query(q: string, options: { types?: string[]; limit?: number; offset?: number } = {}) {
+      const params = new URLSearchParams({ q });
+      if (options.types?.length) params.set('types', options.types.join(','));
+      if (options.limit !== undefined) params.set('limit', String(options.limit));
+      if (options.offset !== undefined) params.set('offset', String(options.offset));
+      return fetchWithAuth(`/search?${params}`);
+    },
+  },
+
   workspaces: {
-    async getAll() {
-      return fetchWithAuth('/workspaces');
+    async getAll(filter?: { tags?: string[]; match?: 'any' | 'all' }) {
+      return fetchWithAuth(`/workspaces${tagQuery(filter)}`);
+    },
+
+    async getTagFacets(filter?: { tags?: string[]; match?: 'any' | 'all' }) {
+      return fetchWithAuth(`/workspaces/tags${tagQuery(filter)}`);
     },
 
     async create(data: any) {
@@ -162,6 +213,119 @@ export const rdsApi = {
         method: 'DELETE',
       });
     },
+
+    async test(id: string) {
+      return fetchWithAuth(`/data-sources/${id}/test`, {
+        method: 'POST',
+      });
+    },
+
+    async testAll() {
+      return fetchWithAuth('/data-sources/test-all', {
+        method: 'POST',
+      });
+    },
+
+    async read(id: string, spec: {
+      table?: string;
+      key?: string;
+      columns?: string[];
+      filters?: [string, string, any?][];
+      limit?: number;
+    }) {
+      return fetchWithAuth(`/data-sources/${id}/read`, {
+        method: 'POST',
+        body: JSON.stringify(spec),
+      });
+    },
+
+    // Arrow IPC stream (apache-arrow's tableFromIPC reads it) or a Parquet file, as raw bytes.
+    async readColumnar(id: string, spec: {
+      table?: string;
+      key?: string;
+      columns?: string[];
+      filters?: [string, string, any?][];
+      limit?: number;
+      partitioning?: string | { column: string; strategy?: 'range' | 'hash'; partitions?: number };
+    }, format: 'arrow' | 'parquet' = 'arrow') {
+      const token = getAuthToken();
+      const response = await fetch(`${API_URL}/data-sources/${id}/read`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Accept: format === 'arrow' ? 'application/vnd.apache.arrow.stream' : 'application/vnd.apache.parquet',
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify(spec),
+      });
+      if (!response.ok) {
+        const error = await response.json().catch(() => ({ detail: 'An error occurred' }));
+        throw new Error(error.detail || 'Request failed');
+      }
+      return response.arrayBuffer();
+    },
+
+    // Queues a write of this source's read into an embedded table or object key (as Parquet) or a
+    // postgresql table (as a COPY bulk load); poll jobs.getById for the result and its rows_per_second.
+    async export(id: string, spec: {
+      target_source_id: string;
+      target: string;
+      table?: string;
+      key?: string;
+      columns?: string[];
+      filters?: [string, string, any?][];
+      workers?: number;
+      mode?: 'append' | 'merge' | 'ignore';
+      conflict_columns?: string[];
+      pipeline_id?: string;
+      node_id?: string;
+      incremental?: string | { column: string; lookback_seconds?: number; reset?: boolean };
+      partitioning?: string | { column: string; strategy?: 'range' | 'hash'; partitions?: number };
+      cluster_id?: string;
+    }) {
+      return fetchWithAuth(`/data-sources/${id}/export`, {
+        method: 'POST',
+        body: JSON.stringify(spec),
+      });
+    },
+
+    async listObjects(id: string, prefix = '') {
+      const params = new URLSearchParams({ prefix });
+      return fetchWithAuth(`/data-sources/${id}/objects?${params}`);
+    },
+
+    async uploadObject(id: string, key: string, file: Blob) {
+      return uploadDeduplicated(`/data-sources/${id}/objects/content`, new URLSearchParams({ key }), file);
+    },
+
+    async listTables(id: string) {
+      return fetchWithAuth(`/data-sources/${id}/tables`);
+    },
+
+    // Stores a CSV, Parquet, Arrow or Excel file as a table that query() can read in place.
+    // Content the source already holds is not sent again; the result's dedup.outcome says what happened.
+    async uploadTable(id: string, table: string, file: File) {
+      return uploadDeduplicated(
+        `/data-sources/${id}/tables/${encodeURIComponent(table)}`, new URLSearchParams({ filename: file.name }), file
+      );
+    },
+
+    async getUploadDedup(id: string) {
+      return fetchWithAuth(`/data-sources/${id}/dedup`);
+    },
+
+    async deleteTable(id: string, table: string) {
+      return fetchWithAuth(`/data-sources/${id}/tables/${encodeURIComponent(table)}`, {
+        method: 'DELETE',
+      });
+    },
+
+    async query(id: string, sql: string, options: { parameters?: any[]; limit?: number } = {}) {
+      return fetchWithAuth(`/data-sources/${id}/query`, {
+        method: 'POST',
+        body: JSON.stringify({ sql, ...options }),
+      });
+    },
   },
 
   pipelines: {
@@ -188,6 +352,48 @@ export const rdsApi = {
         method: 'DELETE',
       });
     },
+
+    async getRuns(id: string, limit = 50) {
+      return fetchWithAuth(`/pipelines/${id}/runs?limit=${limit}`);
+    },
+
+    async getRun(id: string, runId: string) {
+      return fetchWithAuth(`/pipelines/${id}/runs/${runId}`);
+    },
+
+    async getRunStats(id: string, days = 30) {
+      return fetchWithAuth(`/pipelines/${id}/runs/stats?days=${days}`);
+    },
+
+    async getWatermarks(id: string) {
+      return fetchWithAuth(`/pipelines/${id}/watermarks`);
+    },
+
+    // Next incremental export of the matching tables reads them in full.
+    async resetWatermarks(id: string, filter: { source_id?: string; table?: string } = {}) {
+      const params = new URLSearchParams(filter as Record<string, string>);
+      return fetchWithAuth(`/pipelines/${id}/watermarks?${params}`, {
+        method: 'DELETE',
+      });
+    },
+
+    async getVersions(id: string, limit = 100) {
+      return fetchWithAuth(`/pipelines/${id}/versions?limit=${limit}`);
+    },
+
+    async getVersion(id: string, version: number) {
+      return fetchWithAuth(`/pipelines/${id}/versions/${version}`);
+    },
+
+    async diffVersions(id: string, fromVersion: number, toVersion: number) {
+      return fetchWithAuth(`/pipelines/${id}/versions/diff?from_version=${fromVersion}&to_version=${toVersion}`);
+    },
+
+    async restoreVersion(id: string, version: number) {
+      return fetchWithAuth(`/pipelines/${id}/versions/${version}/restore`, {
+        method: 'POST',
+      });
+    },
   },
 
   cloudProfiles: {
@@ -240,6 +446,65 @@ export const rdsApi = {
         method: 'DELETE',
       });
     },
+
+    async start(id: string) {
+      return fetchWithAuth(`/compute-clusters/${id}/start`, {
+        method: 'POST',
+      });
+    },
+
+    async stop(id: string) {
+      return fetchWithAuth(`/compute-clusters/${id}/stop`, {
+        method: 'POST',
+      });
+    },
+  },
+
+  jobs: {
+    async getById(id: number) {
+      return fetchWithAuth(`/jobs/${id}`);
+    },
+
+    // Polls until the job succeeds (resolving to the job) or fails for good (rejecting with its last_error).
+    async waitFor(id: number, { intervalMs = 1000, timeoutMs = 600000 } = {}) {
+      const deadline = Date.now() + timeoutMs;
+      for (;;) {
+        const job = await rdsApi.jobs.getById(id);
+        if (job.status === 'succeeded') return job;
+        if (job.status === 'failed' || job.status === 'cancelled') {
+          throw new Error(job.last_error || `Job ${id} ${job.status}`);
+        }
+        if (Date.now() > deadline) throw new Error(`Job ${id} is still ${job.status}`);
+        await new Promise((resolve) => setTimeout(resolve, intervalMs));
+      }
+    },
+  },
+
+  blobs: {
+    isRef(value: unknown): value is string {
+      return typeof value === 'string' && /^blob:sha256:[0-9a-f]{64}$/.test(value);
+    },
+
+    async getText(ref: string, range?: { start: number; end?: number }) {
+      const token = getAuthToken();
+      const headers: Record<string, string> = {};
+      if (token) headers['Authorization'] = `Bearer ${token}`;
+      if (range) headers['Range'] = `bytes=${range.start}-${range.end ?? ''}`;
+      const response = await fetch(`${API_URL}/blobs/${ref.replace('blob:sha256:', '')}`, { headers });
+      if (!response.ok) throw new Error('Failed to fetch blob');
+      return response.text();
+    },
+  },
+
+  events: {
+    subscribeStatus(onEvent: (event: any) => void) {
+      const token = getAuthToken();
+      const source = new EventSource(`${API_URL}/events/status?token=${encodeURIComponent(token || '')}`);
+      source.addEventListener('status', (message) => {
+        onEvent(JSON.parse((message as MessageEvent).data));
+      });
+      return () => source.close();
+    },
   },
 
   notebooks: {
@@ -271,6 +536,17 @@ export const rdsApi = {
       });
     },
 
+    async patchCell(
+      id: string,
+      cellId: string,
+      data: { op: 'insert' | 'update' | 'move' | 'delete'; version?: number; cell?: any; after?: string | null; index?: number },
+    ) {
+      return fetchWithAuth(`/notebooks/${id}/cells/${cellId}`, {
+        method: 'PATCH',
+        body: JSON.stringify(data),
+      });
+    },
+
     async executeCell(data: { notebookId: string; cellId: string; code: string; language: string }) {
       return fetchWithAuth('/notebooks/execute', {
         method: 'POST',
@@ -280,8 +556,12 @@ export const rdsApi = {
   },
 
   savedQueries: {
-    async getAll() {
-      return fetchWithAuth('/saved-queries');
+    async getAll(filter?: { tags?: string[]; match?: 'any' | 'all' }) {
+      return fetchWithAuth(`/saved-queries${tagQuery(filter)}`);
+    },
+
+    async getTagFacets(filter?: { tags?: string[]; match?: 'any' | 'all' }) {
+      return fetchWithAuth(`/saved-queries/tags${tagQuery(filter)}`);
     },
 
     async create(data: any) {
@@ -369,5 +649,12 @@ export const rdsApi = {
         method: 'POST',
       });
     },
+
+    async importFiles(data: { url: string; branch?: string; path?: string; kinds?: string[] }) {
+      return fetchWithAuth('/git-import', {
+        method: 'POST',
+        body: JSON.stringify(data),
+      });
+    },
   },
 };